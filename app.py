@@ -1,25 +1,52 @@
 """MyBlob 博客系统 - 主应用"""
 import os
 import re
+import threading
+import time
 from datetime import datetime
 from functools import wraps
+from itertools import islice
 
+import click
 from flask import (Flask, render_template, request, redirect, url_for,
-                   flash, jsonify, abort, session)
+                   flash, jsonify, abort, session, stream_template,
+                   stream_with_context, has_app_context)
 from flask_login import (LoginManager, login_user, logout_user,
                           login_required, current_user)
-import markdown
 from markupsafe import Markup
+from sqlalchemy import bindparam, delete, insert, update
+from sqlalchemy.exc import IntegrityError
 
 from config import config
-from models import db, User, Post, Category, post_categories
-from utils.markdown_scanner import (scan_markdown_folder, get_categories_from_folder,
-                                     generate_slug, generate_summary)
+from models import db, User, Post, Category, RenderCache, post_categories
+from utils.markdown_scanner import (iter_markdown_folder, iter_markdown_files,
+                                     get_categories_from_folder, generate_slug,
+                                     generate_summary, IncrementalScanner, SlugAllocator)
+from utils.markdown_renderer import (MarkdownRenderer, AdaptiveMarkdownRenderer,
+                                     render_cache_key, render_documents,
+                                     render_preview_blocks, iter_rendered_sections,
+                                     iter_html_sections)
+from utils.highlight_cache import LRUCache, highlight_cache
+from utils.fs_watcher import MarkdownWatcher
+from utils.sync_jobs import SyncJobManager
+from utils.view_counter import ViewCounter
+from utils.process_pool import ProcessPool
+from utils.synthetic import generate_markdown_tree, seed_database
+from utils.search import search_index, snippet_windows
+from utils.pagination import (CursorPage, CountCache, paginate_by_cursor,
+                              invalidate_counts)
 from utils.github_proxy import GitHubProxy
 
 # 允许在 Web 界面展示的分类名称（对应 posts 下的顶层文件夹）
 ALLOWED_CATEGORY_NAMES = {'技术', '生活', '教程', '项目'}
 
+DEFAULT_CATEGORIES = [
+    {'name': '技术', 'slug': 'tech', 'icon': '💻', 'color': '#3498db', 'description': '技术文章与教程'},
+    {'name': '生活', 'slug': 'life', 'icon': '🌟', 'color': '#2ecc71', 'description': '生活随笔与感悟'},
+    {'name': '教程', 'slug': 'tutorial', 'icon': '📚', 'color': '#e74c3c', 'description': '学习教程与笔记'},
+    {'name': '项目', 'slug': 'project', 'icon': '🚀', 'color': '#9b59b6', 'description': '项目展示与记录'},
+]
+
 # ==================== 应用工厂 ====================
 
 def create_app(config_name='default'):
@@ -39,29 +66,51 @@ def create_app(config_name='default'):
     def load_user(user_id):
         return User.query.get(int(user_id))
 
-    # Markdown 渲染器
-    md = markdown.Markdown(extensions=[
-        'markdown.extensions.fenced_code',
-        'markdown.extensions.codehilite',
-        'markdown.extensions.tables',
-        'markdown.extensions.toc',
-        'markdown.extensions.nl2br',
-        'markdown.extensions.sane_lists',
-        'markdown.extensions.attr_list',
-        'markdown.extensions.meta',
-    ], extension_configs={
-        'markdown.extensions.codehilite': {
-            'css_class': 'highlight',
-            'linenums': False
-        }
-    })
+    # Markdown 渲染器（每个线程持有独立实例，默认按文档内容挑选扩展子集）
+    if app.config.get('ADAPTIVE_RENDERING', True):
+        renderer = AdaptiveMarkdownRenderer()
+    else:
+        renderer = MarkdownRenderer()
+    app.markdown_renderer = renderer
+    highlight_cache.resize(app.config.get('HIGHLIGHT_CACHE_SIZE', 1024))
 
     def render_markdown(text):
         """渲染 Markdown 为 HTML"""
-        md.reset()
-        html = md.convert(text)
+        return Markup(renderer.render(text))
+
+    def _render_entry(text):
+        """读取渲染缓存项（HTML、目录、字数），缺失时渲染并写入"""
+        key = render_cache_key(text)
+        entry = db.session.get(RenderCache, key)
+        if entry is None:
+            entry = RenderCache(key=key, **renderer.render_document(text))
+            db.session.add(entry)
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # 其他请求已写入相同的缓存项
+                db.session.rollback()
+        return entry
+
+    # 远程内容（GitHub README / 文件）任何访客都能触发，只放在有容量上限的内存缓存中，
+    # 不写入 render_cache 表，避免数据库随访问无限增长
+    remote_render_cache = app.remote_render_cache = LRUCache(
+        app.config.get('REMOTE_RENDER_CACHE_SIZE', 128))
+
+    def render_remote_markdown(text):
+        """渲染远程 Markdown 为 HTML，结果保存在内存 LRU 缓存中"""
+        key = render_cache_key(text)
+        html = remote_render_cache.get(key)
+        if html is None:
+            start = time.perf_counter()
+            html = renderer.render(text)
+            remote_render_cache.put(key, html, time.perf_counter() - start)
         return Markup(html)
 
+    def _invalidate_render_cache(text):
+        """删除旧内容对应的渲染缓存（随调用方事务一起提交）"""
+        RenderCache.query.filter_by(key=render_cache_key(text)).delete()
+
     app.jinja_env.filters['markdown'] = render_markdown
 
     # 上下文处理器
@@ -87,97 +136,83 @@ def create_app(config_name='default'):
 
     # ==================== 自动同步 Markdown 文件 ====================
 
-    def _auto_sync_markdown():
-        """自动扫描 posts 文件夹，将新文件同步到数据库"""
+    def _auto_sync_markdown(paths=None):
+        """自动扫描 posts 文件夹，将新文件同步到数据库
+
+        paths 为文件监听器报告的变更路径，None 表示遍历整个文件夹。
+        """
         folder = app.config['MARKDOWN_FOLDER']
         if not os.path.exists(folder):
             return
 
-        scanned = scan_markdown_folder(folder)
-        changed = False
-
-        # 收集数据库中所有来自文件的文章路径
-        existing_paths = {p.file_path: p for p in Post.query.filter_by(is_from_file=True).all()}
-
-        for item in scanned:
-            fp = item['file_path']
-            if fp in existing_paths:
-                # 已存在 -> 检查是否需要更新（文件修改时间更新）
-                post = existing_paths[fp]
-                if item['updated_at'] > post.updated_at:
-                    post.title = item['title']
-                    post.content = item['content']
-                    post.summary = item['summary']
-                    post.cover_image = item['cover_image']
-                    post.updated_at = item['updated_at']
-                    changed = True
+        # 增量扫描：只 stat 文件，新增或修改过的文件才会被读取解析
+        scanner = getattr(app, 'markdown_scanner', None)
+        if scanner is None or scanner.folder_path != folder:
+            scanner = app.markdown_scanner = IncrementalScanner(
+                folder, app.config.get('SCAN_MODE', 'serial'), app.config.get('SCAN_WORKERS'),
+                index_path=app.config.get('SCAN_INDEX_PATH'))
+        first_scan = scanner.scans == 0
+        # 首次扫描必须遍历全部文件，清单完整后才能按路径增量检查
+        diff = scanner.scan(None if first_scan else paths)
+        if not diff and not first_scan:
+            return
 
-                # 始终确保分类关联正确
-                cat_name = item['category']
-                if cat_name and cat_name in ALLOWED_CATEGORY_NAMES:
-                    cat = Category.query.filter_by(name=cat_name).first()
-                    if not cat:
-                        cat = Category(name=cat_name, slug=generate_slug(cat_name))
-                        db.session.add(cat)
-                        db.session.flush()
-                    if cat not in post.categories:
-                        post.categories = [cat]
-                        changed = True
+        try:
+            if first_scan:
+                # 首次扫描时数据库可能与文件夹相差任意多，完整比对一遍
+                sync_markdown_items(app, scanner.posts(), delete_missing=True)
             else:
-                # 新文件 -> 创建文章
-                slug = item['slug']
-                if Post.query.filter_by(slug=slug).first():
-                    slug = f"{slug}-{int(datetime.utcnow().timestamp())}"
-
-                admin = User.query.filter_by(is_admin=True).first()
-                author_id = admin.id if admin else None
+                # 之后只把受影响的文件交给同步引擎，预加载也只涉及这些路径
+                changed = diff.added | diff.changed
+                sync_markdown_items(app, scanner.posts(changed), delete_missing=True,
+                                    paths=changed | diff.removed)
+
+            # 清理不在允许列表中的分类
+            stale_cats = Category.query.filter(
+                ~Category.name.in_(ALLOWED_CATEGORY_NAMES)
+            ).all()
+            for cat in stale_cats:
+                # 将该分类下的文章解除关联，然后删除分类
+                cat.posts  # 触发加载
+                db.session.delete(cat)
 
-                post = Post(
-                    title=item['title'],
-                    slug=slug,
-                    content=item['content'],
-                    summary=item['summary'],
-                    cover_image=item['cover_image'],
-                    is_published=True,
-                    is_from_file=True,
-                    file_path=fp,
-                    author_id=author_id,
-                    created_at=item['created_at'],
-                    updated_at=item['updated_at']
-                )
-                db.session.add(post)
-
-                # 处理分类（只允许四个顶层分类）
-                cat_name = item['category']
-                if cat_name and cat_name in ALLOWED_CATEGORY_NAMES:
-                    cat = Category.query.filter_by(name=cat_name).first()
-                    if not cat:
-                        cat = Category(name=cat_name, slug=generate_slug(cat_name))
-                        db.session.add(cat)
-                        db.session.flush()
-                    post.categories.append(cat)
-
-                changed = True
-
-        # 删除数据库中已不存在的文件对应的文章
-        scanned_paths = {item['file_path'] for item in scanned}
-        for fp, post in existing_paths.items():
-            if fp not in scanned_paths:
-                db.session.delete(post)
-                changed = True
-
-        # 清理不在允许列表中的分类
-        stale_cats = Category.query.filter(
-            ~Category.name.in_(ALLOWED_CATEGORY_NAMES)
-        ).all()
-        for cat in stale_cats:
-            # 将该分类下的文章解除关联，然后删除分类
-            cat.posts  # 触发加载
-            db.session.delete(cat)
-            changed = True
-
-        if changed:
             db.session.commit()
+        except Exception:
+            # 扫描清单已经记下了这些变化，数据库却没有写入：丢弃扫描器，
+            # 下一次同步按首次扫描重新比对全部文件，否则这些修改再也不会被应用
+            db.session.rollback()
+            app.markdown_scanner = None
+            raise
+
+    sync_lock = threading.Lock()
+
+    def _sync_changed_paths(paths):
+        """文件监听线程的回调：在应用上下文中同步变更的文件"""
+        with app.app_context(), sync_lock:
+            try:
+                _auto_sync_markdown(paths)
+            except Exception:
+                db.session.rollback()
+                app.logger.exception('同步 Markdown 文件失败')
+
+    # 只保护监听器的创建；不能用 sync_lock，否则请求会等正在进行的同步（含监听器的首次全量同步）
+    watcher_lock = threading.Lock()
+
+    def start_markdown_watcher():
+        """启动后台文件监听（只启动一次），启动后请求不再触发同步"""
+        with watcher_lock:
+            watcher = getattr(app, 'markdown_watcher', None)
+            if watcher is None:
+                watcher = app.markdown_watcher = MarkdownWatcher(
+                    app.config['MARKDOWN_FOLDER'], _sync_changed_paths,
+                    debounce=app.config.get('MARKDOWN_WATCHER_DEBOUNCE', 0.5),
+                    poll_interval=app.config.get('MARKDOWN_WATCHER_POLL_INTERVAL', 2.0),
+                    backend=app.config.get('MARKDOWN_WATCHER_BACKEND', 'auto'),
+                    initial_sync=True,
+                ).start()
+            return watcher
+
+    app.start_markdown_watcher = start_markdown_watcher
 
     @app.before_request
     def before_request_sync():
@@ -185,16 +220,25 @@ def create_app(config_name='default'):
         # 仅对页面请求做同步，跳过静态文件和 API
         if request.path.startswith('/static') or request.path.startswith('/api/'):
             return
+        # 启用文件监听后由后台线程同步，请求线程不做任何扫描
+        if app.config.get('MARKDOWN_WATCHER', False):
+            if getattr(app, 'markdown_watcher', None) is None:
+                start_markdown_watcher()
+            return
         # 简单节流：每 5 秒最多同步一次
-        import time
         now = time.time()
         last_sync = getattr(app, '_last_md_sync', 0)
         if now - last_sync > 5:
             app._last_md_sync = now
+            # 其他同步正在进行时直接跳过，请求线程从不等待同步
+            if not sync_lock.acquire(blocking=False):
+                return
             try:
                 _auto_sync_markdown()
             except Exception:
                 pass  # 同步失败不影响正常请求
+            finally:
+                sync_lock.release()
 
     # GitHub 代理实例
     github = GitHubProxy(token=os.environ.get('GITHUB_TOKEN'))
@@ -209,61 +253,170 @@ def create_app(config_name='default'):
             return f(*args, **kwargs)
         return decorated_function
 
+    # ==================== 分页 ====================
+
+    count_cache = app.count_cache = CountCache(
+        app.config.get('PAGINATION_COUNT_TTL', 60),
+        app.config.get('PAGINATION_COUNT_CACHE_SIZE', 256))
+
+    def _paginate(query, count_key, per_page, with_total=True, page_numbers=False):
+        """文章列表分页
+
+        默认按 (created_at, id) 游标分页，请求带 ?page= 或配置 PAGINATION_MODE='page'
+        （以及调用方指定 page_numbers）时沿用页码分页。总数来自 count_cache，
+        游标模式下 with_total 为假时不计算。游标无效时抛出 ValueError。
+        """
+        def count():
+            return count_cache.get(count_key, lambda: query.order_by(None).with_entities(
+                db.func.count(Post.id)).scalar())
+
+        if page_numbers or 'page' in request.args or \
+                app.config.get('PAGINATION_MODE', 'cursor') == 'page':
+            page = request.args.get('page', 1, type=int)
+            pagination = query.paginate(page=page, per_page=per_page, error_out=False,
+                                        count=False)
+            pagination.total = count()
+            return pagination
+        pagination = paginate_by_cursor(query, request.args.get('cursor'), per_page)
+        if with_total:
+            pagination.total = count()
+        return pagination
+
     # ==================== 首页路由 ====================
 
     @app.route('/')
     def index():
-        page = request.args.get('page', 1, type=int)
         category_slug = request.args.get('category', '')
         search_q = request.args.get('q', '')
 
-        query = Post.query.filter_by(is_published=True)
+        query = Post.query.options(*Post.listing_options()).filter_by(is_published=True)
 
+        category = None
         if category_slug:
             category = Category.query.filter_by(slug=category_slug).first()
             if category:
                 query = query.filter(Post.categories.any(Category.id == category.id))
 
-        if search_q:
+        match = search_index.match_subquery(search_q) if search_q else None
+        if match is not None:
+            # 全文索引：按 BM25 相关度排序
+            query = query.join(match, match.c.post_id == Post.id).order_by(
+                match.c.score, Post.created_at.desc())
+        elif search_q:
             query = query.filter(
                 db.or_(
                     Post.title.contains(search_q),
                     Post.content.contains(search_q),
                     Post.summary.contains(search_q)
                 )
-            )
-
-        pagination = query.order_by(Post.created_at.desc()).paginate(
-            page=page, per_page=app.config['POSTS_PER_PAGE'], error_out=False
-        )
+            ).order_by(Post.created_at.desc())
+        else:
+            query = query.order_by(Post.created_at.desc())
+
+        # 按相关度排序的搜索结果没有稳定的时间键，使用页码分页
+        try:
+            pagination = _paginate(query, ('posts', category and category.id, search_q),
+                                   app.config['POSTS_PER_PAGE'],
+                                   with_total=bool(search_q), page_numbers=match is not None)
+        except ValueError:
+            abort(400)
         posts = pagination.items
+        snippets = snippet_windows([post.id for post in posts], search_q) if search_q else {}
 
         return render_template('index.html',
                              posts=posts,
                              pagination=pagination,
+                             snippets=snippets,
                              current_category=category_slug,
                              search_query=search_q)
 
     # ==================== 文章路由 ====================
 
+    def _write_view_counts(counts):
+        """用一条批量 UPDATE 把缓冲的浏览次数累加到 posts 表"""
+        table = Post.__table__
+        stmt = update(table).where(table.c.id == bindparam('post_id')).values(
+            view_count=table.c.view_count + bindparam('views'))
+        rows = [{'post_id': post_id, 'views': n} for post_id, n in counts.items()]
+
+        def write():
+            try:
+                db.session.execute(stmt, rows)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+        if has_app_context():
+            # 请求中写回时沿用请求的会话，避免另一个连接等待本连接持有的锁
+            write()
+        else:
+            with app.app_context():
+                write()
+
+    view_counter = app.view_counter = ViewCounter(
+        _write_view_counts,
+        interval=app.config.get('VIEW_COUNT_FLUSH_INTERVAL', 5.0),
+        threshold=app.config.get('VIEW_COUNT_FLUSH_THRESHOLD', 100))
+
     @app.route('/post/<slug>')
     def view_post(slug):
         post = Post.query.filter_by(slug=slug, is_published=True).first_or_404()
-        post.view_count += 1
-        db.session.commit()
-        html_content = render_markdown(post.content)
-        return render_template('post.html', post=post, html_content=html_content)
+        # 浏览次数先进缓冲区，阅读文章不再是一次写事务
+        view_counter.hit(post.id)
+        view_count = post.view_count + view_counter.pending(post.id)
+        if _should_stream(post):
+            return _stream_post(post, view_count)
+        rendered = _render_entry(post.content)
+        return render_template('post.html', post=post, view_count=view_count,
+                               html_content=Markup(rendered.html),
+                               toc=Markup(rendered.toc or ''),
+                               word_count=rendered.word_count or 0)
+
+    def _should_stream(post):
+        """超大文章（或 ?stream=1）走流式响应"""
+        if request.args.get('stream') is not None:
+            return request.args.get('stream') == '1'
+        min_size = app.config.get('STREAM_POST_MIN_SIZE', 256 * 1024)
+        return bool(min_size) and len(post.content) >= min_size
+
+    def _stream_post(post, view_count):
+        """先发送页面头部，正文按章节分块跟随（chunked 传输）"""
+        content = post.content
+        entry = db.session.get(RenderCache, render_cache_key(content))
+        if entry:
+            chunks = (Markup(html) for html in iter_html_sections(entry.html))
+            toc, word_count = Markup(entry.toc or ''), entry.word_count or 0
+        else:
+            # 未命中缓存时边渲染边发送，此时不生成目录
+            chunks = (Markup(html) for html in iter_rendered_sections(content))
+            toc, word_count = '', 0
+
+        def generate():
+            yield from stream_template('post.html', post=post, view_count=view_count,
+                                       html_chunks=chunks, toc=toc, word_count=word_count)
+            if entry is None:
+                # 整页发送完毕后补写完整的渲染缓存（含目录与字数），之后的访问直接读缓存
+                try:
+                    _render_entry(content)
+                except Exception:
+                    db.session.rollback()
+                    app.logger.exception('写入渲染缓存失败')
+
+        return app.response_class(stream_with_context(generate()))
 
     @app.route('/category/<slug>')
     def view_category(slug):
         category = Category.query.filter_by(slug=slug).first_or_404()
-        page = request.args.get('page', 1, type=int)
-        pagination = Post.query.filter(
+        query = Post.query.options(*Post.listing_options()).filter(
             Post.is_published == True,
             Post.categories.any(Category.id == category.id)
-        ).order_by(Post.created_at.desc()).paginate(
-            page=page, per_page=app.config['POSTS_PER_PAGE'], error_out=False
-        )
+        ).order_by(Post.created_at.desc())
+        try:
+            pagination = _paginate(query, ('posts', category.id, ''),
+                                   app.config['POSTS_PER_PAGE'])
+        except ValueError:
+            abort(400)
         return render_template('category.html',
                              category=category,
                              posts=pagination.items,
@@ -361,14 +514,20 @@ def create_app(config_name='default'):
     @login_required
     @admin_required
     def admin_dashboard():
+        try:
+            view_counter.flush()
+        except Exception:
+            app.logger.exception('写回浏览计数失败')
         stats = {
-            'total_posts': Post.query.count(),
-            'published_posts': Post.query.filter_by(is_published=True).count(),
+            'total_posts': db.session.query(db.func.count(Post.id)).scalar(),
+            'published_posts': db.session.query(db.func.count(Post.id)).filter(
+                Post.is_published.is_(True)).scalar(),
             'total_categories': Category.query.count(),
             'total_users': User.query.count(),
             'total_views': db.session.query(db.func.sum(Post.view_count)).scalar() or 0
         }
-        recent_posts = Post.query.order_by(Post.created_at.desc()).limit(10).all()
+        recent_posts = Post.query.options(*Post.listing_options()).order_by(
+            Post.created_at.desc()).limit(10).all()
         return render_template('admin.html', stats=stats, recent_posts=recent_posts)
 
     # ==================== 文章编辑器 ====================
@@ -395,32 +554,41 @@ def create_app(config_name='default'):
                 return render_template('editor.html', post=post)
 
             if post:
+                if post.content != content:
+                    _invalidate_render_cache(post.content)
                 post.title = title
                 post.content = content
                 post.summary = summary or generate_summary(content)
                 post.cover_image = cover_image
                 post.is_published = is_published
                 post.updated_at = datetime.utcnow()
+                post.categories = Category.query.filter(Category.id.in_(category_ids)).all()
+                prerender_posts(app, [post])
+                db.session.commit()
             else:
-                slug = generate_slug(title)
-                # 确保 slug 唯一
-                existing = Post.query.filter_by(slug=slug).first()
-                if existing:
-                    slug = f"{slug}-{int(datetime.utcnow().timestamp())}"
                 post = Post(
                     title=title,
-                    slug=slug,
                     content=content,
                     summary=summary or generate_summary(content),
                     cover_image=cover_image,
                     is_published=is_published,
                     author_id=current_user.id
                 )
-                db.session.add(post)
-
-            # 更新分类
-            post.categories = Category.query.filter(Category.id.in_(category_ids)).all()
-            db.session.commit()
+                base_slug = generate_slug(title)
+                attempts = app.config.get('SLUG_RETRIES', 3)
+                for attempt in range(attempts):
+                    # 其他编辑者可能同时占用了同一个 slug，由唯一约束兜底后重新分配
+                    post.slug = _slug_allocator(base_slug).allocate(base_slug)
+                    post.categories = Category.query.filter(Category.id.in_(category_ids)).all()
+                    db.session.add(post)
+                    try:
+                        prerender_posts(app, [post])
+                        db.session.commit()
+                        break
+                    except IntegrityError:
+                        db.session.rollback()
+                        if attempt == attempts - 1:
+                            raise
             flash('文章保存成功！', 'success')
             return redirect(url_for('view_post', slug=post.slug))
 
@@ -434,6 +602,7 @@ def create_app(config_name='default'):
     @admin_required
     def delete_post(post_id):
         post = Post.query.get_or_404(post_id)
+        _invalidate_render_cache(post.content)
         db.session.delete(post)
         db.session.commit()
         flash('文章已删除', 'info')
@@ -515,74 +684,67 @@ def create_app(config_name='default'):
 
     # ==================== Markdown 文件扫描与同步 ====================
 
+    sync_jobs = app.sync_jobs = SyncJobManager(state_dir=app.config.get('SYNC_JOB_DIR'))
+
+    def _run_sync_job(job, author_id):
+        """后台线程中执行的同步：扫描 posts 文件夹并写入数据库"""
+        # 与自动同步、文件监听共用同一把锁，避免重复插入同一文件
+        with app.app_context(), sync_lock:
+            folder = app.config['MARKDOWN_FOLDER']
+            job.update(phase='scanning')
+            if os.path.exists(folder):
+                job.update(total=sum(1 for _ in iter_markdown_files(folder)))
+
+            job.update(phase='syncing')
+            scanned = iter_markdown_folder(folder, app.config.get('SCAN_MODE', 'serial'),
+                                           app.config.get('SCAN_WORKERS'))
+            try:
+                result = sync_markdown_items(
+                    app, scanned, author_id=author_id,
+                    progress=lambda result, processed: job.update(processed=processed, **result))
+                job.update(phase='committing')
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            job.update(**result)
+
     @app.route('/admin/sync-posts', methods=['POST'])
     @login_required
     @admin_required
     def sync_markdown_posts():
-        """从 posts 文件夹同步 Markdown 文件到数据库"""
-        folder = app.config['MARKDOWN_FOLDER']
-        scanned = scan_markdown_folder(folder)
-
-        created = 0
-        updated = 0
-        for item in scanned:
-            existing = Post.query.filter_by(file_path=item['file_path']).first()
-            if existing:
-                # 如果文件修改时间更新，则同步内容
-                if item['updated_at'] > existing.updated_at:
-                    existing.title = item['title']
-                    existing.content = item['content']
-                    existing.summary = item['summary']
-                    existing.updated_at = item['updated_at']
-                    updated += 1
-
-                # 始终确保分类关联正确
-                cat_name = item['category']
-                if cat_name and cat_name in ALLOWED_CATEGORY_NAMES:
-                    cat = Category.query.filter_by(name=cat_name).first()
-                    if not cat:
-                        cat = Category(name=cat_name, slug=generate_slug(cat_name))
-                        db.session.add(cat)
-                        db.session.flush()
-                    if cat not in existing.categories:
-                        existing.categories = [cat]
-            else:
-                # 创建新文章
-                slug = item['slug']
-                if Post.query.filter_by(slug=slug).first():
-                    slug = f"{slug}-{int(datetime.utcnow().timestamp())}"
-
-                post = Post(
-                    title=item['title'],
-                    slug=slug,
-                    content=item['content'],
-                    summary=item['summary'],
-                    cover_image=item['cover_image'],
-                    is_published=True,
-                    is_from_file=True,
-                    file_path=item['file_path'],
-                    author_id=current_user.id,
-                    created_at=item['created_at'],
-                    updated_at=item['updated_at']
-                )
-                db.session.add(post)
-
-                # 处理分类（只允许四个顶层分类）
-                cat_name = item['category']
-                if cat_name and cat_name in ALLOWED_CATEGORY_NAMES:
-                    cat = Category.query.filter_by(name=cat_name).first()
-                    if not cat:
-                        cat = Category(name=cat_name, slug=generate_slug(cat_name))
-                        db.session.add(cat)
-                        db.session.flush()
-                    post.categories.append(cat)
-
-                created += 1
-
-        db.session.commit()
-        flash(f'同步完成：新增 {created} 篇，更新 {updated} 篇', 'success')
+        """在后台启动同步任务
+
+        页面脚本以 JSON 方式请求时立即返回任务信息，由页面轮询进度；
+        普通表单提交最多等待 SYNC_FORM_WAIT 秒，未完成时提示在后台继续运行。
+        """
+        author_id = current_user.id
+        job, started = sync_jobs.start(lambda job: _run_sync_job(job, author_id))
+
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify(job.to_dict()), 202 if started else 409
+
+        if not started:
+            flash('已有同步任务正在运行，请稍后再试', 'warning')
+        elif not job.finished.wait(app.config.get('SYNC_FORM_WAIT', 10)):
+            flash('同步任务已在后台运行，完成后刷新页面即可看到结果', 'info')
+        elif job.phase == 'failed':
+            flash(f'同步失败：{job.error}', 'danger')
+        else:
+            flash(f"同步完成：新增 {job.created} 篇，更新 {job.updated} 篇，"
+                  f"跳过 {job.skipped} 篇内容未变的文件", 'success')
         return redirect(url_for('admin_dashboard'))
 
+    @app.route('/api/admin/sync-jobs/<job_id>')
+    @login_required
+    @admin_required
+    def sync_job_status(job_id):
+        """同步任务的阶段、进度与计数"""
+        job = sync_jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': '任务不存在'}), 404
+        return jsonify(job.to_dict())
+
     # ==================== GitHub 代理路由 ====================
 
     @app.route('/github')
@@ -599,7 +761,7 @@ def create_app(config_name='default'):
         branch = request.args.get('branch', 'main')
         result = github.get_readme(owner, repo, branch)
         if result['success']:
-            result['html'] = render_markdown(result['content'])
+            result['html'] = render_remote_markdown(result['content'])
         return jsonify(result)
 
     @app.route('/api/github/file/<owner>/<repo>/<path:filepath>')
@@ -607,7 +769,7 @@ def create_app(config_name='default'):
         branch = request.args.get('branch', 'main')
         result = github.get_file_content(owner, repo, filepath, branch)
         if result['success'] and filepath.endswith(('.md', '.markdown')):
-            result['html'] = render_markdown(result['content'])
+            result['html'] = render_remote_markdown(result['content'])
         return jsonify(result)
 
     @app.route('/api/github/search')
@@ -627,25 +789,69 @@ def create_app(config_name='default'):
 
     @app.route('/api/posts')
     def api_posts():
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        pagination = Post.query.filter_by(is_published=True).order_by(
-            Post.created_at.desc()
-        ).paginate(page=page, per_page=per_page, error_out=False)
-        return jsonify({
-            'posts': [p.to_dict() for p in pagination.items],
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page
-        })
+        """文章列表：默认游标分页（?cursor=），?page= 使用页码分页；?total=0 不返回总数"""
+        per_page = min(max(request.args.get('per_page', 10, type=int), 1), 100)
+        query = Post.query.options(*Post.listing_options()).filter_by(
+            is_published=True).order_by(Post.created_at.desc())
+        with_total = request.args.get('total', '1') != '0'
+        try:
+            pagination = _paginate(query, ('posts', None, ''), per_page, with_total=with_total)
+        except ValueError:
+            return jsonify({'error': '无效的分页游标'}), 400
+        data = {'posts': [p.to_dict() for p in pagination.items]}
+        if isinstance(pagination, CursorPage):
+            data.update(pagination.to_dict())
+        else:
+            data['current_page'] = pagination.page
+        if pagination.total is not None:
+            data['total'] = pagination.total
+            data['pages'] = -(-pagination.total // per_page)
+        return jsonify(data)
+
+    @app.route('/api/admin/render-stats')
+    @login_required
+    @admin_required
+    def render_stats():
+        """渲染相关缓存的命中统计"""
+        return jsonify({'highlight_cache': highlight_cache.stats(),
+                        'remote_render_cache': remote_render_cache.stats()})
 
     @app.route('/api/markdown/preview', methods=['POST'])
     @login_required
     def markdown_preview():
         content = request.json.get('content', '')
+        if request.json.get('mode') == 'blocks':
+            # 分块增量预览：只返回客户端尚未持有的块
+            known = request.json.get('known') or []
+            return jsonify({'blocks': render_preview_blocks(renderer, content, known)})
         html = render_markdown(content)
         return jsonify({'html': str(html)})
 
+    # ==================== 命令行 ====================
+
+    @app.cli.command('synth-posts')
+    @click.argument('folder', required=False)
+    @click.option('--files', default=10000, show_default=True, help='生成的文章数量')
+    @click.option('--seed', default=0, show_default=True, help='随机种子')
+    @click.option('--nested', default=0.2, show_default=True, help='放入子文件夹的文章比例')
+    def synth_posts_command(folder, files, seed, nested):
+        """生成合成的 Markdown 文件树（默认写入 MARKDOWN_FOLDER）"""
+        folder = folder or app.config['MARKDOWN_FOLDER']
+        stats = generate_markdown_tree(folder, files, seed, nested)
+        click.echo(f"已在 {folder} 生成 {stats['files']} 篇文章，共 {stats['bytes'] / 1024 / 1024:.1f} MB")
+
+    @app.cli.command('synth-db')
+    @click.option('--posts', default=10000, show_default=True, help='写入的文章数量')
+    @click.option('--users', default=10, show_default=True, help='合成用户数量')
+    @click.option('--seed', default=0, show_default=True, help='随机种子')
+    def synth_db_command(posts, users, seed):
+        """直接向数据库批量写入合成的用户、分类与文章"""
+        db.create_all()
+        _upgrade_schema()
+        result = seed_database(posts, users, seed, categories=DEFAULT_CATEGORIES)
+        click.echo(f"新增用户 {result['users']} 个，分类 {result['categories']} 个，"
+                   f"文章 {result['posts']} 篇")
+
     # ==================== 错误处理 ====================
 
     @app.errorhandler(404)
@@ -663,24 +869,302 @@ def create_app(config_name='default'):
     return app
 
 
+# ==================== 预渲染 ====================
+
+def prerender_posts(app, posts):
+    """为新增或内容变更的文章预渲染 HTML、目录与字数
+
+    结果写入 render_cache 表（随调用方事务一起提交），阅读时直接读取。
+    批量导入时渲染工作分发到进程池中并行完成。
+    返回: 实际渲染的文档数
+    """
+    return prerender_contents(app, [post.content for post in posts])
+
+
+def prerender_contents(app, contents, pool=None):
+    """按正文预渲染，已有缓存的内容会被跳过，返回实际渲染的文档数
+
+    pool: 调用方持有的 ProcessPool，批量同步时各批次复用同一个进程池
+    """
+    texts = {}
+    for content in contents:
+        texts.setdefault(render_cache_key(content), content)
+    if not texts:
+        return 0
+
+    keys = list(texts)
+    existing = set()
+    for chunk in _chunks(keys):
+        rows = db.session.query(RenderCache.key).filter(RenderCache.key.in_(chunk))
+        existing.update(key for (key,) in rows)
+    missing = [key for key in keys if key not in existing]
+
+    docs = render_documents([texts[key] for key in missing],
+                            max_workers=app.config.get('RENDER_WORKERS'),
+                            min_parallel=app.config.get('RENDER_POOL_MIN_BATCH', 32),
+                            pool=pool)
+    for key, doc in zip(missing, docs):
+        db.session.add(RenderCache(key=key, **doc))
+    return len(missing)
+
+
+def _chunks(items, size=500):
+    """按固定大小切分列表，避免 IN 子句超过 SQLite 的参数上限"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# ==================== 文件同步 ====================
+
+def _slug_allocator(base=None):
+    """从数据库读出已占用的 slug 构造分配器
+
+    base 不为空时只读取 base 及 base-* 形式的 slug，单篇文章使用；
+    否则读出全部 slug，批量同步时每次同步只查询一次。
+    """
+    query = db.session.query(Post.slug)
+    if base is not None:
+        query = query.filter(db.or_(Post.slug == base, Post.slug.like(f'{base}-%')))
+    return SlugAllocator(slug for (slug,) in query)
+
+
+def _post_contents(post_ids):
+    """批量读取文章正文，返回 {id: content}"""
+    contents = {}
+    for chunk in _chunks(list(post_ids)):
+        contents.update(db.session.query(Post.id, Post.content).filter(Post.id.in_(chunk)))
+    return contents
+
+
+def _delete_render_cache(contents):
+    """批量删除给定正文对应的渲染缓存"""
+    keys = list({render_cache_key(content) for content in contents})
+    for chunk in _chunks(keys):
+        db.session.execute(delete(RenderCache).where(RenderCache.key.in_(chunk)))
+
+
+def sync_markdown_items(app, scanned, author_id=None, update_existing=True,
+                        delete_missing=False, batch_size=None, progress=None, paths=None):
+    """把扫描结果同步到数据库，自动同步、后台同步与 init_db 共用
+
+    先用少量查询预加载已有文章的路径与哈希、slug、分类和默认作者，
+    再按 batch_size（默认 SYNC_BATCH_SIZE）分批在内存中算出差异并批量插入、更新，
+    最后删除缺失的文章。scanned 可以是生成器（如 iter_markdown_folder），
+    内存占用只与批大小有关；查询次数与文件数量成正比的部分只有每批的常数次。
+    调用方负责提交事务。
+
+    update_existing: 文件内容变化时同步文章，并修正分类关联。有内容哈希时按哈希比较，
+        只有 mtime 变化（touch、git checkout、rsync）的文件不会被重写；
+        尚未记录哈希的旧数据沿用修改时间比较，并顺带补上哈希
+    delete_missing: 删除文件已不存在的文章
+    paths: 只同步这些文件路径（增量同步）。预加载只读取这些路径的文章与分类关联，
+        slug 只读取新文章可能冲突的部分；delete_missing 只删除其中不在 scanned 里的文章
+    author_id: 新文章的作者，None 表示第一个管理员
+    progress: 每批处理完后调用 progress(result, 已处理文件数)
+    返回: dict，包含 created / updated / deleted 数量，以及 skipped
+        （修改时间变新但内容未变、因而省去的重写次数）
+    """
+    result = {'created': 0, 'updated': 0, 'deleted': 0, 'skipped': 0}
+
+    # ---- 预加载 ----
+    existing_query = db.session.query(
+        Post.id, Post.file_path, Post.updated_at, Post.content_hash).filter(Post.is_from_file.is_(True))
+    if paths is None:
+        existing_rows = existing_query
+    else:
+        existing_rows = [row for chunk in _chunks(list(paths))
+                         for row in existing_query.filter(Post.file_path.in_(chunk))]
+    existing = {
+        file_path: (post_id, updated_at, stored_hash)
+        for post_id, file_path, updated_at, stored_hash in existing_rows
+    }
+    slugs = _slug_allocator() if paths is None else SlugAllocator()
+    slug_bases = set()  # 增量同步时已读入占用情况的 slug
+    categories = {name: cat_id for cat_id, name in db.session.query(Category.id, Category.name)}
+    if author_id is None:
+        admin = db.session.query(User.id).filter_by(is_admin=True).order_by(User.id).first()
+        author_id = admin[0] if admin else None
+    links = {}
+    if existing and update_existing:
+        link_query = db.session.query(post_categories.c.post_id, post_categories.c.category_id)
+        if paths is None:
+            rows = link_query.join(Post, Post.id == post_categories.c.post_id).filter(
+                Post.is_from_file.is_(True))
+        else:
+            rows = [row for chunk in _chunks([post_id for post_id, _, _ in existing.values()])
+                    for row in link_query.filter(post_categories.c.post_id.in_(chunk))]
+        for post_id, cat_id in rows:
+            links.setdefault(post_id, set()).add(cat_id)
+
+    scanned_paths = set()
+
+    def apply_batch(batch, pool):
+        # 只允许四个顶层分类，缺少的分类先创建
+        for cat_name in sorted({item['category'] for item in batch} & ALLOWED_CATEGORY_NAMES):
+            if cat_name not in categories:
+                cat = Category(name=cat_name, slug=generate_slug(cat_name))
+                db.session.add(cat)
+                db.session.flush()
+                categories[cat_name] = cat.id
+        if paths is not None:
+            # 只读出本批新文章的 slug 及其 slug-* 变体是否已被占用
+            for base in {item['slug'] for item in batch if item['file_path'] not in existing} - slug_bases:
+                slugs.taken.update(_slug_allocator(base).taken)
+                slug_bases.add(base)
+
+        # ---- 计算差异 ----
+        new_rows, new_cats, updates, hash_fills, relinks = [], [], [], [], {}
+        for item in batch:
+            cat_name = item['category']
+            cat_id = categories[cat_name] if cat_name in ALLOWED_CATEGORY_NAMES else None
+            fp = item['file_path']
+            scanned_paths.add(fp)
+            if fp in existing:
+                if not update_existing:
+                    continue
+                post_id, updated_at, stored_hash = existing[fp]
+                new_hash = item.get('content_hash', '')
+                newer = item['updated_at'] > updated_at
+                if stored_hash and new_hash:
+                    modified = stored_hash != new_hash
+                    if newer and not modified:
+                        result['skipped'] += 1
+                else:
+                    modified = newer
+                    if new_hash and not newer:
+                        # 带上原值，否则批量 UPDATE 会触发 updated_at 的 onupdate，把旧文章标成今天更新
+                        hash_fills.append({'id': post_id, 'content_hash': new_hash, 'updated_at': updated_at})
+                if modified:
+                    updates.append({
+                        'id': post_id,
+                        'title': item['title'],
+                        'content': item['content'],
+                        'summary': item['summary'],
+                        'cover_image': item['cover_image'],
+                        'content_hash': new_hash,
+                        'updated_at': item['updated_at'],
+                    })
+                # 始终确保分类关联正确
+                if cat_id is not None and cat_id not in links.get(post_id, ()):
+                    relinks[post_id] = cat_id
+            else:
+                new_rows.append({
+                    'title': item['title'],
+                    'slug': slugs.allocate(item['slug']),
+                    'content': item['content'],
+                    'summary': item['summary'],
+                    'cover_image': item['cover_image'],
+                    'is_published': True,
+                    'is_from_file': True,
+                    'file_path': fp,
+                    'content_hash': item.get('content_hash', ''),
+                    'view_count': 0,
+                    'author_id': author_id,
+                    'created_at': item['created_at'],
+                    'updated_at': item['updated_at'],
+                })
+                new_cats.append(cat_id)
+
+        # ---- 批量写入 ----
+        new_ids = {}
+        if updates:
+            old_contents = _post_contents(row['id'] for row in updates)
+            _delete_render_cache(old_contents[row['id']] for row in updates
+                                 if old_contents.get(row['id']) != row['content'])
+            db.session.execute(update(Post), updates)
+            result['updated'] += len(updates)
+        if hash_fills:
+            db.session.execute(update(Post), hash_fills)
+
+        if relinks:
+            for chunk in _chunks(list(relinks)):
+                db.session.execute(delete(post_categories).where(post_categories.c.post_id.in_(chunk)))
+            db.session.execute(insert(post_categories), [
+                {'post_id': post_id, 'category_id': cat_id} for post_id, cat_id in relinks.items()])
+
+        if new_rows:
+            # executemany 一次插入，再按 file_path 批量取回主键（SQLite 的 RETURNING 只能逐行执行）
+            db.session.execute(insert(Post), new_rows)
+            for chunk in _chunks([row['file_path'] for row in new_rows]):
+                new_ids.update((fp, post_id) for post_id, fp in db.session.query(
+                    Post.id, Post.file_path).filter(Post.is_from_file.is_(True), Post.file_path.in_(chunk)))
+            new_links = [{'post_id': new_ids[row['file_path']], 'category_id': cat_id}
+                         for row, cat_id in zip(new_rows, new_cats) if cat_id is not None]
+            if new_links:
+                db.session.execute(insert(post_categories), new_links)
+            result['created'] += len(new_rows)
+
+        # 全文索引：新建与内容变化的文章
+        search_index.replace(db.session.connection(), [
+            (row['id'], row['title'], row['summary'], row['content']) for row in updates] + [
+            (new_ids[row['file_path']], row['title'], row['summary'], row['content'])
+            for row in new_rows])
+
+        prerender_contents(app, [row['content'] for row in updates + new_rows], pool=pool)
+        # 写出本批的渲染缓存，会话不再持有这些对象，内存不随批次累积
+        db.session.flush()
+
+    batch_size = batch_size or app.config.get('SYNC_BATCH_SIZE', 500)
+    scanned = iter(scanned)
+    processed = 0
+    # 预渲染的进程池只在某批文档足够多时才启动，整次同步复用
+    with ProcessPool(app.config.get('RENDER_WORKERS')) as pool:
+        while True:
+            batch = list(islice(scanned, batch_size))
+            if not batch:
+                break
+            apply_batch(batch, pool)
+            processed += len(batch)
+            if progress is not None:
+                progress(dict(result), processed)
+
+    if delete_missing:
+        stale_ids = [post_id for fp, (post_id, _, _) in existing.items() if fp not in scanned_paths]
+        if stale_ids:
+            _delete_render_cache(_post_contents(stale_ids).values())
+            for chunk in _chunks(stale_ids):
+                db.session.execute(delete(post_categories).where(post_categories.c.post_id.in_(chunk)))
+                db.session.execute(delete(Post).where(Post.id.in_(chunk)))
+            search_index.remove(db.session.connection(), stale_ids)
+            result['deleted'] = len(stale_ids)
+
+    if result['created'] or result['deleted']:
+        invalidate_counts(db.session)
+
+    # 批量语句绕过了 ORM 的对象状态，让会话中已加载的对象重新读取
+    db.session.expire_all()
+    return result
+
+
 # ==================== 数据库初始化 ====================
 
+def _upgrade_schema():
+    """为旧数据库补齐模型中新增的列（create_all 不会修改已存在的表）"""
+    inspector = db.inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c['name'] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                col_type = column.type.compile(dialect=db.engine.dialect)
+                db.session.execute(db.text(
+                    f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+    # 全文索引表不存在时创建并填充已有文章
+    search_index.ensure(db.session.connection())
+    db.session.commit()
+
+
 def init_db(app):
     """初始化数据库，创建表和默认数据"""
     with app.app_context():
         db.create_all()
+        _upgrade_schema()
 
         # 创建默认分类
-        default_categories = [
-            {'name': '技术', 'slug': 'tech', 'icon': '💻', 'color': '#3498db', 'description': '技术文章与教程'},
-            {'name': '生活', 'slug': 'life', 'icon': '🌟', 'color': '#2ecc71', 'description': '生活随笔与感悟'},
-            {'name': '教程', 'slug': 'tutorial', 'icon': '📚', 'color': '#e74c3c', 'description': '学习教程与笔记'},
-            {'name': '项目', 'slug': 'project', 'icon': '🚀', 'color': '#9b59b6', 'description': '项目展示与记录'},
-        ]
-
-        for cat_data in default_categories:
+        for order, cat_data in enumerate(DEFAULT_CATEGORIES):
             if not Category.query.filter_by(slug=cat_data['slug']).first():
-                cat = Category(**cat_data, order=default_categories.index(cat_data))
+                cat = Category(**cat_data, order=order)
                 db.session.add(cat)
 
         db.session.commit()
@@ -688,42 +1172,12 @@ def init_db(app):
         # 自动扫描 posts 文件夹中的 Markdown 文件
         folder = app.config['MARKDOWN_FOLDER']
         if os.path.exists(folder):
-            scanned = scan_markdown_folder(folder)
-            for item in scanned:
-                if not Post.query.filter_by(file_path=item['file_path']).first():
-                    slug = item['slug']
-                    if Post.query.filter_by(slug=slug).first():
-                        slug = f"{slug}-{int(datetime.utcnow().timestamp())}"
-
-                    # 使用管理员用户或第一个用户
-                    admin = User.query.filter_by(is_admin=True).first()
-                    author_id = admin.id if admin else None
-
-                    post = Post(
-                        title=item['title'],
-                        slug=slug,
-                        content=item['content'],
-                        summary=item['summary'],
-                        cover_image=item['cover_image'],
-                        is_published=True,
-                        is_from_file=True,
-                        file_path=item['file_path'],
-                        author_id=author_id,
-                        created_at=item['created_at'],
-                        updated_at=item['updated_at']
-                    )
-                    db.session.add(post)
-
-                    # 分类（只允许四个顶层分类）
-                    cat_name = item['category']
-                    if cat_name and cat_name in ALLOWED_CATEGORY_NAMES:
-                        cat = Category.query.filter_by(name=cat_name).first()
-                        if not cat:
-                            cat = Category(name=cat_name, slug=generate_slug(cat_name))
-                            db.session.add(cat)
-                            db.session.flush()
-                        post.categories.append(cat)
-
+            # 有磁盘索引时只读取上次运行后变化过的文件
+            scanner = IncrementalScanner(folder, app.config.get('SCAN_MODE', 'serial'),
+                                         app.config.get('SCAN_WORKERS'),
+                                         index_path=app.config.get('SCAN_INDEX_PATH'))
+            scanner.scan()
+            sync_markdown_items(app, scanner.records.values(), update_existing=False)
             db.session.commit()
 
 
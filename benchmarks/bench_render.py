@@ -0,0 +1,109 @@
+"""渲染性能基准：render_markdown / generate_summary / parse_front_matter
+
+用法:
+    python -m benchmarks.bench_render                       # 运行并输出表格
+    python -m benchmarks.bench_render --output base.json    # 保存基线
+    python -m benchmarks.bench_render --compare base.json   # 与基线对比，回归时退出码为 1
+"""
+import argparse
+import os
+import sys
+
+import markdown
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Config
+from utils.highlight_cache import highlight_cache
+from utils.markdown_renderer import (MARKDOWN_EXTENSIONS, MARKDOWN_EXTENSION_CONFIGS,
+                                     MarkdownRenderer, AdaptiveMarkdownRenderer)
+from utils.markdown_scanner import parse_front_matter, generate_summary
+from benchmarks.common import (load_corpus, measure, save_results, load_results,
+                               compare_results, print_table)
+
+_EXT = 'markdown.extensions.'
+
+# 按扩展拆分的渲染管线（codehilite 需要 fenced_code 才能处理围栏代码块）
+EXTENSION_SETS = {
+    'none': [],
+    'fenced_code': [_EXT + 'fenced_code'],
+    'codehilite': [_EXT + 'fenced_code', _EXT + 'codehilite'],
+    'tables': [_EXT + 'tables'],
+    'toc': [_EXT + 'toc'],
+    'nl2br': [_EXT + 'nl2br'],
+    'sane_lists': [_EXT + 'sane_lists'],
+    'attr_list': [_EXT + 'attr_list'],
+    'meta': [_EXT + 'meta'],
+    'all': MARKDOWN_EXTENSIONS,
+}
+
+
+def make_renderer(extensions):
+    """按扩展集合创建渲染器"""
+    configs = {k: v for k, v in MARKDOWN_EXTENSION_CONFIGS.items() if k in extensions}
+    return MarkdownRenderer(lambda: markdown.Markdown(extensions=extensions,
+                                                      extension_configs=configs))
+
+
+def run(folder, scales=(1, 4), repeat=3, extension_sets=None):
+    """运行全部基准，返回 {基准名: 统计}"""
+    docs = load_corpus(folder, scales)
+    results = {}
+    for scale in scales:
+        texts = [d['text'] for d in docs if d['scale'] == scale]
+        if not texts:
+            continue
+        bodies = [parse_front_matter(t)[1] for t in texts]
+        suffix = f'[x{scale}]'
+        for name in extension_sets or EXTENSION_SETS:
+            renderer = make_renderer(EXTENSION_SETS[name])
+            results[f'render/{name}{suffix}'] = measure(renderer.render, bodies, repeat)
+        # 按文档内容挑选扩展的管线（应用默认使用）
+        results[f'render/adaptive{suffix}'] = measure(AdaptiveMarkdownRenderer().render, bodies, repeat)
+        results[f'generate_summary{suffix}'] = measure(generate_summary, bodies, repeat)
+        results[f'parse_front_matter{suffix}'] = measure(parse_front_matter, texts, repeat)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Markdown 渲染性能基准')
+    parser.add_argument('--folder', default=Config.MARKDOWN_FOLDER, help='语料目录')
+    parser.add_argument('--scales', default='1,4,16', help='合成放大倍数，逗号分隔')
+    parser.add_argument('--repeat', type=int, default=3, help='每个文档重复次数')
+    parser.add_argument('--sets', default='', help='只运行指定的扩展集合，逗号分隔')
+    parser.add_argument('--with-highlight-cache', action='store_true',
+                        help='保留代码高亮缓存（默认关闭以测量 Pygments 原始开销）')
+    parser.add_argument('--output', help='把结果保存为 JSON 基线')
+    parser.add_argument('--compare', help='与指定的 JSON 基线对比')
+    parser.add_argument('--threshold', type=float, default=0.10, help='判定回归的相对变慢比例')
+    args = parser.parse_args(argv)
+
+    scales = tuple(int(s) for s in args.scales.split(',') if s)
+    sets = [s for s in args.sets.split(',') if s] or None
+    cache_size = highlight_cache.maxsize
+    if not args.with_highlight_cache:
+        highlight_cache.resize(0)
+    try:
+        results = run(args.folder, scales, args.repeat, sets)
+    finally:
+        highlight_cache.resize(cache_size)
+    print_table(results)
+
+    if args.output:
+        save_results(args.output, results, {'folder': args.folder, 'scales': scales,
+                                            'repeat': args.repeat})
+        print(f'\n基线已保存到 {args.output}')
+
+    if args.compare:
+        regressions = compare_results(load_results(args.compare), results, args.threshold)
+        if regressions:
+            print(f'\n发现 {len(regressions)} 项超过 {args.threshold:.0%} 的回归:')
+            for r in regressions:
+                print(f"  {r['name']}: {r['baseline']} ms -> {r['current']} ms (+{r['change']:.1%})")
+            return 1
+        print('\n未发现性能回归')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
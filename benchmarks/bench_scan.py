@@ -0,0 +1,120 @@
+"""文件夹扫描性能基准：串行 / 线程池 / 进程池三种扫描方式
+
+在临时目录中用 posts/ 的真实文章生成合成文件树（默认 20000 个文件），
+分别测量 scan_markdown_folder 各模式的耗时，并校验结果与串行一致。
+
+用法:
+    python -m benchmarks.bench_scan                          # 20k 文件，输出表格
+    python -m benchmarks.bench_scan --files 5000 --modes serial,thread
+    python -m benchmarks.bench_scan --synthetic --seed 1       # 使用合成文章（可复现）
+    python -m benchmarks.bench_scan --output scan.json       # 保存基线
+    python -m benchmarks.bench_scan --compare scan.json      # 与基线对比
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Config
+from utils.markdown_scanner import ALLOWED_CATEGORIES, SCAN_MODES, scan_markdown_folder
+from utils.synthetic import generate_markdown_tree
+from benchmarks.common import (load_corpus, measure, save_results, load_results,
+                               compare_results, print_table)
+
+
+def make_tree(folder, files=20000, corpus_folder=Config.MARKDOWN_FOLDER):
+    """生成合成文件树：文章轮流取自语料，均匀分布在根目录与各分类文件夹
+
+    返回: 写入的总字节数
+    """
+    texts = [d['text'] for d in load_corpus(corpus_folder)] or ['# 示例文章\n\n正文']
+    subdirs = [''] + sorted(ALLOWED_CATEGORIES)
+    for sub in subdirs:
+        os.makedirs(os.path.join(folder, sub), exist_ok=True)
+
+    total = 0
+    for i in range(files):
+        sub = subdirs[i % len(subdirs)]
+        text = texts[i % len(texts)]
+        path = os.path.join(folder, sub, f'post-{i:05d}.md')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        total += len(text.encode('utf-8'))
+    return total
+
+
+def run(folder, files, total_bytes, repeat=3, modes=SCAN_MODES, workers=None):
+    """对每种模式扫描 repeat 次，返回 {基准名: 统计}
+
+    docs_per_second / mb_per_second 按文件数与文件大小换算。
+    """
+    expected = None
+    results = {}
+    for mode in modes:
+        scanned = []
+        stats = measure(lambda f: scanned.append(scan_markdown_folder(f, mode, workers)),
+                        [folder], repeat)
+        paths = [p['file_path'] for p in scanned[-1]]
+        if expected is None:
+            expected = paths
+        elif paths != expected:
+            raise AssertionError(f'{mode} 模式的扫描结果与 {modes[0]} 模式不一致')
+        total = stats['total_seconds']
+        stats['files'] = len(paths)
+        stats['docs_per_second'] = round(len(paths) * stats['calls'] / total, 2) if total else 0.0
+        stats['mb_per_second'] = round(total_bytes * stats['calls'] / total / 1024 / 1024, 3) if total else 0.0
+        results[f'scan/{mode}[{files}]'] = stats
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Markdown 文件夹扫描性能基准')
+    parser.add_argument('--files', type=int, default=20000, help='合成文件数量')
+    parser.add_argument('--corpus', default=Config.MARKDOWN_FOLDER, help='语料目录')
+    parser.add_argument('--modes', default=','.join(SCAN_MODES), help='扫描模式，逗号分隔')
+    parser.add_argument('--workers', type=int, default=None, help='线程 / 进程数')
+    parser.add_argument('--repeat', type=int, default=3, help='每种模式扫描次数')
+    parser.add_argument('--synthetic', action='store_true',
+                        help='用 utils.synthetic 生成文章代替语料目录')
+    parser.add_argument('--seed', type=int, default=0, help='合成文章的随机种子')
+    parser.add_argument('--tree', help='使用（或生成到）指定目录，默认使用临时目录并在结束后删除')
+    parser.add_argument('--output', help='把结果保存为 JSON 基线')
+    parser.add_argument('--compare', help='与指定的 JSON 基线对比')
+    parser.add_argument('--threshold', type=float, default=0.10, help='判定回归的相对变慢比例')
+    args = parser.parse_args(argv)
+
+    modes = tuple(m for m in args.modes.split(',') if m)
+    folder = args.tree or tempfile.mkdtemp(prefix='bench_scan_')
+    try:
+        if args.synthetic:
+            total_bytes = generate_markdown_tree(folder, args.files, args.seed)['bytes']
+        else:
+            total_bytes = make_tree(folder, args.files, args.corpus)
+        results = run(folder, args.files, total_bytes, args.repeat, modes, args.workers)
+    finally:
+        if not args.tree:
+            shutil.rmtree(folder, ignore_errors=True)
+    print_table(results)
+
+    if args.output:
+        save_results(args.output, results, {'files': args.files, 'modes': modes,
+                                            'workers': args.workers, 'repeat': args.repeat,
+                                            'synthetic': args.synthetic, 'seed': args.seed})
+        print(f'\n基线已保存到 {args.output}')
+
+    if args.compare:
+        regressions = compare_results(load_results(args.compare), results, args.threshold)
+        if regressions:
+            print(f'\n发现 {len(regressions)} 项超过 {args.threshold:.0%} 的回归:')
+            for r in regressions:
+                print(f"  {r['name']}: {r['baseline']} ms -> {r['current']} ms (+{r['change']:.1%})")
+            return 1
+        print('\n未发现性能回归')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
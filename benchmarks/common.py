@@ -0,0 +1,120 @@
+"""基准测试公共工具：语料加载、计时统计、基线保存与回归对比"""
+import json
+import os
+import platform
+import time
+from datetime import datetime
+
+
+def load_corpus(folder, scales=(1,)):
+    """加载文件夹下的全部 Markdown 文件，并生成按倍数放大的合成变体
+
+    返回: list[dict]，每项包含 name, text, scale
+    """
+    docs = []
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for filename in sorted(files):
+            if not filename.endswith(('.md', '.markdown')):
+                continue
+            path = os.path.join(root, filename)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+            except (OSError, UnicodeDecodeError):
+                continue
+            name = os.path.relpath(path, folder)
+            for scale in scales:
+                docs.append({
+                    'name': name if scale == 1 else f'{name} x{scale}',
+                    'text': text if scale == 1 else '\n\n'.join([text] * scale),
+                    'scale': scale,
+                })
+    return docs
+
+
+def percentile(samples, pct):
+    """线性插值计算百分位数"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * pct / 100.0
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+def measure(func, inputs, repeat=3):
+    """对每个输入调用 func 共 repeat 轮，返回吞吐量与延迟分布
+
+    inputs: list[str]，同时用于统计处理的字节数
+    """
+    samples = []
+    total_bytes = 0
+    for _ in range(repeat):
+        for text in inputs:
+            start = time.perf_counter()
+            func(text)
+            samples.append(time.perf_counter() - start)
+            total_bytes += len(text.encode('utf-8'))
+    total = sum(samples)
+    return {
+        'calls': len(samples),
+        'total_seconds': round(total, 6),
+        'docs_per_second': round(len(samples) / total, 2) if total else 0.0,
+        'mb_per_second': round(total_bytes / total / 1024 / 1024, 3) if total else 0.0,
+        'p50_ms': round(percentile(samples, 50) * 1000, 4),
+        'p95_ms': round(percentile(samples, 95) * 1000, 4),
+        'p99_ms': round(percentile(samples, 99) * 1000, 4),
+    }
+
+
+def save_results(path, results, meta=None):
+    """保存结果为 JSON 基线文件"""
+    payload = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'meta': meta or {},
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+
+
+def load_results(path):
+    """读取 JSON 基线文件中的结果部分"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['results']
+
+
+def compare_results(baseline, current, threshold=0.10, metric='p50_ms'):
+    """对比两次结果，返回超过阈值的回归列表
+
+    threshold 为允许的相对变慢比例（0.10 表示 10%）。
+    返回: list[dict]，每项包含 name, baseline, current, change
+    """
+    regressions = []
+    for name, stats in current.items():
+        base = baseline.get(name)
+        if not base or not base.get(metric):
+            continue
+        change = (stats[metric] - base[metric]) / base[metric]
+        if change > threshold:
+            regressions.append({
+                'name': name,
+                'baseline': base[metric],
+                'current': stats[metric],
+                'change': round(change, 4),
+            })
+    return regressions
+
+
+def print_table(results):
+    """以表格形式输出结果"""
+    header = f"{'benchmark':<40} {'docs/s':>10} {'MB/s':>8} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}"
+    print(header)
+    print('-' * len(header))
+    for name, s in results.items():
+        print(f"{name:<40} {s['docs_per_second']:>10} {s['mb_per_second']:>8} "
+              f"{s['p50_ms']:>10} {s['p95_ms']:>10} {s['p99_ms']:>10}")
@@ -15,10 +15,57 @@ class Config:
     BLOG_TITLE = 'mengfei博客'
     BLOG_SUBTITLE = '记录工作和生活的点滴'
     POSTS_PER_PAGE = 10
+    # 文章列表分页方式：cursor（按时间游标翻页，不随页码变慢）/ page（页码，OFFSET 分页）；
+    # 带 ?page= 的链接总是使用页码分页
+    PAGINATION_MODE = 'cursor'
+    # 列表总数的缓存秒数（文章增删后提交时自动失效，0 表示不缓存）
+    PAGINATION_COUNT_TTL = 60
+    # 总数缓存最多保留的查询条件数（含不同的搜索词），超出时淘汰最久未使用的
+    PAGINATION_COUNT_CACHE_SIZE = 256
 
     # Markdown 文件目录
     MARKDOWN_FOLDER = os.path.join(basedir, 'posts')
 
+    # 扫描 posts 文件夹的方式：serial / thread（线程池读取解析）/
+    # process（按块分发到进程池，子进程自行读取并解析，适合大量文件）；文件较少时总是串行
+    SCAN_MODE = 'thread'
+    SCAN_WORKERS = None
+    # 扫描索引文件：保存文件清单与解析结果，重启后只读取变化的文件（None 表示不持久化）
+    SCAN_INDEX_PATH = os.path.join(basedir, 'scan_index.json')
+    # 同步引擎每批处理的文件数（内存占用与该值成正比，与文件总数无关）
+    SYNC_BATCH_SIZE = 500
+    # 管理后台以普通表单提交同步时最多等待的秒数，超时后任务继续在后台运行
+    SYNC_FORM_WAIT = 10
+    # 同步任务状态目录：多个工作进程共享任务进度，并保证所有进程同一时间只运行一个同步
+    # （None 表示状态只保存在各自进程内，多 worker 部署时轮询可能查不到任务）
+    SYNC_JOB_DIR = os.path.join(basedir, 'sync_jobs')
+    # 编辑器新建文章时 slug 被并发占用（唯一约束冲突）后的最多尝试次数
+    SLUG_RETRIES = 3
+
+    # 后台监听 posts 文件夹（inotify，不可用时轮询），启用后请求不再触发同步
+    MARKDOWN_WATCHER = False
+    MARKDOWN_WATCHER_BACKEND = 'auto'  # auto / inotify / polling
+    MARKDOWN_WATCHER_DEBOUNCE = 0.5  # 合并连续事件的静默时间（秒）
+    MARKDOWN_WATCHER_POLL_INTERVAL = 2.0  # 轮询模式的扫描间隔（秒）
+
+    # 按文档内容只启用需要的 Markdown 扩展（输出与完整管线一致）
+    ADAPTIVE_RENDERING = True
+    # 导入时预渲染的进程数（None 表示 CPU 核数）与启用进程池的最小批量
+    RENDER_WORKERS = None
+    RENDER_POOL_MIN_BATCH = 32
+    # 代码块高亮缓存容量（条目数，0 表示禁用）
+    HIGHLIGHT_CACHE_SIZE = 1024
+    # GitHub README / 文件渲染结果的内存缓存容量（条目数，不写入数据库）
+    REMOTE_RENDER_CACHE_SIZE = 128
+
+    # 浏览计数先在进程内缓冲，距上次写回超过该秒数或累计该次数后批量写回
+    # （进程退出时也会写回；间隔为 0 表示每次浏览都立即写入）
+    VIEW_COUNT_FLUSH_INTERVAL = 5.0
+    VIEW_COUNT_FLUSH_THRESHOLD = 100
+
+    # 正文超过该字符数的文章使用流式响应（0 表示关闭，?stream=1 可强制开启）
+    STREAM_POST_MIN_SIZE = 256 * 1024
+
     # GitHub 代理配置
     GITHUB_PROXY_ENABLED = True
     GITHUB_RAW_BASE = 'https://raw.githubusercontent.com'
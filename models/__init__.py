@@ -1,6 +1,7 @@
 """数据库模型定义"""
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import defer, selectinload
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -86,6 +87,7 @@ class Post(db.Model):
     is_published = db.Column(db.Boolean, default=True)
     is_from_file = db.Column(db.Boolean, default=False)
     file_path = db.Column(db.String(500), default='')
+    content_hash = db.Column(db.String(64), default='')  # 来源文件内容的 SHA-256
     view_count = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -94,7 +96,19 @@ class Post(db.Model):
     categories = db.relationship('Category', secondary=post_categories,
                                   backref=db.backref('posts', lazy='dynamic'))
 
+    @classmethod
+    def listing_options(cls):
+        """文章列表的加载选项
+
+        列表只显示标题、摘要等卡片字段，正文（可能有几百 KB）延迟到访问时才加载；
+        列表模板和 to_dict 都会访问每篇文章的 categories 与 author，
+        各用一条批量 SELECT 预加载，否则一页 N 篇文章要额外执行 2N 条查询。
+        """
+        return (defer(cls.content), selectinload(cls.categories), selectinload(cls.author))
+
     def to_dict(self):
+        """序列化文章；列表接口应先用 listing_options() 预加载分类与作者"""
+        author = self.author
         return {
             'id': self.id,
             'title': self.title,
@@ -104,8 +118,19 @@ class Post(db.Model):
             'is_published': self.is_published,
             'is_from_file': self.is_from_file,
             'view_count': self.view_count,
-            'author': self.author.username if self.author else 'Unknown',
+            'author': author.username if author else 'Unknown',
             'categories': [c.to_dict() for c in self.categories],
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+
+
+class RenderCache(db.Model):
+    """Markdown 渲染结果缓存（按内容哈希 + 渲染配置索引）"""
+    __tablename__ = 'render_cache'
+
+    key = db.Column(db.String(64), primary_key=True)
+    html = db.Column(db.Text, nullable=False)
+    toc = db.Column(db.Text, default='')
+    word_count = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
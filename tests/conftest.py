@@ -3,8 +3,10 @@ import os
 import sys
 import shutil
 import tempfile
+from contextlib import contextmanager
 
 import pytest
+from sqlalchemy import event
 
 # 确保项目根目录在 Python 路径中
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -105,6 +107,7 @@ def db(app_full):
         _db.create_all()
         yield _db
         _db.session.rollback()
+        app_full.view_counter.flush()  # 写回缓冲的浏览计数，避免退出时写入已删除的表
         _db.drop_all()
 
 
@@ -208,6 +211,45 @@ def sample_posts(db, admin_user, sample_categories):
     return posts
 
 
+@pytest.fixture
+def authored_posts(db, sample_categories):
+    """创建 8 篇作者各不相同、分类各不相同的文章（用于检查 N+1 查询）"""
+    posts = []
+    for i in range(8):
+        user = User(username=f'author{i}', email=f'author{i}@test.com')
+        user.set_password('pass123')
+        post = Post(title=f'作者文章 {i+1}', slug=f'authored-{i+1}',
+                    content=f'第 {i+1} 篇', summary=f'摘要 {i+1}', author=user)
+        post.categories = sample_categories[:i % len(sample_categories) + 1]
+        db.session.add(post)
+        posts.append(post)
+    db.session.commit()
+    return posts
+
+
+@pytest.fixture
+def count_queries(db):
+    """返回上下文管理器，收集代码块中执行的 SQL 语句
+
+    测试客户端的请求与测试共用同一个会话，进入时先清空会话，
+    避免之前加载过的对象掩盖延迟加载产生的查询。
+    """
+    @contextmanager
+    def counter():
+        db.session.expunge_all()
+        statements = []
+
+        def before_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_execute)
+    return counter
+
+
 @pytest.fixture
 def unpublished_post(db, admin_user):
     """创建未发布的文章"""
@@ -1,7 +1,11 @@
 """管理后台路由单元测试"""
 import os
 import pytest
-from models import Post, Category, User
+from sqlalchemy.exc import OperationalError
+
+import app as app_module
+from models import Post, Category, User, RenderCache
+from utils.markdown_renderer import render_cache_key
 
 
 class TestAdminDashboard:
@@ -86,6 +90,40 @@ class TestEditor:
             post = Post.query.get(sample_post.id)
             assert post.title == '修改后的标题'
 
+    def test_create_post_duplicate_title(self, client, admin_user, auth, db, app_full):
+        """测试同名文章依次得到 -2、-3 后缀"""
+        auth.login('admin', 'admin123')
+        for _ in range(3):
+            client.post('/editor', data={'title': 'Same Title', 'content': '内容'})
+
+        with app_full.app_context():
+            slugs = sorted(p.slug for p in Post.query.filter_by(title='Same Title'))
+            assert slugs == ['same-title', 'same-title-2', 'same-title-3']
+
+    def test_create_post_slug_race(self, client, admin_user, auth, db, app_full, monkeypatch):
+        """测试 slug 被并发占用时依靠唯一约束重试"""
+        auth.login('admin', 'admin123')
+        client.post('/editor', data={'title': 'Race', 'content': '内容'})
+
+        # 第一次分配时看不到已有的 slug，模拟另一个编辑者刚刚提交
+        real_allocator = app_module._slug_allocator
+        calls = []
+
+        def stale_allocator(base=None):
+            calls.append(base)
+            if len(calls) == 1:
+                return app_module.SlugAllocator()
+            return real_allocator(base)
+
+        monkeypatch.setattr(app_module, '_slug_allocator', stale_allocator)
+        resp = client.post('/editor', data={'title': 'Race', 'content': '内容'})
+        assert resp.status_code == 302
+        assert calls == ['race', 'race']
+
+        with app_full.app_context():
+            slugs = sorted(p.slug for p in Post.query.filter_by(title='Race'))
+            assert slugs == ['race', 'race-2']
+
     def test_editor_requires_admin(self, client, normal_user, auth):
         """测试普通用户无法访问编辑器"""
         auth.login('testuser', 'test123')
@@ -106,6 +144,16 @@ class TestDeletePost:
         with app_full.app_context():
             assert Post.query.get(post_id) is None
 
+    def test_delete_post_removes_render_cache(self, client, admin_user, auth, sample_post, db):
+        """测试删除文章时一并删除其渲染缓存"""
+        client.get('/post/test-post')
+        key = render_cache_key(sample_post.content)
+        assert db.session.get(RenderCache, key) is not None
+        auth.login('admin', 'admin123')
+        client.post(f'/admin/post/delete/{sample_post.id}')
+        db.session.expire_all()
+        assert db.session.get(RenderCache, key) is None
+
     def test_delete_nonexistent_post(self, client, admin_user, auth):
         """测试删除不存在的文章"""
         auth.login('admin', 'admin123')
@@ -225,6 +273,19 @@ class TestSyncPosts:
             posts = Post.query.filter_by(is_from_file=True).all()
             assert len(posts) >= 1
 
+    def test_sync_while_running(self, client, admin_user, auth, app_full):
+        """测试已有同步任务运行时表单提交给出提示"""
+        import threading
+        release = threading.Event()
+        running, _ = app_full.sync_jobs.start(lambda job: release.wait(10))
+        try:
+            auth.login('admin', 'admin123')
+            resp = client.post('/admin/sync-posts', follow_redirects=True)
+            assert '已有同步任务正在运行' in resp.data.decode('utf-8')
+        finally:
+            release.set()
+            running.finished.wait(10)
+
     def test_sync_requires_admin(self, client, normal_user, auth):
         """测试同步需要管理员权限"""
         auth.login('testuser', 'test123')
@@ -239,3 +300,114 @@ class TestSyncPosts:
         with app_full.app_context():
             tech_cat = Category.query.filter_by(name='技术').first()
             assert tech_cat is not None
+
+    def test_sync_prerenders_posts(self, client, admin_user, auth, sample_md_files, db, app_full):
+        """测试同步时预渲染 HTML 与目录"""
+        auth.login('admin', 'admin123')
+        client.post('/admin/sync-posts', follow_redirects=True)
+
+        with app_full.app_context():
+            post = Post.query.filter_by(title='Flask 入门指南').first()
+            entry = db.session.get(RenderCache, render_cache_key(post.content))
+            assert entry is not None
+            assert 'highlight' in entry.html
+            assert '安装' in entry.toc
+            assert entry.word_count > 0
+
+
+class TestAutoSync:
+    """请求触发的增量自动同步测试"""
+
+    def _sync(self, client, app_full):
+        app_full._last_md_sync = 0
+        client.get('/login')
+
+    def test_auto_sync_creates_posts(self, client, sample_md_files, db, app_full):
+        """测试首次请求时同步文件夹中的文章"""
+        self._sync(client, app_full)
+        assert Post.query.filter_by(is_from_file=True).count() == 3
+
+    def test_auto_sync_applies_changes(self, client, sample_md_files, db, app_full):
+        """测试修改与删除文件后再次同步"""
+        self._sync(client, app_full)
+        with open(sample_md_files['general'], 'a', encoding='utf-8') as f:
+            f.write('\n新增的段落\n')
+        os.remove(sample_md_files['flask_guide'])
+        self._sync(client, app_full)
+
+        db.session.expire_all()
+        posts = Post.query.filter_by(is_from_file=True).all()
+        assert len(posts) == 2
+        general = next(p for p in posts if p.file_path == sample_md_files['general'])
+        assert '新增的段落' in general.content
+
+    def test_incremental_sync_only_affected_files(self, client, sample_md_files, db, app_full,
+                                                  monkeypatch):
+        """测试首次同步之后只把变化的文件交给同步引擎"""
+        self._sync(client, app_full)
+        calls = []
+        original = app_module.sync_markdown_items
+
+        def recording(app, scanned, **kwargs):
+            scanned = list(scanned)
+            calls.append(([item['file_path'] for item in scanned], kwargs.get('paths')))
+            return original(app, scanned, **kwargs)
+
+        monkeypatch.setattr(app_module, 'sync_markdown_items', recording)
+        with open(sample_md_files['general'], 'a', encoding='utf-8') as f:
+            f.write('\n新增的段落\n')
+        os.remove(sample_md_files['flask_guide'])
+        self._sync(client, app_full)
+
+        assert calls == [([sample_md_files['general']],
+                          {sample_md_files['general'], sample_md_files['flask_guide']})]
+        db.session.expire_all()
+        assert Post.query.filter_by(is_from_file=True).count() == 2
+        assert Post.query.filter_by(file_path=sample_md_files['flask_guide']).first() is None
+
+    def test_failed_sync_retried(self, client, sample_md_files, db, app_full, monkeypatch):
+        """测试同步写入失败后，下一次同步仍会应用文件的修改"""
+        self._sync(client, app_full)
+        with open(sample_md_files['general'], 'a', encoding='utf-8') as f:
+            f.write('\n失败后重试的段落\n')
+
+        def locked(*args, **kwargs):
+            raise OperationalError('UPDATE posts', {}, Exception('database is locked'))
+
+        monkeypatch.setattr(app_module, 'sync_markdown_items', locked)
+        self._sync(client, app_full)
+        monkeypatch.undo()
+        self._sync(client, app_full)
+        self._sync(client, app_full)
+
+        db.session.expire_all()
+        post = Post.query.filter_by(file_path=sample_md_files['general']).one()
+        assert '失败后重试的段落' in post.content
+
+    def test_unchanged_sync_skips_database(self, client, sample_md_files, db, app_full):
+        """测试文件没有变化时同步不查询、不写入文章表"""
+        from sqlalchemy import event
+        self._sync(client, app_full)
+
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            self._sync(client, app_full)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        # 页面本身只查询分类（导航栏），同步过程没有任何 SQL
+        assert not any('posts' in sql for sql in statements)
+        assert not any(sql.startswith(('INSERT', 'UPDATE', 'DELETE')) for sql in statements)
+        assert app_full.markdown_scanner.scans == 2
+
+    def test_auto_sync_writes_scan_index(self, client, sample_md_files, db, app_full, tmp_path):
+        """测试配置 SCAN_INDEX_PATH 后同步时写入扫描索引"""
+        index = tmp_path / 'scan_index.json'
+        app_full.config['SCAN_INDEX_PATH'] = str(index)
+        self._sync(client, app_full)
+        assert index.exists()
+        assert Post.query.filter_by(is_from_file=True).count() == 3
@@ -2,6 +2,9 @@
 import json
 import pytest
 
+from models import RenderCache
+from utils.github_proxy import GitHubProxy
+
 
 class TestThemeAPI:
     """主题切换 API 测试"""
@@ -74,6 +77,20 @@ class TestPostsAPI:
         assert data['posts'] == []
         assert data['total'] == 0
 
+    def test_posts_fixed_query_count(self, client, count_queries, authored_posts):
+        """测试序列化使用预加载的分类与作者，查询数与每页文章数无关"""
+        counts = []
+        for per_page in (1, 8):
+            client.get(f'/api/posts?per_page={per_page}')  # 缓存总数
+            with count_queries() as statements:
+                data = client.get(f'/api/posts?per_page={per_page}').get_json()
+            assert len(data['posts']) == per_page
+            counts.append(len(statements))
+        assert counts[0] == counts[1]
+        post = data['posts'][-1]
+        assert post['author'] == 'author0'
+        assert [c['slug'] for c in post['categories']] == ['tech']
+
     def test_posts_contain_required_fields(self, client, sample_post):
         """测试文章数据包含必要字段"""
         resp = client.get('/api/posts')
@@ -115,6 +132,24 @@ class TestMarkdownPreviewAPI:
         data = resp.get_json()
         assert 'print' in data['html']
 
+    def test_preview_blocks_mode(self, client, admin_user, auth):
+        """测试分块增量预览只返回变化的块"""
+        auth.login('admin', 'admin123')
+        resp = client.post('/api/markdown/preview',
+                          data=json.dumps({'content': '# 标题\n\n正文', 'mode': 'blocks'}),
+                          content_type='application/json')
+        blocks = resp.get_json()['blocks']
+        assert len(blocks) == 2
+        assert '标题' in blocks[0]['html']
+
+        resp = client.post('/api/markdown/preview',
+                          data=json.dumps({'content': '# 标题\n\n新正文', 'mode': 'blocks',
+                                           'known': [b['id'] for b in blocks]}),
+                          content_type='application/json')
+        patch = resp.get_json()['blocks']
+        assert 'html' not in patch[0]
+        assert '新正文' in patch[1]['html']
+
     def test_preview_empty_content(self, client, admin_user, auth):
         """测试空内容预览"""
         auth.login('admin', 'admin123')
@@ -165,7 +200,168 @@ class TestGitHubRoutes:
         resp = client.get('/api/github/user/testuser/repos')
         assert resp.status_code != 404
 
+    def test_remote_markdown_not_persisted(self, client, app_full, db, monkeypatch):
+        """测试远程 README 的渲染结果只进入有上限的内存缓存，不写数据库"""
+        monkeypatch.setattr(GitHubProxy, 'get_readme', lambda self, owner, repo, branch='main': {
+            'success': True, 'content': f'# {repo}\n\n说明'})
+        app_full.remote_render_cache.resize(3)
+        for i in range(5):
+            data = client.get(f'/api/github/readme/o/repo{i}').get_json()
+            assert f'repo{i}</h1>' in data['html']
+        client.get('/api/github/readme/o/repo4')
+        assert db.session.query(RenderCache).count() == 0
+        stats = app_full.remote_render_cache.stats()
+        assert stats['size'] == 3 and stats['hits'] == 1
+
     def test_github_file_api(self, client):
         """测试 GitHub 文件内容 API 路由存在"""
         resp = client.get('/api/github/file/owner/repo/path/to/file.py')
         assert resp.status_code != 404
+
+
+class TestRenderStatsAPI:
+    """渲染缓存统计 API 测试"""
+
+    def test_render_stats(self, client, admin_user, auth):
+        """测试管理员获取高亮缓存统计"""
+        auth.login('admin', 'admin123')
+        resp = client.get('/api/admin/render-stats')
+        assert resp.status_code == 200
+        stats = resp.get_json()['highlight_cache']
+        for field in ['hits', 'misses', 'size', 'maxsize', 'saved_seconds']:
+            assert field in stats
+
+    def test_render_stats_requires_admin(self, client, normal_user, auth):
+        """测试普通用户无法查看统计"""
+        auth.login('testuser', 'test123')
+        resp = client.get('/api/admin/render-stats')
+        assert resp.status_code == 403
+
+
+class TestSyncJobAPI:
+    """后台同步任务 API 测试"""
+
+    def _start(self, client):
+        return client.post('/admin/sync-posts', headers={'Accept': 'application/json'})
+
+    def test_start_and_poll(self, client, admin_user, auth, sample_md_files, app_full, db):
+        """测试以 JSON 方式启动同步并轮询到完成"""
+        auth.login('admin', 'admin123')
+        resp = self._start(client)
+        assert resp.status_code == 202
+        job_id = resp.get_json()['id']
+
+        assert app_full.sync_jobs.get(job_id).finished.wait(10)
+        status = client.get(f'/api/admin/sync-jobs/{job_id}').get_json()
+        assert status['phase'] == 'done'
+        assert status['running'] is False
+        assert status['total'] == status['processed'] == 3
+        assert status['elapsed'] >= 0
+        # 请求前的自动同步可能已经导入了文章，两者合计应正好导入 3 篇
+        from models import Post
+        assert Post.query.filter_by(is_from_file=True).count() == 3
+
+    def test_only_one_job_at_a_time(self, client, admin_user, auth, app_full):
+        """测试已有任务运行时返回 409 与正在运行的任务"""
+        import threading
+        release = threading.Event()
+        running, _ = app_full.sync_jobs.start(lambda job: release.wait(10))
+        try:
+            auth.login('admin', 'admin123')
+            resp = self._start(client)
+            assert resp.status_code == 409
+            assert resp.get_json()['id'] == running.id
+        finally:
+            release.set()
+            running.finished.wait(10)
+
+    def test_failed_job_reports_error(self, client, admin_user, auth, app_full):
+        """测试任务异常时状态为 failed 并带有错误信息"""
+        def boom(job):
+            raise RuntimeError('磁盘不可读')
+
+        job, _ = app_full.sync_jobs.start(boom)
+        job.finished.wait(10)
+        auth.login('admin', 'admin123')
+        status = client.get(f'/api/admin/sync-jobs/{job.id}').get_json()
+        assert status['phase'] == 'failed'
+        assert '磁盘不可读' in status['error']
+
+    def test_unknown_job(self, client, admin_user, auth):
+        """测试查询不存在的任务返回 404"""
+        auth.login('admin', 'admin123')
+        assert client.get('/api/admin/sync-jobs/nope').status_code == 404
+
+    def test_status_requires_admin(self, client, normal_user, auth):
+        """测试普通用户无法查询同步任务"""
+        auth.login('testuser', 'test123')
+        assert client.get('/api/admin/sync-jobs/nope').status_code == 403
+
+
+class TestSharedSyncJobs:
+    """多个工作进程通过共享状态目录查询同步任务"""
+
+    def test_status_visible_to_other_manager(self, tmp_path):
+        """测试另一个进程的管理器能读到任务进度与结果"""
+        import threading
+        from utils.sync_jobs import SyncJobManager
+        release = threading.Event()
+        first = SyncJobManager(state_dir=str(tmp_path))
+        second = SyncJobManager(state_dir=str(tmp_path))
+
+        def target(job):
+            job.update(phase='syncing', total=5, processed=2)
+            release.wait(10)
+
+        job, started = first.start(target)
+        try:
+            assert started
+            for _ in range(100):
+                snapshot = second.get(job.id)
+                if snapshot.phase == 'syncing':
+                    break
+                release.wait(0.05)
+            assert snapshot.running
+            assert (snapshot.total, snapshot.processed) == (5, 2)
+        finally:
+            release.set()
+            job.finished.wait(10)
+        snapshot = second.get(job.id)
+        assert snapshot.phase == 'done'
+        assert not snapshot.running
+
+    def test_one_job_across_managers(self, tmp_path):
+        """测试其他进程已有任务运行时不再启动新任务"""
+        import threading
+        from utils.sync_jobs import SyncJobManager
+        release = threading.Event()
+        first = SyncJobManager(state_dir=str(tmp_path))
+        second = SyncJobManager(state_dir=str(tmp_path))
+        job, _ = first.start(lambda job: release.wait(10))
+        try:
+            other, started = second.start(lambda job: None)
+            assert not started
+            assert other.id == job.id
+        finally:
+            release.set()
+            job.finished.wait(10)
+        other, started = second.start(lambda job: None)
+        assert started
+        assert other.finished.wait(10)
+
+    def test_stale_running_job_reported_failed(self, tmp_path):
+        """测试记录为运行中但执行进程已退出的任务按失败返回"""
+        import json
+        from utils.sync_jobs import SyncJob, SyncJobManager
+        job = SyncJob()
+        (tmp_path / f'{job.id}.json').write_text(json.dumps(job.to_state()), encoding='utf-8')
+        snapshot = SyncJobManager(state_dir=str(tmp_path)).get(job.id)
+        assert snapshot.phase == 'failed'
+        assert not snapshot.running
+
+    def test_invalid_job_id(self, tmp_path):
+        """测试任务 id 不能用来读取状态目录以外的文件"""
+        from utils.sync_jobs import SyncJobManager
+        (tmp_path / 'secret.json').write_text('{"id": "x", "running": false}', encoding='utf-8')
+        manager = SyncJobManager(state_dir=str(tmp_path / 'jobs'))
+        assert manager.get('../secret') is None
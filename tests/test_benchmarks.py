@@ -0,0 +1,118 @@
+"""基准测试工具单元测试"""
+import json
+import os
+
+import pytest
+
+from benchmarks.common import load_corpus, percentile, measure, compare_results, save_results, load_results
+from benchmarks import bench_render, bench_scan
+
+
+@pytest.fixture
+def corpus_dir(tmp_path):
+    """创建小型语料目录"""
+    folder = tmp_path / 'corpus'
+    (folder / '技术').mkdir(parents=True)
+    (folder / '技术' / 'a.md').write_text('---\ntitle: A\n---\n\n# A\n\n```bash\necho a\n```', encoding='utf-8')
+    (folder / 'b.md').write_text('| x | y |\n|---|---|\n| 1 | 2 |', encoding='utf-8')
+    (folder / 'ignore.txt').write_text('不是 Markdown', encoding='utf-8')
+    return str(folder)
+
+
+class TestCommon:
+    """公共工具测试"""
+
+    def test_percentile(self):
+        """测试百分位数插值"""
+        samples = [1, 2, 3, 4, 5]
+        assert percentile(samples, 50) == 3
+        assert percentile(samples, 0) == 1
+        assert percentile(samples, 100) == 5
+        assert percentile([], 50) == 0.0
+
+    def test_load_corpus_with_scales(self, corpus_dir):
+        """测试加载语料并生成放大变体"""
+        docs = load_corpus(corpus_dir, scales=(1, 3))
+        assert len(docs) == 4
+        scaled = [d for d in docs if d['scale'] == 3]
+        original = {d['name']: d['text'] for d in docs if d['scale'] == 1}
+        for d in scaled:
+            base = original[d['name'].rsplit(' x', 1)[0]]
+            assert len(d['text']) == len(base) * 3 + 4
+
+    def test_measure(self):
+        """测试统计字段"""
+        stats = measure(len, ['abc', 'de'], repeat=2)
+        assert stats['calls'] == 4
+        for field in ['docs_per_second', 'mb_per_second', 'p50_ms', 'p95_ms', 'p99_ms']:
+            assert field in stats
+
+    def test_compare_flags_regressions(self):
+        """测试超过阈值的变慢被标记为回归"""
+        baseline = {'a': {'p50_ms': 10.0}, 'b': {'p50_ms': 10.0}}
+        current = {'a': {'p50_ms': 10.5}, 'b': {'p50_ms': 12.0}, 'c': {'p50_ms': 1.0}}
+        regressions = compare_results(baseline, current, threshold=0.10)
+        assert [r['name'] for r in regressions] == ['b']
+        assert regressions[0]['change'] == 0.2
+
+    def test_save_and_load(self, tmp_path):
+        """测试基线文件读写"""
+        path = str(tmp_path / 'base.json')
+        save_results(path, {'a': {'p50_ms': 1.0}}, {'repeat': 1})
+        assert load_results(path) == {'a': {'p50_ms': 1.0}}
+        with open(path, encoding='utf-8') as f:
+            assert json.load(f)['meta'] == {'repeat': 1}
+
+
+class TestBenchRender:
+    """渲染基准测试"""
+
+    def test_run_by_extension_set(self, corpus_dir):
+        """测试按扩展集合输出结果"""
+        results = bench_render.run(corpus_dir, scales=(1,), repeat=1,
+                                   extension_sets=['none', 'codehilite'])
+        assert set(results) == {'render/none[x1]', 'render/codehilite[x1]', 'render/adaptive[x1]',
+                                'generate_summary[x1]', 'parse_front_matter[x1]'}
+
+    def test_main_compare_detects_regression(self, corpus_dir, tmp_path, capsys):
+        """测试对比模式在回归时返回非零退出码"""
+        base = str(tmp_path / 'base.json')
+        args = ['--folder', corpus_dir, '--scales', '1', '--repeat', '1', '--sets', 'none']
+        assert bench_render.main(args + ['--output', base]) == 0
+
+        # 把基线改成极快，当前结果必然被判定为回归
+        with open(base, encoding='utf-8') as f:
+            payload = json.load(f)
+        for stats in payload['results'].values():
+            stats['p50_ms'] = 1e-9
+        with open(base, 'w', encoding='utf-8') as f:
+            json.dump(payload, f)
+
+        assert bench_render.main(args + ['--compare', base, '--with-highlight-cache']) == 1
+        assert '回归' in capsys.readouterr().out
+
+
+class TestBenchScan:
+    """扫描基准测试"""
+
+    def test_make_tree(self, corpus_dir, tmp_path):
+        """测试按语料生成指定数量的文件"""
+        folder = str(tmp_path / 'tree')
+        total = bench_scan.make_tree(folder, files=12, corpus_folder=corpus_dir)
+        count = sum(len(files) for _, _, files in os.walk(folder))
+        assert count == 12
+        assert total > 0
+
+    def test_main(self, corpus_dir, tmp_path, capsys):
+        """测试各模式都输出结果"""
+        out = str(tmp_path / 'scan.json')
+        assert bench_scan.main(['--files', '10', '--corpus', corpus_dir, '--repeat', '1',
+                                '--modes', 'serial,thread', '--output', out]) == 0
+        assert set(load_results(out)) == {'scan/serial[10]', 'scan/thread[10]'}
+        assert 'scan/thread[10]' in capsys.readouterr().out
+
+    def test_main_synthetic(self, tmp_path, capsys):
+        """测试使用合成文章运行"""
+        assert bench_scan.main(['--files', '8', '--synthetic', '--repeat', '1',
+                                '--modes', 'serial']) == 0
+        assert 'scan/serial[8]' in capsys.readouterr().out
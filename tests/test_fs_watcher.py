@@ -0,0 +1,196 @@
+"""文件变更监听单元测试"""
+import os
+import threading
+import time
+
+import pytest
+
+import app as app_module
+from models import Post
+from utils.fs_watcher import InotifyBackend, PollingBackend, MarkdownWatcher
+
+
+def _inotify_available(path):
+    try:
+        InotifyBackend(str(path)).close()
+    except OSError:
+        return False
+    return True
+
+
+def _write(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def _collect(backend, predicate, timeout=5.0):
+    """持续读取事件直到 predicate(已收集路径) 为真或超时"""
+    seen = set()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and not predicate(seen):
+        seen |= backend.read(0.1)
+    return seen
+
+
+class TestInotifyBackend:
+    """inotify 后端测试"""
+
+    @pytest.fixture(autouse=True)
+    def _require_inotify(self, tmp_path):
+        if not _inotify_available(tmp_path):
+            pytest.skip('当前系统不支持 inotify')
+
+    def test_detects_create_and_delete(self, tmp_path):
+        """测试新建与删除 Markdown 文件都会产生事件"""
+        backend = InotifyBackend(str(tmp_path))
+        try:
+            path = str(tmp_path / 'a.md')
+            _write(path, '# A')
+            assert path in _collect(backend, lambda s: path in s)
+            os.remove(path)
+            assert path in _collect(backend, lambda s: path in s)
+        finally:
+            backend.close()
+
+    def test_ignores_other_files(self, tmp_path):
+        """测试非 Markdown 文件不产生事件"""
+        backend = InotifyBackend(str(tmp_path))
+        try:
+            _write(str(tmp_path / 'notes.txt'), 'x')
+            assert backend.read(0.2) == set()
+        finally:
+            backend.close()
+
+    def test_watches_new_subdirectories(self, tmp_path):
+        """测试新建的子目录会被递归监听"""
+        backend = InotifyBackend(str(tmp_path))
+        try:
+            sub = tmp_path / '技术'
+            sub.mkdir()
+            assert str(sub) in _collect(backend, lambda s: str(sub) in s)
+            path = str(sub / 'b.md')
+            _write(path, '# B')
+            assert path in _collect(backend, lambda s: path in s)
+        finally:
+            backend.close()
+
+
+class TestPollingBackend:
+    """轮询后端测试"""
+
+    def test_detects_changes(self, tmp_path):
+        """测试轮询能发现新增、修改与删除"""
+        existing = str(tmp_path / 'old.md')
+        _write(existing, '# 旧')
+        backend = PollingBackend(str(tmp_path), interval=0)
+
+        added = str(tmp_path / 'new.md')
+        _write(added, '# 新')
+        _write(existing, '# 旧文章，已修改')
+        assert backend.read(0) == {added, existing}
+
+        os.remove(added)
+        assert backend.read(0) == {added}
+        assert backend.read(0) == set()
+
+
+class TestMarkdownWatcher:
+    """事件合并与回调测试"""
+
+    def test_debounces_bursts(self, tmp_path):
+        """测试连续写入多个文件只触发一次回调"""
+        batches = []
+        done = threading.Event()
+
+        def callback(paths):
+            batches.append(paths)
+            done.set()
+
+        watcher = MarkdownWatcher(str(tmp_path), callback, debounce=0.3,
+                                  poll_interval=0.05, backend='polling').start()
+        try:
+            for i in range(5):
+                _write(str(tmp_path / f'{i}.md'), f'# {i}')
+            assert done.wait(5)
+            time.sleep(0.5)
+        finally:
+            watcher.stop()
+        assert len(batches) == 1
+        assert batches[0] == {str(tmp_path / f'{i}.md') for i in range(5)}
+
+    def test_initial_sync(self, tmp_path):
+        """测试 initial_sync 启动时先做一次全量回调"""
+        calls = []
+        done = threading.Event()
+        watcher = MarkdownWatcher(str(tmp_path), lambda p: (calls.append(p), done.set()),
+                                  backend='polling', initial_sync=True).start()
+        try:
+            assert done.wait(5)
+        finally:
+            watcher.stop()
+        assert calls[0] is None
+        assert not watcher.running
+
+
+class TestWatcherIntegration:
+    """应用启用文件监听后的同步测试"""
+
+    def _wait_for(self, predicate, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if predicate():
+                return True
+            time.sleep(0.05)
+        return False
+
+    def test_watcher_syncs_in_background(self, client, db, app_full, posts_dir):
+        """测试请求只负责启动监听，文件变更由后台线程同步"""
+        app_full.config.update(MARKDOWN_WATCHER=True, MARKDOWN_WATCHER_BACKEND='polling',
+                               MARKDOWN_WATCHER_DEBOUNCE=0.05,
+                               MARKDOWN_WATCHER_POLL_INTERVAL=0.05)
+        _write(os.path.join(posts_dir, 'first.md'), '# 第一篇')
+        try:
+            client.get('/login')
+            assert app_full.markdown_watcher.running
+
+            def count():
+                with app_full.app_context():
+                    return Post.query.filter_by(is_from_file=True).count()
+
+            assert self._wait_for(lambda: count() == 1)
+            _write(os.path.join(posts_dir, 'second.md'), '# 第二篇')
+            assert self._wait_for(lambda: count() == 2)
+            # 请求线程不再触发扫描
+            scans = app_full.markdown_scanner.scans
+            app_full._last_md_sync = 0
+            client.get('/login')
+            assert app_full.markdown_scanner.scans == scans
+        finally:
+            app_full.markdown_watcher.stop()
+
+    def test_start_not_blocked_by_running_sync(self, client, admin_user, auth, app_full,
+                                                posts_dir, monkeypatch):
+        """测试同步正在进行时，启动监听的请求不必等待同步完成"""
+        release = threading.Event()
+        original = app_module.sync_markdown_items
+
+        def slow_sync(*args, **kwargs):
+            release.wait(10)
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(app_module, 'sync_markdown_items', slow_sync)
+        auth.login('admin', 'admin123')
+        resp = client.post('/admin/sync-posts', headers={'Accept': 'application/json'})
+        job = app_full.sync_jobs.get(resp.get_json()['id'])
+        app_full.config.update(MARKDOWN_WATCHER=True, MARKDOWN_WATCHER_BACKEND='polling')
+        request_thread = threading.Thread(target=client.get, args=('/login',), daemon=True)
+        try:
+            request_thread.start()
+            request_thread.join(2)
+            assert not request_thread.is_alive()
+            assert app_full.markdown_watcher.running
+        finally:
+            release.set()
+            job.finished.wait(10)
+            request_thread.join(10)
+            app_full.markdown_watcher.stop()
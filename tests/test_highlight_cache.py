@@ -0,0 +1,98 @@
+"""代码块高亮缓存单元测试"""
+import pytest
+from markdown.extensions import codehilite, fenced_code
+
+from utils.highlight_cache import LRUCache, CachedCodeHilite, highlight_cache
+from utils.markdown_renderer import MarkdownRenderer
+
+
+@pytest.fixture
+def cache():
+    """每个测试前清空共享缓存"""
+    highlight_cache.clear()
+    yield highlight_cache
+    highlight_cache.clear()
+
+
+class TestLRUCache:
+    """LRU 缓存测试"""
+
+    def test_get_miss_and_hit(self):
+        """测试未命中与命中计数"""
+        c = LRUCache(maxsize=2)
+        assert c.get('a') is None
+        c.put('a', '<pre>a</pre>', 0.5)
+        assert c.get('a') == '<pre>a</pre>'
+        stats = c.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['saved_seconds'] == 0.5
+
+    def test_lru_eviction(self):
+        """测试超出容量时淘汰最久未使用的条目"""
+        c = LRUCache(maxsize=2)
+        c.put('a', 'A')
+        c.put('b', 'B')
+        c.get('a')
+        c.put('c', 'C')
+        assert c.get('b') is None
+        assert c.get('a') == 'A'
+        assert c.get('c') == 'C'
+
+    def test_resize(self):
+        """测试缩小容量时立即淘汰"""
+        c = LRUCache(maxsize=3)
+        for k in 'abc':
+            c.put(k, k)
+        c.resize(1)
+        assert c.stats()['size'] == 1
+        assert c.get('c') == 'c'
+
+    def test_zero_size_disables(self):
+        """测试容量为 0 时不缓存"""
+        c = LRUCache(maxsize=0)
+        c.put('a', 'A')
+        assert c.get('a') is None
+
+
+class TestCachedCodeHilite:
+    """带缓存的 CodeHilite 测试"""
+
+    def test_installed_for_extensions(self):
+        """测试 fenced_code 与 codehilite 扩展都使用缓存版本"""
+        assert codehilite.CodeHilite is CachedCodeHilite
+        assert fenced_code.CodeHilite is CachedCodeHilite
+
+    def test_output_unchanged(self, cache):
+        """测试缓存命中前后输出一致"""
+        renderer = MarkdownRenderer()
+        text = '```yaml\nnetwork:\n  version: 2\n```\n\n    indented = True'
+        first = renderer.render(text)
+        second = renderer.render(text)
+        assert first == second
+        assert cache.stats()['hits'] == 2
+
+    def test_shared_across_documents(self, cache):
+        """测试不同文章中相同的代码块共享缓存"""
+        renderer = MarkdownRenderer()
+        block = '```bash\nnmcli device status\n```'
+        renderer.render(f'# 文章一\n\n{block}')
+        renderer.render(f'# 文章二\n\n正文\n\n{block}')
+        stats = cache.stats()
+        assert stats['misses'] == 1
+        assert stats['hits'] == 1
+
+    def test_language_is_part_of_key(self, cache):
+        """测试语言不同的相同代码分别缓存"""
+        renderer = MarkdownRenderer()
+        renderer.render('```bash\necho 1\n```')
+        renderer.render('```python\necho 1\n```')
+        assert cache.stats()['misses'] == 2
+
+    def test_options_are_part_of_key(self, cache):
+        """测试 Pygments 选项不同时不复用缓存"""
+        code = 'print(1)'
+        a = CachedCodeHilite(code, lang='python', css_class='highlight').hilite()
+        b = CachedCodeHilite(code, lang='python', css_class='other').hilite()
+        assert a != b
+        assert cache.stats()['misses'] == 2
@@ -0,0 +1,352 @@
+"""Markdown 渲染工具单元测试"""
+import glob
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.markdown_renderer import (
+    MARKDOWN_EXTENSIONS,
+    AdaptiveMarkdownRenderer,
+    MarkdownRenderer,
+    count_words,
+    create_markdown,
+    iter_html_sections,
+    iter_rendered_sections,
+    render_cache_key,
+    render_document,
+    render_documents,
+    render_preview_blocks,
+    required_extensions,
+    split_blocks,
+    split_sections
+)
+from utils.highlight_cache import highlight_cache
+from utils.markdown_scanner import parse_front_matter
+from utils.process_pool import ProcessPool
+
+POSTS_DIR = os.path.join(os.path.dirname(__file__), '..', 'posts')
+
+
+class TestRenderCacheKey:
+    """渲染缓存键测试"""
+
+    def test_same_content_same_key(self):
+        """测试相同内容得到相同的键"""
+        assert render_cache_key('# 标题') == render_cache_key('# 标题')
+
+    def test_different_content_different_key(self):
+        """测试不同内容得到不同的键"""
+        assert render_cache_key('# 标题') != render_cache_key('# 标题2')
+
+    def test_key_length(self):
+        """测试键为 sha256 十六进制串"""
+        assert len(render_cache_key('')) == 64
+
+
+class TestCreateMarkdown:
+    """Markdown 实例创建测试"""
+
+    def test_code_highlight(self):
+        """测试代码块使用 highlight 样式类"""
+        md = create_markdown()
+        html = md.convert('```python\nprint(1)\n```')
+        assert 'class="highlight"' in html
+
+
+class TestMarkdownRenderer:
+    """线程安全渲染器测试"""
+
+    def test_render(self):
+        """测试基本渲染"""
+        renderer = MarkdownRenderer()
+        html = renderer.render('# 标题\n\n**加粗**')
+        assert '<h1 id="_1">标题</h1>' in html
+        assert '<strong>加粗</strong>' in html
+
+    def test_reuses_instance_within_thread(self):
+        """测试同一线程复用同一个 Markdown 实例"""
+        created = []
+
+        def factory():
+            md = create_markdown()
+            created.append(md)
+            return md
+
+        renderer = MarkdownRenderer(factory)
+        renderer.render('a')
+        renderer.render('b')
+        assert len(created) == 1
+
+    def test_separate_instance_per_thread(self):
+        """测试不同线程使用不同的 Markdown 实例"""
+        instances = set()
+        lock = threading.Lock()
+
+        def factory():
+            md = create_markdown()
+            with lock:
+                instances.add(id(md))
+            return md
+
+        renderer = MarkdownRenderer(factory)
+        threads = [threading.Thread(target=renderer.render, args=('x',)) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(instances) == 4
+
+    @pytest.mark.slow
+    def test_concurrent_render_stress(self):
+        """压力测试：多线程并发渲染不同文档，输出与串行渲染一致"""
+        docs = []
+        for i in range(40):
+            docs.append(
+                f'# 文档 {i}\n\n'
+                f'| 列 | 值 |\n|----|----|\n| id | {i} |\n\n'
+                f'```python\nvalue_{i} = {i} * 2\n```\n\n'
+                + '\n'.join(f'- 条目 {i}-{j}' for j in range(20))
+            )
+        expected = [create_markdown().convert(d) for d in docs]
+
+        renderer = MarkdownRenderer()
+        jobs = docs * 10
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(renderer.render, jobs))
+
+        for i, html in enumerate(results):
+            assert html == expected[i % len(docs)]
+
+
+class TestRenderDocument:
+    """整篇文档渲染测试"""
+
+    def test_html_and_toc(self):
+        """测试返回 HTML 与目录"""
+        doc = render_document('# 第一章\n\n内容\n\n## 第一节\n\n更多内容')
+        assert '<h1 id=' in doc['html']
+        assert 'class="toc"' in doc['toc']
+        assert '第一节' in doc['toc']
+
+    def test_no_headings_empty_toc(self):
+        """测试没有标题时目录为空串"""
+        doc = render_document('只有一段文字。')
+        assert doc['toc'] == ''
+
+    def test_word_count(self):
+        """测试字数统计"""
+        doc = render_document('# 标题\n\nhello world 你好')
+        assert doc['word_count'] == 6
+
+    def test_count_words_ignores_tags(self):
+        """测试字数统计忽略 HTML 标签"""
+        assert count_words('<p class="x">abc</p>') == 1
+
+
+class TestRenderDocuments:
+    """批量渲染测试"""
+
+    def test_serial_for_small_batch(self):
+        """测试小批量串行渲染"""
+        docs = render_documents(['# a', '# b'])
+        assert [d['html'] for d in docs] == ['<h1 id="a">a</h1>', '<h1 id="b">b</h1>']
+
+    @pytest.mark.slow
+    def test_process_pool_matches_serial(self):
+        """测试进程池渲染结果与串行一致且保持顺序"""
+        texts = [f'# 文档 {i}\n\n```bash\necho {i}\n```' for i in range(12)]
+        parallel = render_documents(texts, max_workers=2, min_parallel=0)
+        serial = [render_document(t) for t in texts]
+        assert parallel == serial
+
+    @pytest.mark.slow
+    def test_shared_spawn_pool(self):
+        """测试传入的进程池被复用，且使用 spawn 方式启动子进程"""
+        texts = [f'# 文档 {i}' for i in range(4)]
+        with ProcessPool(2) as pool:
+            first = render_documents(texts, min_parallel=0, pool=pool)
+            executor = pool._executor
+            second = render_documents(texts, min_parallel=0, pool=pool)
+            assert pool._executor is executor
+            assert executor._mp_context.get_start_method() == 'spawn'
+        assert first == second == [render_document(t) for t in texts]
+        assert pool._executor is None
+
+    @pytest.mark.slow
+    def test_lock_held_by_other_thread(self):
+        """测试其他线程持有高亮缓存锁时，进程池渲染不会卡住"""
+        texts = [f'```python\nprint({i})\n```' for i in range(4)]
+        result = []
+        with highlight_cache._lock:
+            worker = threading.Thread(target=lambda: result.extend(
+                render_documents(texts, max_workers=2, min_parallel=0)))
+            worker.start()
+            worker.join(timeout=120)
+        assert not worker.is_alive()
+        assert len(result) == 4
+
+
+class TestSplitBlocks:
+    """顶层块切分测试"""
+
+    def test_split_on_blank_lines(self):
+        """测试按空行切分段落"""
+        assert split_blocks('# 标题\n\n段落一\n\n\n段落二') == ['# 标题', '段落一', '段落二']
+
+    def test_fenced_code_kept_together(self):
+        """测试围栏代码块内部空行不切分"""
+        text = '```bash\necho 1\n\necho 2\n```\n\n后文'
+        assert split_blocks(text) == ['```bash\necho 1\n\necho 2\n```', '后文']
+
+    def test_loose_list_merged(self):
+        """测试空行分隔的列表项合并为一块"""
+        text = '- 一\n\n- 二\n\n    续行'
+        assert split_blocks(text) == ['- 一\n\n- 二\n\n    续行']
+
+    def test_empty_text(self):
+        """测试空文档"""
+        assert split_blocks('') == []
+
+
+class TestRenderPreviewBlocks:
+    """分块预览渲染测试"""
+
+    def test_blocks_match_full_render(self):
+        """测试各块 HTML 拼接后与整篇渲染一致（忽略块间空白）"""
+        renderer = MarkdownRenderer()
+        text = '段落\n\n- 一\n\n- 二\n\n```python\nx = 1\n\ny = 2\n```\n\n| a | b |\n|---|---|\n| 1 | 2 |'
+        blocks = render_preview_blocks(renderer, text)
+        joined = ''.join(b['html'] for b in blocks)
+        assert re.sub(r'>\s+<', '><', joined) == re.sub(r'>\s+<', '><', renderer.render(text))
+
+    def test_known_blocks_omit_html(self):
+        """测试客户端已持有的块不重复返回 HTML"""
+        renderer = MarkdownRenderer()
+        first = render_preview_blocks(renderer, '段落一\n\n段落二')
+        second = render_preview_blocks(renderer, '段落一\n\n段落二改', known=[b['id'] for b in first])
+        assert second[0]['id'] == first[0]['id']
+        assert 'html' not in second[0]
+        assert second[1]['html'] == '<p>段落二改</p>'
+
+    def test_colon_paragraph_not_meta(self):
+        """测试非首块中 "键: 值" 形式的段落不会被当作元数据吞掉"""
+        renderer = MarkdownRenderer()
+        blocks = render_preview_blocks(renderer, '开头\n\nNote: 注意事项')
+        assert blocks[1]['html'] == '<p>Note: 注意事项</p>'
+
+    def test_reference_links_across_blocks(self):
+        """测试引用式链接定义在其他块时仍能解析"""
+        renderer = MarkdownRenderer()
+        blocks = render_preview_blocks(renderer, '见 [文档][doc]\n\n[doc]: https://example.com')
+        assert 'href="https://example.com"' in blocks[0]['html']
+
+
+class TestSections:
+    """分章节流式渲染测试"""
+
+    def test_split_at_top_level_headings(self):
+        """测试在一、二级标题处切分"""
+        text = '# 标题\n\n引言\n\n## 一\n\n### 小节\n\n内容\n\n## 二\n\n结尾'
+        assert split_sections(text) == ['# 标题\n\n引言\n', '## 一\n\n### 小节\n\n内容\n', '## 二\n\n结尾']
+
+    def test_hash_inside_fence_not_split(self):
+        """测试围栏代码块中的 # 注释不作为切分点"""
+        text = '## 脚本\n\n```bash\n\n# 注释\necho 1\n```'
+        assert len(split_sections(text)) == 1
+
+    def test_sections_match_full_render(self):
+        """测试分章节渲染结果与整篇渲染一致（包括重复标题的 id）"""
+        text = '# 说明\n\n正文\n\n## 步骤\n\n一\n\n## 步骤\n\n二\n\n## 说明\n\n三'
+        full = MarkdownRenderer().render(text)
+        sections = list(iter_rendered_sections(text))
+        assert len(sections) == 4
+        assert re.sub(r'\s+', '', ''.join(sections)) == re.sub(r'\s+', '', full)
+
+    def test_split_cached_html(self):
+        """测试已渲染的 HTML 在一、二级标题处分段，拼接后与原文相同"""
+        html = MarkdownRenderer().render('引言\n\n# 一\n\n### 小节\n\n## 二\n\n```\n<h2>代码</h2>\n```')
+        sections = list(iter_html_sections(html))
+        assert ''.join(sections) == html
+        assert len(sections) == 3
+        assert sections[1].startswith('<h1') and sections[2].startswith('<h2')
+
+
+def _corpus_documents():
+    """posts/ 下的真实文章（原文与去掉 front matter 的正文）"""
+    docs = []
+    for path in sorted(glob.glob(os.path.join(POSTS_DIR, '**', '*.md'), recursive=True)):
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        docs.append(pytest.param(text, id=os.path.relpath(path, POSTS_DIR)))
+        docs.append(pytest.param(parse_front_matter(text)[1],
+                                 id=os.path.relpath(path, POSTS_DIR) + ':body'))
+    return docs
+
+
+class TestRequiredExtensions:
+    """文档预扫描测试"""
+
+    def _short(self, text):
+        return {ext.rsplit('.', 1)[1] for ext in required_extensions(text)}
+
+    def test_plain_paragraph(self):
+        """测试纯文本段落不需要任何扩展"""
+        assert self._short('只有一行文字。') == set()
+
+    def test_code_block(self):
+        """测试围栏代码块需要 fenced_code 与 codehilite"""
+        assert {'fenced_code', 'codehilite'} <= self._short('正文\n\n```bash\nls\n```')
+
+    def test_indented_code(self):
+        """测试缩进代码块需要 codehilite"""
+        assert 'codehilite' in self._short('正文\n\n    code')
+
+    def test_table_heading_list(self):
+        """测试表格、标题、列表分别触发对应扩展"""
+        exts = self._short('正文\n\n# 标题\n\n| a | b |\n|---|---|\n\n- 列表')
+        assert {'tables', 'toc', 'sane_lists', 'nl2br'} <= exts
+
+    def test_meta_first_line(self):
+        """测试首行形如 "键: 值" 时保留 meta"""
+        assert 'meta' in self._short('Title: 标题\n\n正文')
+        assert 'meta' not in self._short('正文\n\nTitle: 标题')
+
+    def test_order_follows_full_pipeline(self):
+        """测试返回顺序与完整扩展列表一致"""
+        exts = required_extensions('Title: x\n\n# h\n\n```\ncode\n```\n\n{: .a}')
+        assert list(exts) == [e for e in MARKDOWN_EXTENSIONS if e in exts]
+
+
+class TestAdaptiveMarkdownRenderer:
+    """自适应扩展管线测试"""
+
+    @pytest.mark.parametrize('text', _corpus_documents())
+    def test_identical_to_full_pipeline_on_corpus(self, text):
+        """测试 posts/ 语料上的输出与完整管线逐字节一致"""
+        assert AdaptiveMarkdownRenderer().render(text) == MarkdownRenderer().render(text)
+
+    @pytest.mark.parametrize('text', [
+        'Title: x\n\nbody', '---\n横线开头', '\n空行开头', '第一行\n第二行', 'Setext\n===',
+        '> 引用\n> ---', '1) 有序', '段落 {: .cls}', '\t制表符代码', '表格 | 竖线',
+        '[TOC]\n\n# 目录', '* * *', '<div>\n*x*\n</div>', '转义 \\| 竖线',
+        'para\n\n  \tcode\n', ' \tcode', 'Title\n=-=\n', 'Title\n-=-\n',
+        '> 引用\n>\n>     引用内的代码', '- 列表\n\n        列表内的代码',
+        '<div>a</div>-=-<div>b\n\n*', 'x =`y`\n\n<div><</div>|<div>|z',
+    ])
+    def test_identical_on_edge_cases(self, text):
+        """测试容易误判的构造仍与完整管线一致"""
+        assert AdaptiveMarkdownRenderer().render(text) == MarkdownRenderer().render(text)
+
+    def test_render_document_identical(self):
+        """测试目录与字数也与完整管线一致"""
+        text = '# 标题\n\n正文'
+        assert AdaptiveMarkdownRenderer().render_document(text) == MarkdownRenderer().render_document(text)
+
+    def test_prepared_instances_cached(self):
+        """测试同一扩展组合复用已初始化的实例"""
+        renderer = AdaptiveMarkdownRenderer()
+        assert renderer._instance('纯文本') is renderer._instance('另一段纯文本')
+        assert renderer._instance('纯文本') is not renderer._instance('# 标题')
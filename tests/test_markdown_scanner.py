@@ -1,14 +1,27 @@
 """Markdown 扫描工具单元测试"""
 import os
+import re
+import random
 import pytest
 
+from datetime import datetime
+
 from utils.markdown_scanner import (
     parse_front_matter,
+    read_front_matter,
+    content_hash,
     generate_slug,
     generate_summary,
     scan_markdown_folder,
-    get_categories_from_folder
+    get_categories_from_folder,
+    parse_markdown_files,
+    iter_markdown_files,
+    iter_markdown_folder,
+    MarkdownRecord,
+    SlugAllocator,
+    IncrementalScanner
 )
+import utils.markdown_scanner as scanner_module
 
 
 class TestParseFrontMatter:
@@ -81,6 +94,81 @@ DATE: 2026-01-01
         assert body == content or metadata == {}
 
 
+    def test_dashes_in_value_and_body(self):
+        """测试值中与正文中的 --- 不会被当作结束标记"""
+        content = "---\ntitle: A---B\n---\n\n第一段\n\n---\n\n第二段\n"
+        metadata, body = parse_front_matter(content)
+        assert metadata == {'title': 'A---B'}
+        assert body == "第一段\n\n---\n\n第二段"
+
+
+class TestReadFrontMatter:
+    """带类型的 front matter 解析测试"""
+
+    CONTENT = """---
+title: 2026-01-01
+date: 2026-01-01
+updated: 2026-02-03 08:30
+tags: python, flask
+aliases: [a, "b c"]
+draft: true
+pinned: no
+series:
+  - 第一篇
+  - 第二篇
+---
+
+# 正文
+"""
+
+    def test_typed_values(self):
+        """测试列表、日期与布尔值"""
+        metadata, _ = read_front_matter(self.CONTENT)
+        assert metadata['title'] == '2026-01-01'
+        assert metadata['date'] == datetime(2026, 1, 1)
+        assert metadata['updated'] == datetime(2026, 2, 3, 8, 30)
+        assert metadata['tags'] == ['python', 'flask']
+        assert metadata['aliases'] == ['a', 'b c']
+        assert metadata['draft'] is True
+        assert metadata['pinned'] is False
+        assert metadata['series'] == ['第一篇', '第二篇']
+
+    def test_invalid_date_kept_as_string(self):
+        """测试无法识别的日期保留原文"""
+        metadata, _ = read_front_matter("---\ndate: 2026-13-45\n---\n正文")
+        assert metadata['date'] == '2026-13-45'
+
+    def test_body_offset(self):
+        """测试返回正文起始偏移而不是正文副本"""
+        metadata, offset = read_front_matter(self.CONTENT)
+        assert self.CONTENT[offset:].startswith('# 正文')
+        assert read_front_matter("# 标题\n正文") == ({}, 0)
+        assert read_front_matter("---\ntitle: 没有结束标记") == ({}, 0)
+
+    def test_memoized_by_hash(self, monkeypatch):
+        """测试相同内容哈希不再重复解析"""
+        digest = content_hash(self.CONTENT)
+        first, offset = read_front_matter(self.CONTENT, digest)
+        calls = []
+        monkeypatch.setattr(scanner_module, '_parse_meta',
+                            lambda *args: calls.append(args) or {})
+        second, second_offset = read_front_matter(self.CONTENT, digest)
+        assert calls == []
+        assert second == first and second_offset == offset
+
+        # 返回的是副本，修改不影响缓存
+        second['tags'].append('changed')
+        assert read_front_matter(self.CONTENT, digest)[0]['tags'] == ['python', 'flask']
+
+    def test_cache_is_bounded(self, monkeypatch):
+        """测试缓存条目数有上限"""
+        monkeypatch.setattr(scanner_module, 'FRONT_MATTER_CACHE_SIZE', 3)
+        for i in range(10):
+            text = f"---\ntitle: {i}\n---\n正文"
+            read_front_matter(text, content_hash(text))
+        assert len(scanner_module._front_matter_cache) <= 3
+
+
 class TestGenerateSlug:
     """slug 生成测试"""
 
@@ -126,6 +214,32 @@ class TestGenerateSlug:
         assert not slug.endswith('-')
 
 
+class TestSlugAllocator:
+    """slug 分配测试"""
+
+    def test_sequential_suffixes(self):
+        """测试冲突时依次追加 -2、-3"""
+        slugs = SlugAllocator(['post'])
+        assert [slugs.allocate('post') for _ in range(3)] == ['post-2', 'post-3', 'post-4']
+        assert slugs.allocate('other') == 'other'
+
+    def test_skips_taken_suffixes(self):
+        """测试跳过已被占用的带序号 slug"""
+        slugs = SlugAllocator(['post', 'post-2', 'post-3'])
+        assert slugs.allocate('post') == 'post-4'
+        assert slugs.allocate('post-2') == 'post-2-2'
+        assert 'post-4' in slugs
+
+    def test_deterministic(self):
+        """测试相同的已占用集合与顺序得到相同结果"""
+        names = ['a', 'b', 'a', 'a-2', 'a']
+        runs = []
+        for _ in range(2):
+            allocator = SlugAllocator(['a'])
+            runs.append([allocator.allocate(n) for n in names])
+        assert runs[0] == runs[1] == ['a-2', 'b', 'a-3', 'a-2-2', 'a-4']
+
+
 class TestGenerateSummary:
     """摘要生成测试"""
 
@@ -185,6 +299,95 @@ class TestGenerateSummary:
         assert 'img.png' not in summary
 
 
+def reference_summary(content, max_length=200):
+    """原先的多次 re.sub 实现，作为单遍摘要提取的对照"""
+    text = re.sub(r'#+ ', '', content)
+    text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)
+    text = re.sub(r'[*_`~]', '', text)
+    text = re.sub(r'!\[.*?\]\(.*?\)', '', text)
+    text = re.sub(r'\n+', ' ', text)
+    text = text.strip()
+    if len(text) > max_length:
+        return text[:max_length] + '...'
+    return text
+
+
+class TestSummaryEquivalence:
+    """单遍摘要提取与原实现输出一致"""
+
+    CASES = [
+        '',
+        '   \n\n  ',
+        '# 标题\n\n正文内容',
+        '## C# 入门\n正文',
+        '请访问 [我的网站](https://example.com) 了解更多。',
+        '[多行\n链接](http://x) 之后',
+        '[**加粗链接**](http://x)',
+        '[**](http://x)\n\n下一段',
+        '文字 ![图片](img.png) 更多文字',
+        '前 ![](img.png) 后',
+        '![](a.png)\n![](b.png)\n正文',
+        '[![badge](https://img.shields.io/x.svg)](https://ci.example.com) 项目说明',
+        '感叹号！和 ! 号 ![x]() 结尾',
+        '第一行\n**\n**\n第二行',
+        '行尾空格  \n  行首空格',
+        '`code` 与 ~~删除线~~ 和 _斜体_',
+        '```python\nprint("hi")\n```\n',
+        '\t缩进\t\n\u3000全角空格\u3000',
+        '未闭合的 [链接 与 ![图片',
+    ]
+
+    @pytest.mark.parametrize('content', CASES)
+    @pytest.mark.parametrize('max_length', [0, 1, 5, 20, 200])
+    def test_cases(self, content, max_length):
+        """测试典型与边界内容"""
+        assert generate_summary(content, max_length) == reference_summary(content, max_length)
+
+    @pytest.mark.parametrize('max_length', [9, 10, 11])
+    def test_truncate_boundary_whitespace(self, max_length):
+        """测试截断位置附近只剩空白时不追加省略号"""
+        content = 'x' * 10 + '   \n\n '
+        assert generate_summary(content, max_length) == reference_summary(content, max_length)
+        content = 'x' * 10 + '   \n\n y'
+        assert generate_summary(content, max_length) == reference_summary(content, max_length)
+
+    def test_random_documents(self):
+        """测试随机拼接的 Markdown 片段"""
+        pieces = ['# 标题\n', '## Sub ', '正文', 'text ', '**粗体**', '[链接](http://x)',
+                  '![](img.png)', '![图](a.png)', '\n', '\n\n', ' ', '`code`', '~~删~~',
+                  '[![badge](b.svg)](http://l)', '- item\n', '_斜_', '!', '\t',
+                  '[多\n行](u)', '**\n**', '```py\nx=1\n```\n']
+        rng = random.Random(2026)
+        for _ in range(2000):
+            content = ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 40)))
+            for max_length in (1, 20, 200):
+                assert generate_summary(content, max_length) == reference_summary(content, max_length)
+
+    def test_posts_corpus(self):
+        """测试仓库自带的文章"""
+        base = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'posts')
+        for path, _category in iter_markdown_files(base):
+            with open(path, 'r', encoding='utf-8') as f:
+                _, body = parse_front_matter(f.read())
+            for max_length in (50, 200, 10 ** 6):
+                assert generate_summary(body, max_length) == reference_summary(body, max_length), path
+
+    def test_stops_early(self, monkeypatch):
+        """测试收集到足够字符后不再继续扫描"""
+        consumed = []
+        original = scanner_module._summary_fragments
+
+        def counting(content):
+            for fragment in original(content):
+                consumed.append(len(fragment))
+                yield fragment
+
+        monkeypatch.setattr(scanner_module, '_summary_fragments', counting)
+        content = '**第一段** 正文。\n' * 50000
+        assert generate_summary(content, 20) == reference_summary(content, 20)
+        assert sum(consumed) < 100
+
+
 class TestScanMarkdownFolder:
     """Markdown 文件夹扫描测试"""
 
@@ -210,6 +413,17 @@ class TestScanMarkdownFolder:
         assert flask_post['title'] == 'Flask 入门指南'
         assert flask_post['summary'] == '一篇 Flask 入门教程'
 
+    def test_typed_front_matter(self, posts_dir):
+        """测试列表形式的标签与带时间的日期"""
+        os.makedirs(os.path.join(posts_dir, '技术'), exist_ok=True)
+        path = os.path.join(posts_dir, '技术', 'typed.md')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("---\ntitle: 类型\ndate: 2026-03-04 05:06\ntags: [a, b]\n---\n正文")
+        post = scan_markdown_folder(posts_dir)[0]
+        assert post['tags'] == ['a', 'b']
+        assert post['created_at'] == datetime(2026, 3, 4, 5, 6)
+        assert post['content'] == '正文'
+
     def test_category_from_folder(self, sample_md_files, posts_dir):
         """测试从文件夹名获取分类"""
         posts = scan_markdown_folder(posts_dir)
@@ -261,6 +475,266 @@ class TestScanMarkdownFolder:
             assert posts[i]['created_at'] >= posts[i+1]['created_at']
 
 
+class TestParallelScan:
+    """并行读取与解析测试"""
+
+    @pytest.fixture
+    def many_files(self, posts_dir):
+        for i, sub in enumerate(['', '技术', '生活', '其他'] * 5):
+            folder = os.path.join(posts_dir, sub)
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, f'post-{i}.md'), 'w', encoding='utf-8') as f:
+                f.write(f'---\ntitle: 文章 {i}\ndate: 2026-01-{i + 1:02d}\n---\n\n# 标题 {i}\n\n正文')
+        return posts_dir
+
+    @pytest.mark.parametrize('mode', ['thread', 'process'])
+    def test_same_result_as_serial(self, many_files, mode):
+        """测试并行模式的结果与顺序和串行一致"""
+        entries = [(fp, cat, None) for fp, cat in iter_markdown_files(many_files)]
+        serial = parse_markdown_files(entries)
+        parallel = parse_markdown_files(entries, mode, workers=2, min_parallel=1)
+        assert parallel == serial
+        assert len(serial) == 15
+
+    def test_scan_folder_modes(self, many_files):
+        """测试 scan_markdown_folder 各模式返回相同的文件顺序"""
+        serial = [p['file_path'] for p in scan_markdown_folder(many_files)]
+        threaded = [p['file_path'] for p in scan_markdown_folder(many_files, 'thread', 4)]
+        assert threaded == serial
+
+    def test_unreadable_file_is_none(self, posts_dir):
+        """测试读取失败的文件对应 None"""
+        missing = os.path.join(posts_dir, 'missing.md')
+        assert parse_markdown_files([(missing, '未分类', None)] * 2, 'thread', min_parallel=1) == [None, None]
+
+    def test_unknown_mode(self):
+        """测试未知的扫描模式"""
+        with pytest.raises(ValueError):
+            parse_markdown_files([], 'gpu')
+
+
+class TestIterMarkdownFolder:
+    """流式扫描测试"""
+
+    def test_same_records_as_scan(self, sample_md_files, posts_dir):
+        """测试产出的记录与 scan_markdown_folder 内容一致"""
+        full = {p['file_path']: p for p in scan_markdown_folder(posts_dir)}
+        records = list(iter_markdown_folder(posts_dir, batch_size=2))
+        assert len(records) == len(full)
+        for record in records:
+            expected = full[record['file_path']]
+            assert isinstance(record, MarkdownRecord)
+            for key in MarkdownRecord.FIELDS + ('content', 'raw_content'):
+                assert record[key] == expected[key]
+
+    def test_content_not_kept(self, sample_md_files, posts_dir):
+        """测试记录默认不保留正文，访问时从文件读取"""
+        record = next(iter_markdown_folder(posts_dir))
+        assert record._content is None and record._raw_content is None
+        with open(record.file_path, 'a', encoding='utf-8') as f:
+            f.write('\n后来追加')
+        assert record.content.endswith('后来追加')
+
+    def test_front_matter_changed_after_scan(self, tmp_path):
+        """测试扫描后 front matter 变长，正文仍按新内容截取"""
+        path = tmp_path / 'a.md'
+        path.write_text('---\ntitle: t\n---\nbody one', encoding='utf-8')
+        record = next(iter_markdown_folder(str(tmp_path)))
+        assert record.content == 'body one'
+        path.write_text('---\ntitle: a longer title here\nsummary: s\n---\nbody two',
+                        encoding='utf-8')
+        assert record.content == 'body two'
+
+    def test_include_raw(self, sample_md_files, posts_dir):
+        """测试 include_raw 保留正文与原文"""
+        record = next(iter_markdown_folder(posts_dir, include_raw=True))
+        assert record._raw_content is not None
+        assert record.get('raw_content').startswith(record._raw_content[:10])
+        assert record.get('missing', 'x') == 'x'
+
+    def test_is_lazy(self, sample_md_files, posts_dir, monkeypatch):
+        """测试生成器按批读取文件"""
+        calls = []
+        original = scanner_module.parse_markdown_file
+
+        def counting(*args, **kwargs):
+            calls.append(args[0])
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(scanner_module, 'parse_markdown_file', counting)
+        records = iter_markdown_folder(posts_dir, batch_size=1)
+        next(records)
+        assert len(calls) == 1
+
+    def test_nonexistent_folder(self, tmp_path):
+        """测试文件夹不存在时不产出任何记录"""
+        assert list(iter_markdown_folder(str(tmp_path / 'missing'))) == []
+
+
+class TestIncrementalScanner:
+    """基于 stat 清单的增量扫描测试"""
+
+    def _count_parses(self, monkeypatch):
+        calls = []
+        original = scanner_module.parse_markdown_file
+
+        def counting(*args, **kwargs):
+            calls.append(args[0])
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(scanner_module, 'parse_markdown_file', counting)
+        return calls
+
+    def test_first_scan_adds_all(self, sample_md_files, posts_dir):
+        """测试首次扫描所有文件均为新增，结果与全量扫描一致"""
+        scanner = IncrementalScanner(posts_dir)
+        diff = scanner.scan()
+        assert len(diff.added) == 3
+        assert not diff.changed and not diff.removed
+        full = scan_markdown_folder(posts_dir)
+        assert [p['file_path'] for p in scanner.posts()] == [p['file_path'] for p in full]
+
+    def test_unchanged_scan_reads_nothing(self, sample_md_files, posts_dir, monkeypatch):
+        """测试没有变化时只做 stat，不读取任何文件"""
+        scanner = IncrementalScanner(posts_dir)
+        scanner.scan()
+        calls = self._count_parses(monkeypatch)
+        diff = scanner.scan()
+        assert not diff
+        assert calls == []
+
+    def test_changed_file_reparsed(self, sample_md_files, posts_dir, monkeypatch):
+        """测试只重新解析内容变化的文件"""
+        scanner = IncrementalScanner(posts_dir)
+        scanner.scan()
+        path = os.path.join(posts_dir, 'general.md')
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('\n追加的一段内容\n')
+        calls = self._count_parses(monkeypatch)
+
+        diff = scanner.scan()
+        assert diff.changed == {path}
+        assert not diff.added and not diff.removed
+        assert calls == [path]
+        assert '追加的一段内容' in scanner.records[path]['content']
+
+    def test_touch_is_not_a_change(self, sample_md_files, posts_dir):
+        """测试只更新修改时间的文件不计入 changed"""
+        scanner = IncrementalScanner(posts_dir)
+        scanner.scan()
+        path = sample_md_files['general']
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        assert not scanner.scan()
+        assert scanner.manifest[path][1] == st.st_mtime_ns + 10**9
+
+    def test_added_and_removed(self, sample_md_files, posts_dir):
+        """测试新增与删除的文件分别出现在 added 与 removed 中"""
+        scanner = IncrementalScanner(posts_dir)
+        scanner.scan()
+        old = os.path.join(posts_dir, 'general.md')
+        os.remove(old)
+        new = os.path.join(posts_dir, 'new.md')
+        with open(new, 'w', encoding='utf-8') as f:
+            f.write('# 新文章')
+
+        diff = scanner.scan()
+        assert diff.added == {new}
+        assert diff.removed == {old}
+        assert old not in scanner.records and old not in scanner.manifest
+        assert len(scanner.posts()) == 3
+
+    def test_scan_given_paths(self, sample_md_files, posts_dir, monkeypatch):
+        """测试只检查给定路径，删除的目录会移除其下所有文件"""
+        scanner = IncrementalScanner(posts_dir)
+        scanner.scan()
+        new = os.path.join(posts_dir, 'new.md')
+        with open(new, 'w', encoding='utf-8') as f:
+            f.write('# 新文章')
+        calls = self._count_parses(monkeypatch)
+
+        diff = scanner.scan([new])
+        assert diff.added == {new}
+        assert calls == [new]
+
+        life_dir = os.path.join(posts_dir, '生活')
+        for name in os.listdir(life_dir):
+            os.remove(os.path.join(life_dir, name))
+        os.rmdir(life_dir)
+        diff = scanner.scan([life_dir])
+        assert diff.removed == {sample_md_files['daily_notes']}
+
+    def test_nonexistent_folder(self, tmp_path):
+        """测试文件夹不存在时返回空结果"""
+        scanner = IncrementalScanner(str(tmp_path / 'missing'))
+        assert not scanner.scan()
+        assert scanner.posts() == []
+
+
+class TestScanIndex:
+    """磁盘扫描索引测试"""
+
+    def _count_parses(self, monkeypatch):
+        calls = []
+        original = scanner_module.parse_markdown_file
+
+        def counting(*args, **kwargs):
+            calls.append(args[0])
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(scanner_module, 'parse_markdown_file', counting)
+        return calls
+
+    def test_restart_reads_nothing(self, sample_md_files, posts_dir, tmp_path, monkeypatch):
+        """测试新进程从索引恢复后，未变化的文件不再读取"""
+        index = str(tmp_path / 'index.json')
+        first = IncrementalScanner(posts_dir, index_path=index)
+        first.scan()
+        assert os.path.exists(index)
+
+        calls = self._count_parses(monkeypatch)
+        second = IncrementalScanner(posts_dir, index_path=index)
+        assert not second.scan()
+        assert calls == []
+        assert len(second.records) == 3
+        for path, record in first.records.items():
+            restored = second.records[path]
+            for field in MarkdownRecord.FIELDS:
+                assert restored[field] == record[field]
+        assert second.records[sample_md_files['general']].content == \
+            first.records[sample_md_files['general']].content
+
+    def test_restart_picks_up_changes(self, sample_md_files, posts_dir, tmp_path, monkeypatch):
+        """测试进程停止期间修改、删除的文件在恢复后被识别"""
+        index = str(tmp_path / 'index.json')
+        IncrementalScanner(posts_dir, index_path=index).scan()
+        with open(sample_md_files['general'], 'a', encoding='utf-8') as f:
+            f.write('\n停机期间的修改\n')
+        os.remove(sample_md_files['daily_notes'])
+
+        calls = self._count_parses(monkeypatch)
+        diff = IncrementalScanner(posts_dir, index_path=index).scan()
+        assert diff.changed == {sample_md_files['general']}
+        assert diff.removed == {sample_md_files['daily_notes']}
+        assert calls == [sample_md_files['general']]
+
+    @pytest.mark.parametrize('payload', ['not json', '{"version": 0, "files": {}}'])
+    def test_invalid_index_ignored(self, sample_md_files, posts_dir, tmp_path, payload):
+        """测试损坏或版本不符的索引被忽略，重新全量扫描后覆盖"""
+        index = tmp_path / 'index.json'
+        index.write_text(payload, encoding='utf-8')
+        scanner = IncrementalScanner(posts_dir, index_path=str(index))
+        assert scanner.records == {}
+        assert len(scanner.scan().added) == 3
+        assert len(IncrementalScanner(posts_dir, index_path=str(index)).records) == 3
+
+    def test_other_folder_ignored(self, sample_md_files, posts_dir, tmp_path):
+        """测试索引属于其他文件夹时不使用"""
+        index = str(tmp_path / 'index.json')
+        IncrementalScanner(posts_dir, index_path=index).scan()
+        assert IncrementalScanner(str(tmp_path), index_path=index).records == {}
+
+
 class TestGetCategoriesFromFolder:
     """文件夹分类获取测试"""
 
@@ -0,0 +1,172 @@
+"""游标分页单元测试"""
+from datetime import datetime
+
+import pytest
+
+from models import Post
+from utils.pagination import (encode_cursor, decode_cursor, paginate_by_cursor,
+                              CountCache, NEXT, PREV)
+
+
+def walk(client, url, key='next_cursor'):
+    """沿着游标翻完所有页，返回每页的文章 slug 列表"""
+    pages = []
+    while url:
+        data = client.get(url).get_json()
+        pages.append([p['slug'] for p in data['posts']])
+        url = f"/api/posts?per_page=3&cursor={data[key]}" if data[key] else None
+    return pages
+
+
+class TestCursor:
+    """游标编码测试"""
+
+    def test_round_trip(self):
+        """测试编码后可以还原，且游标中不含明文"""
+        ts = datetime(2025, 3, 1, 12, 30, 15, 123456)
+        cursor = encode_cursor(NEXT, ts, 42)
+        assert '2025' not in cursor and '=' not in cursor
+        assert decode_cursor(cursor) == (NEXT, ts, 42)
+
+    @pytest.mark.parametrize('cursor', ['', 'abc', '!!!', encode_cursor(PREV, datetime(2025, 1, 1), 1)[:-2],
+                                        'WyJ4IiwiMjAyNS0wMS0wMVQwMDowMDowMCIsMV0'])
+    def test_invalid_cursor(self, cursor):
+        """测试格式错误或方向未知的游标"""
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+class TestPaginateByCursor:
+    """键集分页测试"""
+
+    def test_forward_and_backward(self, db, sample_posts):
+        """测试向后翻完所有页再翻回来，顺序与 created_at desc, id desc 一致"""
+        expected = [p.id for p in sorted(sample_posts, key=lambda p: (p.created_at, p.id),
+                                         reverse=True)]
+        query = Post.query.order_by(Post.created_at.desc())
+
+        pages, cursor = [], None
+        while True:
+            page = paginate_by_cursor(query, cursor, per_page=3)
+            pages.append(page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        assert [p.id for page in pages for p in page.items] == expected
+        assert [len(page.items) for page in pages] == [3, 3, 2]
+        assert not pages[0].has_prev and pages[-1].has_prev
+
+        back = paginate_by_cursor(query, pages[-1].prev_cursor, per_page=3)
+        assert [p.id for p in back.items] == [p.id for p in pages[1].items]
+        assert back.has_next and back.has_prev
+        first = paginate_by_cursor(query, back.prev_cursor, per_page=3)
+        assert [p.id for p in first.items] == [p.id for p in pages[0].items]
+        assert not first.has_prev
+
+    def test_same_timestamp_uses_id(self, db, admin_user):
+        """测试 created_at 相同的文章按 id 分页，不重复也不遗漏"""
+        ts = datetime(2025, 1, 1)
+        for i in range(5):
+            db.session.add(Post(title=f't{i}', slug=f't{i}', content='x', created_at=ts,
+                                author_id=admin_user.id))
+        db.session.commit()
+        first = paginate_by_cursor(Post.query, per_page=2)
+        second = paginate_by_cursor(Post.query, first.next_cursor, per_page=2)
+        third = paginate_by_cursor(Post.query, second.next_cursor, per_page=2)
+        slugs = [p.slug for page in (first, second, third) for p in page.items]
+        assert slugs == ['t4', 't3', 't2', 't1', 't0']
+        assert not third.has_next
+
+
+class TestCountCache:
+    """总数缓存测试"""
+
+    def test_cached_until_post_added(self, db, admin_user):
+        """测试总数被缓存，新增文章提交后失效"""
+        cache = CountCache(ttl=60)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return Post.query.count()
+
+        assert cache.get('all', compute) == 0
+        assert cache.get('all', compute) == 0
+        assert len(calls) == 1
+        db.session.add(Post(title='a', slug='a', content='x', author_id=admin_user.id))
+        db.session.commit()
+        assert cache.get('all', compute) == 1
+        assert len(calls) == 2
+
+    def test_bounded_and_expired(self, monkeypatch):
+        """测试条目数不超过 maxsize，过期条目在写入时被清除"""
+        clock = [0.0]
+        monkeypatch.setattr('utils.pagination.time.monotonic', lambda: clock[0])
+        cache = CountCache(ttl=10, maxsize=3)
+        for i in range(5):
+            cache.get(('posts', None, f'q{i}'), lambda: i)
+        assert len(cache) == 3
+        assert cache.get(('posts', None, 'q0'), lambda: 'recomputed') == 'recomputed'
+
+        clock[0] = 20
+        cache.get('fresh', lambda: 1)
+        assert len(cache) == 1
+
+    def test_search_totals_bounded(self, client, app_full, sample_posts):
+        """测试大量不同的搜索词不会让缓存无限增长"""
+        app_full.count_cache.maxsize = 20
+        for i in range(50):
+            assert '共 0 篇' in client.get(f'/?q=word{i}').data.decode('utf-8')
+        assert len(app_full.count_cache) == 20
+
+
+class TestCursorRoutes:
+    """列表页面与 API 的游标分页测试"""
+
+    def test_api_cursor_walk(self, client, sample_posts):
+        """测试 API 沿 next_cursor 翻页，最后一页没有 next_cursor"""
+        pages = walk(client, '/api/posts?per_page=3')
+        assert [len(p) for p in pages] == [3, 3, 2]
+        assert len({slug for page in pages for slug in page}) == 8
+
+        first = client.get('/api/posts?per_page=3').get_json()
+        assert first['has_next'] and not first['has_prev']
+        assert first['prev_cursor'] is None
+        assert first['total'] == 8 and first['pages'] == 3
+
+    def test_api_without_total(self, client, sample_posts):
+        """测试 ?total=0 不返回总数"""
+        data = client.get('/api/posts?total=0').get_json()
+        assert 'total' not in data and 'pages' not in data
+        assert len(data['posts']) == 8
+
+    def test_api_page_numbers(self, client, sample_posts):
+        """测试 ?page= 仍然使用页码分页"""
+        data = client.get('/api/posts?page=3&per_page=3').get_json()
+        assert data['current_page'] == 3
+        assert len(data['posts']) == 2
+        assert 'next_cursor' not in data
+
+    def test_invalid_cursor(self, client, sample_posts):
+        """测试无效游标返回 400"""
+        assert client.get('/api/posts?cursor=bogus').status_code == 400
+        assert client.get('/?cursor=bogus').status_code == 400
+
+    def test_index_cursor_links(self, client, sample_posts):
+        """测试首页默认显示游标翻页链接，按链接可以翻到下一页"""
+        data = client.get('/').data.decode('utf-8')
+        assert 'cursor=' in data and 'page=' not in data
+        cursor = data.split('cursor=')[1].split('"')[0]
+        data = client.get(f'/?cursor={cursor}').data.decode('utf-8')
+        assert '上一页' in data and '下一页' not in data
+
+    def test_index_page_mode(self, client, app_full, sample_posts):
+        """测试配置为页码模式时显示页码"""
+        app_full.config['PAGINATION_MODE'] = 'page'
+        data = client.get('/').data.decode('utf-8')
+        assert 'page=2' in data and 'cursor=' not in data
+
+    def test_category_count(self, client, sample_posts):
+        """测试分类页显示缓存的文章总数"""
+        data = client.get('/category/tech').data.decode('utf-8')
+        assert '共 3 篇文章' in data
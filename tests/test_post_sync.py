@@ -0,0 +1,211 @@
+"""文件同步引擎单元测试"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from app import sync_markdown_items
+from models import Post, Category, RenderCache
+from utils.markdown_renderer import render_cache_key
+from utils.markdown_scanner import content_hash
+from utils.process_pool import ProcessPool
+
+
+def make_item(i, category='技术', updated_at=None, content=None, slug=None):
+    """构造与 scan_markdown_folder 输出一致的条目"""
+    content = content or f'# 文章 {i}\n\n正文 {i}'
+    return {
+        'title': f'文章 {i}',
+        'slug': slug or f'post-{i}',
+        'content': content,
+        'raw_content': content,
+        'summary': f'摘要 {i}',
+        'cover_image': '',
+        'category': category,
+        'tags': [],
+        'file_path': f'/posts/{category}/{i}.md',
+        'content_hash': content_hash(content),
+        'created_at': datetime(2026, 1, 1),
+        'updated_at': updated_at or datetime(2026, 1, 2),
+    }
+
+
+@pytest.fixture
+def serial_render(app_full):
+    """同步测试中预渲染不启用进程池"""
+    app_full.config['RENDER_WORKERS'] = 1
+
+
+class TestSyncMarkdownItems:
+    """批量同步测试"""
+
+    def test_creates_posts_with_categories(self, db, app_full, admin_user, serial_render):
+        """测试新增文章、分类关联、作者与预渲染"""
+        items = [make_item(1), make_item(2, category='生活'), make_item(3, category='其他')]
+        result = sync_markdown_items(app_full, items)
+        db.session.commit()
+
+        assert result == {'created': 3, 'updated': 0, 'deleted': 0, 'skipped': 0}
+        post = Post.query.filter_by(slug='post-2').first()
+        assert post.is_from_file and post.author_id == admin_user.id
+        assert [c.name for c in post.categories] == ['生活']
+        assert Post.query.filter_by(slug='post-3').first().categories == []
+        assert Category.query.filter_by(name='其他').first() is None
+        assert db.session.get(RenderCache, render_cache_key(post.content)) is not None
+
+    def test_updates_changed_posts(self, db, app_full, admin_user, serial_render):
+        """测试文件更新后同步内容，旧渲染缓存失效"""
+        sync_markdown_items(app_full, [make_item(1)])
+        db.session.commit()
+        old_key = render_cache_key(make_item(1)['content'])
+
+        changed = make_item(1, updated_at=datetime(2026, 2, 1), content='# 新内容')
+        result = sync_markdown_items(app_full, [changed])
+        db.session.commit()
+
+        assert result['updated'] == 1
+        post = Post.query.filter_by(slug='post-1').first()
+        assert post.content == '# 新内容'
+        assert db.session.get(RenderCache, old_key) is None
+        assert db.session.get(RenderCache, render_cache_key('# 新内容')) is not None
+
+    def test_touched_file_skipped(self, db, app_full, admin_user, serial_render):
+        """测试只有修改时间变化的文件不会被重写"""
+        sync_markdown_items(app_full, [make_item(1)])
+        db.session.commit()
+        touched = make_item(1, updated_at=datetime(2026, 3, 1))
+        result = sync_markdown_items(app_full, [touched])
+        assert result['updated'] == 0
+        assert result['skipped'] == 1
+        assert Post.query.filter_by(slug='post-1').first().updated_at == datetime(2026, 1, 2)
+
+    def test_changed_hash_with_older_mtime(self, db, app_full, admin_user, serial_render):
+        """测试内容变化时即使修改时间更早也会同步（如 git checkout 旧版本）"""
+        sync_markdown_items(app_full, [make_item(1)])
+        db.session.commit()
+        older = make_item(1, updated_at=datetime(2025, 1, 1), content='# 旧版本')
+        assert sync_markdown_items(app_full, [older])['updated'] == 1
+        post = Post.query.filter_by(slug='post-1').first()
+        assert post.content == '# 旧版本'
+        assert post.content_hash == content_hash('# 旧版本')
+
+    def test_backfills_missing_hash(self, db, app_full, admin_user, serial_render):
+        """测试旧数据没有哈希时按修改时间比较，并补上哈希"""
+        sync_markdown_items(app_full, [make_item(1)])
+        db.session.commit()
+        Post.query.filter_by(slug='post-1').update({'content_hash': '', 'updated_at': datetime(2026, 1, 2)})
+        db.session.commit()
+
+        result = sync_markdown_items(app_full, [make_item(1)])
+        db.session.commit()
+        db.session.expire_all()
+        assert result['updated'] == 0
+        post = Post.query.filter_by(slug='post-1').first()
+        assert post.content_hash == make_item(1)['content_hash']
+        # 补哈希不算更新，不能把更新时间改成今天
+        assert post.updated_at == datetime(2026, 1, 2)
+
+    def test_relinks_category(self, db, app_full, admin_user, serial_render):
+        """测试文件移动到其他分类文件夹后修正分类关联"""
+        sync_markdown_items(app_full, [make_item(1)])
+        db.session.commit()
+        moved = make_item(1)
+        moved['category'] = '教程'
+        sync_markdown_items(app_full, [moved])
+        db.session.commit()
+        post = Post.query.filter_by(slug='post-1').first()
+        assert [c.name for c in post.categories] == ['教程']
+
+    def test_delete_missing(self, db, app_full, admin_user, serial_render):
+        """测试 delete_missing 删除文件已不存在的文章"""
+        sync_markdown_items(app_full, [make_item(1), make_item(2)])
+        db.session.commit()
+        result = sync_markdown_items(app_full, [make_item(1)], delete_missing=True)
+        db.session.commit()
+        assert result['deleted'] == 1
+        assert Post.query.filter_by(slug='post-2').first() is None
+        assert db.session.get(RenderCache, render_cache_key(make_item(2)['content'])) is None
+
+    def test_scoped_to_paths(self, db, app_full, admin_user, serial_render):
+        """测试指定 paths 时只处理这些文件，其余文章不动，新 slug 仍不冲突"""
+        sync_markdown_items(app_full, [make_item(1), make_item(2), make_item(3)])
+        db.session.commit()
+        removed = make_item(2)['file_path']
+        clash = make_item(4, slug='post-1')
+        result = sync_markdown_items(app_full, [clash], delete_missing=True,
+                                     paths={clash['file_path'], removed})
+        db.session.commit()
+        assert result == {'created': 1, 'updated': 0, 'deleted': 1, 'skipped': 0}
+        assert {p.slug for p in Post.query.all()} == {'post-1', 'post-3', 'post-1-2'}
+
+    def test_keep_existing(self, db, app_full, admin_user, serial_render):
+        """测试 update_existing=False 只导入新文件"""
+        sync_markdown_items(app_full, [make_item(1)])
+        db.session.commit()
+        changed = make_item(1, updated_at=datetime(2026, 2, 1), content='# 新内容')
+        result = sync_markdown_items(app_full, [changed, make_item(2)], update_existing=False)
+        assert result == {'created': 1, 'updated': 0, 'deleted': 0, 'skipped': 0}
+        assert Post.query.filter_by(slug='post-1').first().content != '# 新内容'
+
+    def test_duplicate_slugs(self, db, app_full, admin_user, sample_post, serial_render):
+        """测试 slug 冲突时生成不重复的 slug"""
+        items = [make_item(i, slug='test-post') for i in range(3)]
+        sync_markdown_items(app_full, items)
+        db.session.commit()
+        slugs = [p.slug for p in Post.query.all()]
+        assert len(slugs) == len(set(slugs)) == 4
+        assert set(slugs) == {'test-post', 'test-post-2', 'test-post-3', 'test-post-4'}
+
+    def test_slug_suffix_across_syncs(self, db, app_full, admin_user, serial_render):
+        """测试后续同步在已有的序号之后继续分配"""
+        sync_markdown_items(app_full, [make_item(i, slug='same') for i in range(2)])
+        db.session.commit()
+        sync_markdown_items(app_full, [make_item(i, slug='same') for i in range(2, 4)])
+        db.session.commit()
+        slugs = sorted(p.slug for p in Post.query.all())
+        assert slugs == ['same', 'same-2', 'same-3', 'same-4']
+
+    def test_batches_match_single_pass(self, db, app_full, admin_user, serial_render):
+        """测试分批同步与一次同步结果一致，并能消费生成器"""
+        items = [make_item(i, category=['技术', '生活'][i % 2]) for i in range(7)]
+        result = sync_markdown_items(app_full, iter(items), batch_size=2)
+        db.session.commit()
+        assert result['created'] == 7
+        assert Post.query.count() == 7
+        assert Category.query.filter_by(name='生活').first().posts.count() == 3
+
+        result = sync_markdown_items(app_full, iter(items[:3]), batch_size=2, delete_missing=True)
+        assert result['deleted'] == 4
+
+    def test_render_pool_shared_across_batches(self, db, app_full, admin_user, monkeypatch):
+        """测试一次同步的所有批次复用同一个预渲染进程池"""
+        pools = []
+
+        def fake_map(pool, fn, items, chunksize=None):
+            pools.append(pool)
+            return [fn(item) for item in items]
+
+        monkeypatch.setattr(ProcessPool, 'map', fake_map)
+        app_full.config.update(RENDER_WORKERS=2, RENDER_POOL_MIN_BATCH=2)
+        sync_markdown_items(app_full, [make_item(i) for i in range(6)], batch_size=3)
+        assert len(pools) == 2 and pools[0] is pools[1]
+
+    def test_query_count_independent_of_size(self, db, app_full, admin_user, serial_render):
+        """测试 SQL 语句数量不随文件数量增长"""
+        def count_statements(items):
+            statements = []
+
+            def record(conn, cursor, statement, *args):
+                statements.append(statement)
+
+            event.listen(db.engine, 'before_cursor_execute', record)
+            try:
+                sync_markdown_items(app_full, items, delete_missing=True)
+                db.session.commit()
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', record)
+            return len(statements)
+
+        small = count_statements([make_item(i) for i in range(5)])
+        large = count_statements([make_item(i) for i in range(305)])
+        assert large <= small + 2
@@ -1,5 +1,7 @@
 """页面路由单元测试"""
 import pytest
+from models import Post, RenderCache
+from utils.markdown_renderer import render_cache_key
 
 
 class TestIndexPage:
@@ -63,10 +65,11 @@ class TestPostPage:
         data = resp.data.decode('utf-8')
         assert '测试文章' in data
 
-    def test_view_post_increments_view_count(self, client, sample_post, db):
-        """测试查看文章增加浏览计数"""
+    def test_view_post_increments_view_count(self, app_full, client, sample_post, db):
+        """测试查看文章增加浏览计数（写回缓冲区后生效）"""
         assert sample_post.view_count == 0
         client.get('/post/test-post')
+        app_full.view_counter.flush()
         db.session.refresh(sample_post)
         assert sample_post.view_count == 1
 
@@ -110,6 +113,46 @@ class TestCategoryPage:
         assert '测试文章' in data
 
 
+class TestListingQueries:
+    """列表页查询数量测试：分类与作者预加载，查询数不随每页文章数增加"""
+
+    def page_queries(self, app_full, client, count_queries, url, per_page):
+        app_full.config['POSTS_PER_PAGE'] = per_page
+        client.get(url)  # 先触发自动同步
+        with count_queries() as statements:
+            resp = client.get(url)
+        assert resp.status_code == 200
+        return len(statements)
+
+    @pytest.mark.parametrize('url', ['/', '/category/tech', '/?q=作者文章'])
+    def test_fixed_query_count(self, app_full, client, count_queries, authored_posts, url):
+        """测试一页 1 篇与一页 8 篇执行的查询数相同"""
+        one = self.page_queries(app_full, client, count_queries, url, 1)
+        many = self.page_queries(app_full, client, count_queries, url, 8)
+        assert one == many
+        assert many <= 6
+
+    @pytest.mark.parametrize('url', ['/', '/category/tech', '/?q=作者文章', '/api/posts', '/admin'])
+    def test_content_not_loaded(self, client, auth, admin_user, count_queries, authored_posts, url):
+        """测试列表查询不读取正文列"""
+        auth.login()
+        with count_queries() as statements:
+            resp = client.get(url)
+        assert resp.status_code == 200
+        assert any('FROM posts' in s for s in statements)
+        assert not any('posts.content AS' in s for s in statements)
+
+    def test_admin_recent_posts(self, client, auth, admin_user, count_queries, authored_posts):
+        """测试管理后台最近文章不逐篇加载分类"""
+        auth.login()
+        client.get('/admin')
+        with count_queries() as statements:
+            resp = client.get('/admin')
+        assert resp.status_code == 200
+        assert '作者文章 8' in resp.data.decode('utf-8')
+        assert sum('post_categories' in s for s in statements) == 1
+
+
 class TestErrorPages:
     """错误页面测试"""
 
@@ -123,3 +166,115 @@ class TestErrorPages:
         auth.login(username='testuser', password='test123')
         resp = client.get('/admin')
         assert resp.status_code == 403
+
+
+class TestRenderCache:
+    """文章渲染缓存测试"""
+
+    def test_view_post_fills_cache(self, client, sample_post, db):
+        """测试首次访问文章后写入渲染缓存"""
+        client.get('/post/test-post')
+        entry = db.session.get(RenderCache, render_cache_key(sample_post.content))
+        assert entry is not None
+        assert '<h1' in entry.html
+
+    def test_view_post_uses_cache(self, client, sample_post, db):
+        """测试再次访问文章时直接使用缓存的 HTML"""
+        key = render_cache_key(sample_post.content)
+        db.session.add(RenderCache(key=key, html='<p>缓存中的内容</p>'))
+        db.session.commit()
+
+        resp = client.get('/post/test-post')
+        assert '缓存中的内容' in resp.data.decode('utf-8')
+
+    def test_editor_save_refreshes_cache(self, client, admin_user, auth, sample_post, db):
+        """测试编辑器保存后旧缓存失效、新内容预先渲染"""
+        auth.login('admin', 'admin123')
+        client.get('/post/test-post')
+        old_key = render_cache_key(sample_post.content)
+        assert db.session.get(RenderCache, old_key) is not None
+
+        client.post(f'/editor?id={sample_post.id}', data={
+            'title': '测试文章',
+            'content': '# 新内容',
+            'is_published': 'on'
+        })
+        db.session.expire_all()
+        assert db.session.get(RenderCache, old_key) is None
+        new_entry = db.session.get(RenderCache, render_cache_key('# 新内容'))
+        assert new_entry is not None
+        assert '新内容' in new_entry.html
+
+    def test_view_post_shows_toc(self, client, db, admin_user):
+        """测试文章页显示目录与字数"""
+        post = Post(title='目录文章', slug='toc-post', author_id=admin_user.id,
+                    content='# 第一章\n\n正文\n\n## 第一节\n\n更多正文')
+        db.session.add(post)
+        db.session.commit()
+
+        data = client.get('/post/toc-post').data.decode('utf-8')
+        assert 'post-toc' in data
+        assert '约' in data and '字' in data
+
+
+class TestStreamedPost:
+    """大文章流式响应测试"""
+
+    def test_stream_param(self, client, sample_post):
+        """测试 ?stream=1 使用流式响应"""
+        resp = client.get('/post/test-post?stream=1')
+        assert resp.status_code == 200
+        # 流式响应没有 Content-Length，使用分块传输
+        assert 'Content-Length' not in resp.headers
+        data = resp.data.decode('utf-8')
+        assert '测试文章' in data
+        assert '这是一篇测试文章的内容。' in data
+
+    def test_large_post_streamed(self, client, db, admin_user, app_full):
+        """测试超过阈值的文章自动流式输出，正文按章节渲染"""
+        app_full.config['STREAM_POST_MIN_SIZE'] = 100
+        content = '\n\n'.join(f'## 第 {i} 章\n\n' + '内容' * 20 for i in range(5))
+        db.session.add(Post(title='长文', slug='long-post', content=content, author_id=admin_user.id))
+        db.session.commit()
+
+        resp = client.get('/post/long-post')
+        assert 'Content-Length' not in resp.headers
+        data = resp.data.decode('utf-8')
+        for i in range(5):
+            assert f'第 {i} 章</h2>' in data
+
+    def test_cache_miss_fills_cache(self, client, db, admin_user, app_full):
+        """测试未命中缓存的流式访问在结束后写入缓存，下次访问带目录"""
+        app_full.config['STREAM_POST_MIN_SIZE'] = 100
+        content = '\n\n'.join(f'## 第 {i} 章\n\n' + '内容' * 20 for i in range(3))
+        db.session.add(Post(title='长文', slug='long-post', content=content, author_id=admin_user.id))
+        db.session.commit()
+        key = render_cache_key(content)
+
+        first = client.get('/post/long-post').data.decode('utf-8')
+        assert '第 2 章</h2>' in first
+        entry = db.session.get(RenderCache, key)
+        assert entry is not None and '第 1 章' in entry.toc and entry.word_count > 0
+        second = client.get('/post/long-post').data.decode('utf-8')
+        assert entry.html in second
+
+    def test_cache_hit_streamed_by_section(self, client, db, admin_user, app_full):
+        """测试命中渲染缓存的大文章同样按章节分块发送"""
+        app_full.config['STREAM_POST_MIN_SIZE'] = 100
+        content = '\n\n'.join(f'## 第 {i} 章\n\n' + '内容' * 20 for i in range(3))
+        db.session.add(Post(title='长文', slug='long-post', content=content, author_id=admin_user.id))
+        db.session.commit()
+        client.get('/post/long-post').data  # 第一次访问流式渲染并写入缓存
+        assert db.session.get(RenderCache, render_cache_key(content)) is not None
+
+        resp = client.get('/post/long-post', buffered=False)
+        chunks = [chunk.decode('utf-8') for chunk in resp.response]
+        resp.close()
+        body = [chunk for chunk in chunks if '章</h2>' in chunk]
+        assert len(body) == 3
+        assert all(chunk.count('章</h2>') == 1 for chunk in body)
+
+    def test_small_post_not_streamed(self, client, sample_post):
+        """测试普通文章不走流式响应"""
+        resp = client.get('/post/test-post')
+        assert 'Content-Length' in resp.headers
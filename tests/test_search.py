@@ -0,0 +1,162 @@
+"""全文搜索单元测试"""
+import pytest
+
+from app import sync_markdown_items
+from models import Post
+from utils.search import (search_index, segment_text, build_match_query,
+                          highlight_snippet, snippet_windows, FTS_TABLE)
+from tests.test_post_sync import make_item
+
+
+def search_ids(db, query):
+    """直接查询索引，返回按相关度排序的文章 id"""
+    match = search_index.match_subquery(query)
+    return [post_id for post_id, _ in db.session.query(match.c.post_id, match.c.score)
+            .order_by(match.c.score)]
+
+
+def add_post(db, user, title, content, summary='', slug=None):
+    post = Post(title=title, slug=slug or title, content=content, summary=summary,
+                author_id=user.id)
+    db.session.add(post)
+    db.session.commit()
+    return post
+
+
+class TestSegmentation:
+    """分词与查询转换测试"""
+
+    def test_segment_text(self):
+        """测试中文切分为二元组并补上末字"""
+        assert segment_text('博客系统') == ' 博客 客系 系统 统 '
+        assert segment_text('用 Flask 搭建') == ' 用  Flask  搭建 建 '
+        assert segment_text('') == ''
+
+    def test_build_match_query(self):
+        """测试关键词转换为短语查询"""
+        assert build_match_query('博客') == '"博客"'
+        assert build_match_query('系统设计') == '"系统 统设 设计"'
+        assert build_match_query('书') == '"书" *'
+        assert build_match_query('flask 博客') == '"flask" * AND "博客"'
+        assert build_match_query('系统abc') == '"系统 统 abc" *'
+        assert build_match_query('"*" ()') is None
+
+    def test_highlight_snippet(self):
+        """测试片段截取与高亮，并转义 HTML"""
+        text = '前言' * 100 + '这里介绍 **Flask** 博客 <script>'
+        snippet = str(highlight_snippet(text, 'flask'))
+        assert '<mark>Flask</mark>' in snippet
+        assert snippet.startswith('…')
+        assert '**' not in snippet
+        assert '&lt;script&gt;' in snippet
+        assert str(highlight_snippet('没有关键词', 'flask')) == ''
+
+    @pytest.mark.parametrize('query', ['amp', 'lt', 'quot', 'gt'])
+    def test_highlight_not_inside_entities(self, query):
+        """测试关键词不会匹配转义后实体的内部"""
+        snippet = str(highlight_snippet(f'b && c < d > "e" {query}', query))
+        assert snippet.count('<mark>') == 1
+        assert snippet.endswith(f'<mark>{query}</mark>')
+        assert '&amp;&amp;' in snippet and '&lt;' in snippet
+
+    def test_highlight_term_with_special_chars(self):
+        """测试含 & 的关键词在原文上匹配后再转义"""
+        assert '<mark>R&amp;D</mark>' in str(highlight_snippet('关于 R&D 部门', 'r&d'))
+
+    @pytest.mark.parametrize('query', ['flask', 'FLASK 博客', '前言', '没有', 'gunicorn 博客'])
+    def test_snippet_windows_match_full_text(self, db, admin_user, query):
+        """测试在数据库中截取窗口得到的片段与对整篇正文截取的一致"""
+        content = '前言' * 100 + '这里介绍 **Flask** 博客 <script>' + '正文' * 5000 + ' gunicorn'
+        post = add_post(db, admin_user, '片段', content)
+        assert snippet_windows([post.id], query) == {post.id: highlight_snippet(content, query)}
+
+
+class TestSearchIndex:
+    """索引维护与查询测试"""
+
+    def test_table_created_with_schema(self, db):
+        """测试 create_all 时一并创建索引表"""
+        assert search_index.available()
+        assert db.inspect(db.engine).has_table(FTS_TABLE)
+
+    def test_orm_changes_update_index(self, db, admin_user):
+        """测试 ORM 新增、修改与删除自动同步索引"""
+        post = add_post(db, admin_user, '缓存设计', '介绍本地缓存的实现')
+        assert search_ids(db, '本地缓存') == [post.id]
+
+        post.content = '改为介绍分布式锁'
+        db.session.commit()
+        assert search_ids(db, '本地缓存') == []
+        assert search_ids(db, '分布式') == [post.id]
+
+        db.session.delete(post)
+        db.session.commit()
+        assert search_ids(db, '分布式') == []
+
+    def test_single_and_two_char_queries(self, db, admin_user):
+        """测试单字与双字查询都能命中"""
+        post = add_post(db, admin_user, '读书', '周末去书店读书')
+        assert search_ids(db, '书') == [post.id]
+        assert search_ids(db, '书店') == [post.id]
+        assert search_ids(db, '读书') == [post.id]
+        assert search_ids(db, '店读') == [post.id]
+        assert search_ids(db, '书读') == []
+
+    def test_bm25_prefers_title(self, db, admin_user):
+        """测试标题命中排在正文命中之前"""
+        body_hit = add_post(db, admin_user, '随笔', '顺便提到了性能优化', slug='a')
+        title_hit = add_post(db, admin_user, '性能优化实践', '正文', slug='b')
+        assert search_ids(db, '性能优化') == [title_hit.id, body_hit.id]
+
+    def test_sync_updates_index(self, db, app_full, admin_user):
+        """测试文件同步新增、更新与删除文章时维护索引"""
+        sync_markdown_items(app_full, [make_item(1, content='# 初始\n\n索引测试内容')])
+        db.session.commit()
+        post_id = Post.query.filter_by(slug='post-1').first().id
+        assert search_ids(db, '索引测试') == [post_id]
+
+        item = make_item(1, content='# 修改\n\n更新后的段落')
+        item['updated_at'] = item['updated_at'].replace(year=2027)
+        sync_markdown_items(app_full, [item])
+        db.session.commit()
+        assert search_ids(db, '索引测试') == []
+        assert search_ids(db, '更新后') == [post_id]
+
+        sync_markdown_items(app_full, [], delete_missing=True)
+        db.session.commit()
+        assert search_ids(db, '更新后') == []
+
+    def test_ensure_rebuilds_missing_table(self, db, admin_user):
+        """测试旧数据库升级时建表并填充已有文章"""
+        post = add_post(db, admin_user, '迁移', '升级前已有的文章')
+        search_index.drop(db.session.connection())
+        assert search_index.ensure(db.session.connection()) == 1
+        assert search_ids(db, '升级前') == [post.id]
+        assert search_index.ensure(db.session.connection()) == 0
+
+
+class TestSearchPage:
+    """首页搜索测试"""
+
+    def test_search_highlights(self, client, db, admin_user):
+        """测试搜索结果显示高亮片段"""
+        add_post(db, admin_user, '部署指南', '使用 Gunicorn 部署博客系统的步骤')
+        resp = client.get('/?q=博客系统')
+        data = resp.data.decode('utf-8')
+        assert '部署指南' in data
+        assert '<mark>博客系统</mark>' in data
+        assert '共 1 篇' in data
+
+    def test_search_english_prefix(self, client, db, admin_user):
+        """测试英文关键词按前缀匹配"""
+        add_post(db, admin_user, 'Gunicorn', 'Run with gunicorn workers')
+        data = client.get('/?q=gunic').data.decode('utf-8')
+        assert '共 1 篇' in data
+
+    def test_like_fallback(self, client, db, admin_user, monkeypatch):
+        """测试索引不可用时退回 LIKE 查询"""
+        add_post(db, admin_user, '回退', '没有索引时仍然可以搜索')
+        monkeypatch.setattr(search_index, 'available', lambda connection=None: False)
+        data = client.get('/?q=仍然可以').data.decode('utf-8')
+        assert '回退' in data
+        assert '共 1 篇' in data
@@ -0,0 +1,120 @@
+"""合成数据生成单元测试"""
+import os
+import random
+
+from app import DEFAULT_CATEGORIES
+from models import User, Post, Category, post_categories
+from utils.markdown_scanner import scan_markdown_folder, ALLOWED_CATEGORIES
+from utils.synthetic import generate_post, generate_markdown_tree, seed_database
+
+
+def read_tree(folder):
+    """返回 {相对路径: 内容}"""
+    contents = {}
+    for root, dirs, files in os.walk(folder):
+        for filename in files:
+            path = os.path.join(root, filename)
+            with open(path, 'r', encoding='utf-8') as f:
+                contents[os.path.relpath(path, folder)] = f.read()
+    return contents
+
+
+class TestGeneratePost:
+    """合成文章测试"""
+
+    def test_contains_markdown_features(self):
+        """测试文章包含 front matter、标题、代码块与表格"""
+        rng = random.Random(0)
+        texts = [generate_post(rng, i, '技术', sections=(6, 6))['text'] for i in range(20)]
+        joined = '\n'.join(texts)
+        assert all(t.startswith('---\ntitle: ') for t in texts)
+        assert '\n## ' in joined
+        assert '```' in joined
+        assert '| --- |' in joined
+
+    def test_reproducible(self):
+        """测试相同种子生成相同文章"""
+        first = generate_post(random.Random(7), 1, '生活')
+        second = generate_post(random.Random(7), 1, '生活')
+        assert first == second
+
+
+class TestGenerateMarkdownTree:
+    """合成文件树测试"""
+
+    def test_tree_scans_into_categories(self, tmp_path):
+        """测试文件分布在四个分类中并能被扫描"""
+        folder = str(tmp_path / 'tree')
+        stats = generate_markdown_tree(folder, files=40, seed=1, nested=0.5)
+        assert stats['files'] == 40 and stats['bytes'] > 0
+
+        posts = scan_markdown_folder(folder)
+        assert len(posts) == 40
+        assert {p['category'] for p in posts} == ALLOWED_CATEGORIES
+        assert all(p['tags'] for p in posts)
+        # 部分文章位于分类下的子文件夹
+        assert any(os.path.relpath(p['file_path'], folder).count(os.sep) == 2 for p in posts)
+
+    def test_tree_reproducible(self, tmp_path):
+        """测试相同种子生成相同的文件树"""
+        generate_markdown_tree(str(tmp_path / 'a'), files=10, seed=3)
+        generate_markdown_tree(str(tmp_path / 'b'), files=10, seed=3)
+        generate_markdown_tree(str(tmp_path / 'c'), files=10, seed=4)
+        assert read_tree(str(tmp_path / 'a')) == read_tree(str(tmp_path / 'b'))
+        assert read_tree(str(tmp_path / 'a')) != read_tree(str(tmp_path / 'c'))
+
+
+class TestSeedDatabase:
+    """数据库批量写入测试"""
+
+    def test_seed(self, db, app_full):
+        """测试写入用户、分类、文章与关联"""
+        result = seed_database(posts=25, users=3, seed=1, batch_size=10)
+        assert result == {'users': 3, 'categories': 4, 'posts': 25}
+        assert Post.query.count() == 25
+        assert User.query.count() == 3
+        assert {c.name for c in Category.query} == ALLOWED_CATEGORIES
+
+        links = db.session.query(post_categories).count()
+        assert links >= 25
+        post = Post.query.filter_by(slug='synth-1-0').first()
+        assert post.categories and post.author is not None
+        assert post.summary and post.content_hash
+
+    def test_seed_reuses_existing(self, db, app_full, sample_categories):
+        """测试复用已有分类与合成用户，不同种子可以追加"""
+        seed_database(posts=5, users=2, seed=1, categories=DEFAULT_CATEGORIES)
+        result = seed_database(posts=5, users=2, seed=2, categories=DEFAULT_CATEGORIES)
+        assert result == {'users': 0, 'categories': 0, 'posts': 5}
+        assert Category.query.count() == 4
+        assert Post.query.count() == 10
+
+    def test_seed_reproducible(self, db, app_full):
+        """测试相同种子写入相同内容"""
+        seed_database(posts=5, users=2, seed=9)
+        first = [(p.title, p.content) for p in Post.query.order_by(Post.id)]
+        Post.query.delete()
+        db.session.execute(post_categories.delete())
+        db.session.commit()
+        seed_database(posts=5, users=2, seed=9)
+        assert [(p.title, p.content) for p in Post.query.order_by(Post.id)] == first
+
+
+class TestSyntheticCommands:
+    """命令行测试"""
+
+    def test_synth_posts(self, runner, tmp_path):
+        """测试生成文件树命令"""
+        folder = str(tmp_path / 'cli-tree')
+        result = runner.invoke(args=['synth-posts', folder, '--files', '8'])
+        assert result.exit_code == 0, result.output
+        assert '8 篇' in result.output
+        assert len(read_tree(folder)) == 8
+
+    def test_synth_db(self, runner, app_full):
+        """测试写入数据库命令"""
+        result = runner.invoke(args=['synth-db', '--posts', '12', '--users', '2'])
+        assert result.exit_code == 0, result.output
+        with app_full.app_context():
+            assert Post.query.count() == 12
+            assert Category.query.filter_by(slug='tech').count() == 1
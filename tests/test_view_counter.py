@@ -0,0 +1,150 @@
+"""浏览计数缓冲单元测试"""
+import pytest
+
+from models import Post
+from utils.view_counter import ViewCounter
+
+
+class Recorder:
+    """记录每次写回的计数"""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def __call__(self, counts):
+        if self.fail:
+            raise RuntimeError('数据库不可用')
+        self.batches.append(dict(counts))
+
+
+class TestViewCounter:
+    """缓冲与写回测试"""
+
+    def test_aggregates_until_threshold(self):
+        """测试同一文章的浏览合并，攒够次数后一次写回"""
+        write = Recorder()
+        counter = ViewCounter(write, interval=3600, threshold=5)
+        for post_id in (1, 2, 1, 1):
+            counter.hit(post_id)
+        assert write.batches == []
+        assert counter.pending(1) == 3 and counter.pending() == 4
+        counter.hit(2)
+        assert write.batches == [{1: 3, 2: 2}]
+        assert counter.pending() == 0
+
+    def test_interval_elapsed(self, monkeypatch):
+        """测试距上次写回超过间隔后的访问触发写回"""
+        clock = [100.0]
+        monkeypatch.setattr('utils.view_counter.time.monotonic', lambda: clock[0])
+        write = Recorder()
+        counter = ViewCounter(write, interval=5, threshold=0)
+        counter.hit(1)
+        clock[0] += 4
+        counter.hit(1)
+        assert write.batches == []
+        clock[0] += 2
+        counter.hit(1)
+        assert write.batches == [{1: 3}]
+
+    def test_zero_interval_writes_through(self):
+        """测试间隔为 0 时每次浏览立即写回"""
+        write = Recorder()
+        counter = ViewCounter(write, interval=0)
+        counter.hit(7)
+        counter.hit(7)
+        assert write.batches == [{7: 1}, {7: 1}]
+
+    def test_failed_write_keeps_counts(self):
+        """测试写回失败时计数保留到下一次"""
+        write = Recorder(fail=True)
+        counter = ViewCounter(write, interval=3600, threshold=0)
+        counter.hit(1)
+        with pytest.raises(RuntimeError):
+            counter.flush()
+        assert counter.pending(1) == 1
+        write.fail = False
+        counter.hit(1)
+        assert counter.flush() == 2
+        assert write.batches == [{1: 2}]
+
+    def test_failed_write_in_hit_is_logged(self, caplog):
+        """测试访问触发的写回失败时不抛出异常，计数保留"""
+        write = Recorder(fail=True)
+        counter = ViewCounter(write, interval=3600, threshold=1)
+        counter.hit(1)
+        assert counter.pending(1) == 1
+        assert '写回浏览计数失败' in caplog.text
+        write.fail = False
+        counter.hit(1)
+        assert write.batches == [{1: 2}]
+
+    def test_flush_all(self):
+        """测试退出时写回所有实例，单个失败不影响其他实例"""
+        ok, broken = Recorder(), Recorder(fail=True)
+        first = ViewCounter(ok, interval=3600)
+        second = ViewCounter(broken, interval=3600)
+        first.hit(1)
+        second.hit(2)
+        ViewCounter.flush_all()
+        assert ok.batches == [{1: 1}]
+        assert second.pending(2) == 1
+        second.write = Recorder()
+        second.flush()
+
+
+class TestViewPost:
+    """文章页浏览计数测试"""
+
+    def test_view_is_read_only(self, app_full, client, count_queries, sample_post):
+        """测试打开文章不执行写语句，页面显示包含缓冲的次数"""
+        client.get('/post/test-post')
+        with count_queries() as statements:
+            data = client.get('/post/test-post').data.decode('utf-8')
+        assert '2 次阅读' in data
+        assert not any(s.lstrip().upper().startswith(('UPDATE', 'INSERT')) for s in statements)
+        assert app_full.view_counter.pending(sample_post.id) == 2
+
+    def test_batched_update(self, app_full, client, db, count_queries, sample_posts):
+        """测试多篇文章的浏览用一条批量 UPDATE 写回"""
+        slugs = [post.slug for post in sample_posts[:3]]
+        for slug in slugs:
+            client.get(f'/post/{slug}')
+            client.get(f'/post/{slug}')
+        with count_queries() as statements:
+            assert app_full.view_counter.flush() == 6
+        assert sum(s.startswith('UPDATE posts') for s in statements) == 1
+        for slug in slugs:
+            assert Post.query.filter_by(slug=slug).one().view_count == 2
+
+    def test_threshold_from_config(self, app_full, client, db, sample_post):
+        """测试达到配置的次数后在请求中写回"""
+        app_full.view_counter.threshold = 3
+        for _ in range(3):
+            client.get('/post/test-post')
+        db.session.refresh(sample_post)
+        assert sample_post.view_count == 3
+
+    def test_failed_write_back_still_serves(self, app_full, client, db, sample_post, monkeypatch):
+        """测试写回数据库失败时文章页仍正常返回，会话已回滚"""
+        from sqlalchemy.exc import OperationalError
+
+        def locked(*args, **kwargs):
+            raise OperationalError('UPDATE posts', {}, Exception('database is locked'))
+
+        app_full.view_counter.threshold = 1
+        monkeypatch.setattr(db.session, 'execute', locked)
+        resp = client.get('/post/test-post')
+        monkeypatch.undo()
+        assert resp.status_code == 200
+        assert app_full.view_counter.pending(sample_post.id) == 1
+        assert client.get('/post/test-post').status_code == 200
+        db.session.refresh(sample_post)
+        assert sample_post.view_count == 2
+
+    def test_admin_dashboard_flushes(self, app_full, client, auth, admin_user, sample_post):
+        """测试管理后台统计前先写回缓冲的浏览次数"""
+        client.get('/post/test-post')
+        auth.login()
+        client.get('/admin')
+        assert app_full.view_counter.pending() == 0
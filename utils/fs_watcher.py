@@ -0,0 +1,248 @@
+"""posts 文件夹变更监听
+
+优先使用 Linux inotify（通过 ctypes 调用 libc），不可用时退回定时轮询。
+一段时间内的连续事件会被合并（debounce），之后把受影响的路径一次性交给
+回调处理，请求线程不再承担同步的开销。
+"""
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# inotify 事件掩码（见 <sys/inotify.h>）
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0o2000000)
+
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def _is_markdown(path):
+    return path.endswith(('.md', '.markdown'))
+
+
+class InotifyBackend:
+    """基于 inotify 的递归监听，新建的子目录会自动加入监听"""
+
+    name = 'inotify'
+
+    def __init__(self, folder_path):
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError('找不到 libc')
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError('当前系统不支持 inotify')
+        self.folder_path = folder_path
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 失败')
+        self.watches = {}  # watch 描述符 -> 目录路径
+        self._add_tree(folder_path)
+
+    def _add_tree(self, root):
+        for dirpath, dirs, files in os.walk(root):
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(dirpath), WATCH_MASK)
+            if wd >= 0:
+                self.watches[wd] = dirpath
+
+    def read(self, timeout):
+        """等待至多 timeout 秒，返回这段时间内受影响的路径集合"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        paths = set()
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # 事件队列溢出，无法知道丢了哪些事件，退化为整体复查
+                paths.add(self.folder_path)
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            directory = self.watches.get(wd)
+            if directory is None:
+                continue
+            if not name:
+                # 被监听的目录自身被删除或移走
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    paths.add(directory)
+                continue
+
+            path = os.path.join(directory, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add_tree(path)
+                paths.add(path)
+            elif _is_markdown(path):
+                paths.add(path)
+        return paths
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingBackend:
+    """定时比较 Markdown 文件的 stat 签名，作为 inotify 的后备方案"""
+
+    name = 'polling'
+
+    def __init__(self, folder_path, interval=2.0):
+        self.folder_path = folder_path
+        self.interval = interval
+        self.snapshot = self._snapshot()
+        self._last_poll = time.monotonic()
+
+    def _snapshot(self):
+        snapshot = {}
+        for root, dirs, files in os.walk(self.folder_path):
+            for filename in files:
+                if not _is_markdown(filename):
+                    continue
+                file_path = os.path.join(root, filename)
+                try:
+                    st = os.stat(file_path)
+                except OSError:
+                    continue
+                snapshot[file_path] = (st.st_size, st.st_mtime_ns, st.st_ino)
+        return snapshot
+
+    def read(self, timeout):
+        remaining = self.interval - (time.monotonic() - self._last_poll)
+        if remaining > timeout:
+            time.sleep(timeout)
+            return set()
+        time.sleep(max(remaining, 0))
+        self._last_poll = time.monotonic()
+
+        current = self._snapshot()
+        previous, self.snapshot = self.snapshot, current
+        return {path for path in current.keys() | previous.keys()
+                if current.get(path) != previous.get(path)}
+
+    def close(self):
+        pass
+
+
+class MarkdownWatcher:
+    """在后台线程中监听 posts 文件夹，合并事件后调用 callback(paths)
+
+    backend 可选 'auto'（优先 inotify）、'inotify' 或 'polling'。
+    最后一个事件之后静默 debounce 秒才触发回调；事件持续不断时，
+    最迟在第一个事件后 max_delay 秒触发一次。initial_sync 为真时，
+    线程启动后先以 callback(None) 做一次全量同步。
+    """
+
+    def __init__(self, folder_path, callback, debounce=0.5, poll_interval=2.0,
+                 backend='auto', max_delay=None, initial_sync=False):
+        self.folder_path = folder_path
+        self.callback = callback
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.max_delay = max_delay if max_delay is not None else max(debounce * 10, 5.0)
+        self.backend_choice = backend
+        self.initial_sync = initial_sync
+        self.backend = None
+        self.batches = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def backend_name(self):
+        return self.backend.name if self.backend else None
+
+    def _create_backend(self):
+        if self.backend_choice in ('auto', 'inotify'):
+            try:
+                return InotifyBackend(self.folder_path)
+            except OSError:
+                if self.backend_choice == 'inotify':
+                    raise
+        return PollingBackend(self.folder_path, self.poll_interval)
+
+    def start(self):
+        os.makedirs(self.folder_path, exist_ok=True)
+        self.backend = self._create_backend()
+        self._thread = threading.Thread(target=self._run, name='markdown-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self.backend is not None:
+            self.backend.close()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _dispatch(self, paths):
+        self.batches += 1
+        try:
+            self.callback(paths)
+        except Exception:
+            logger.exception('处理文件变更失败')
+
+    def _run(self):
+        if self.initial_sync:
+            self._dispatch(None)
+        pending = set()
+        first_event = last_event = 0.0
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if pending:
+                due = min(last_event + self.debounce, first_event + self.max_delay)
+                timeout = min(max(due - now, 0), 0.2)
+            else:
+                timeout = 0.2
+            try:
+                paths = self.backend.read(timeout)
+            except OSError:
+                logger.exception('读取文件变更事件失败')
+                paths = set()
+
+            now = time.monotonic()
+            if paths:
+                if not pending:
+                    first_event = now
+                pending |= paths
+                last_event = now
+            if pending and (now >= last_event + self.debounce or
+                            now >= first_event + self.max_delay):
+                batch, pending = pending, set()
+                self._dispatch(batch)
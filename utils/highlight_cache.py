@@ -0,0 +1,107 @@
+"""代码块语法高亮缓存
+
+codehilite 扩展对每个代码块都会重新调用 Pygments 做词法分析。博客中大量
+重复的 shell 片段、配置文件在不同文章、不同渲染路径中反复出现，因此按
+(语言, 代码哈希, Pygments 选项) 缓存高亮后的 HTML，并用 LRU 策略淘汰。
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from markdown.extensions import codehilite, fenced_code
+
+
+class LRUCache:
+    """线程安全的 LRU 缓存，附带命中统计"""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.miss_seconds = 0.0
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, elapsed=0.0):
+        """写入缓存，elapsed 为未命中时生成该值的耗时"""
+        with self._lock:
+            self.miss_seconds += elapsed
+            if self.maxsize <= 0:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def resize(self, maxsize):
+        """调整容量，超出部分按最久未使用淘汰"""
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._data) > max(maxsize, 0):
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """清空缓存并重置统计"""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.miss_seconds = 0.0
+
+    def stats(self):
+        """返回命中统计，saved_seconds 按未命中时的平均生成耗时估算"""
+        with self._lock:
+            avg = self.miss_seconds / self.misses if self.misses else 0.0
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'miss_seconds': round(self.miss_seconds, 6),
+                'saved_seconds': round(self.hits * avg, 6),
+            }
+
+
+highlight_cache = LRUCache()
+
+
+class CachedCodeHilite(codehilite.CodeHilite):
+    """带缓存的 CodeHilite：相同的代码与选项只调用一次 Pygments"""
+
+    cache = highlight_cache
+
+    def _cache_key(self, shebang):
+        code_hash = hashlib.sha1(self.src.encode('utf-8')).hexdigest()
+        options = repr(sorted(self.options.items()))
+        return (self.lang, code_hash, options, shebang, self.guess_lang,
+                self.use_pygments, self.lang_prefix, repr(self.pygments_formatter))
+
+    def hilite(self, shebang=True):
+        key = self._cache_key(shebang)
+        html = self.cache.get(key)
+        if html is None:
+            start = time.perf_counter()
+            html = super().hilite(shebang)
+            self.cache.put(key, html, time.perf_counter() - start)
+        return html
+
+
+def install_highlight_cache():
+    """让 fenced_code 与 codehilite 扩展使用带缓存的 CodeHilite
+
+    两个扩展都在运行时通过模块级名称 CodeHilite 创建高亮器，
+    替换该名称即可让所有渲染路径共享同一个缓存。
+    """
+    codehilite.CodeHilite = CachedCodeHilite
+    fenced_code.CodeHilite = CachedCodeHilite
@@ -0,0 +1,380 @@
+"""Markdown 渲染工具"""
+import hashlib
+import json
+import re
+import threading
+
+import markdown
+import pygments
+import xml.etree.ElementTree as etree
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+
+from utils.highlight_cache import LRUCache, install_highlight_cache
+from utils.process_pool import ProcessPool
+
+# 所有渲染路径（包括进程池中的 worker）共享代码块高亮缓存
+install_highlight_cache()
+
+# 渲染所用的扩展及其配置（修改此处会自动使已缓存的 HTML 失效）
+MARKDOWN_EXTENSIONS = [
+    'markdown.extensions.fenced_code',
+    'markdown.extensions.codehilite',
+    'markdown.extensions.tables',
+    'markdown.extensions.toc',
+    'markdown.extensions.nl2br',
+    'markdown.extensions.sane_lists',
+    'markdown.extensions.attr_list',
+    'markdown.extensions.meta',
+]
+
+MARKDOWN_EXTENSION_CONFIGS = {
+    'markdown.extensions.codehilite': {
+        'css_class': 'highlight',
+        'linenums': False
+    }
+}
+
+
+def create_markdown(extensions=None):
+    """创建一个按博客配置初始化的 Markdown 实例
+
+    extensions 为 None 时启用全部扩展，否则只启用给定的子集。
+    """
+    if extensions is None:
+        extensions = MARKDOWN_EXTENSIONS
+    configs = {k: v for k, v in MARKDOWN_EXTENSION_CONFIGS.items() if k in extensions}
+    return markdown.Markdown(extensions=list(extensions), extension_configs=configs)
+
+
+# ==================== 按文档内容选择扩展 ====================
+
+_EXT = 'markdown.extensions.'
+# 任何制表符或连续四个空格都可能构成缩进代码（含 "  \t"、列表与引用内的代码），一律保留 codehilite
+_INDENTED_CODE_RE = re.compile(r'\t| {4}')
+# setext 下划线可以混用 = 与 -（如 "=-="）
+_SETEXT_OR_HR_RE = re.compile(r'^[ \t>]*[=-]+[ \t]*$', re.M)
+_SOFT_BREAK_RE = re.compile(r'\S[^\n]*\n[ \t>]*\S')
+# 原始 HTML 块在预处理时会被拆到单独的行上，前后的文字之间可能因此多出软换行
+_RAW_HTML_RE = re.compile(r'<[A-Za-z/!?]')
+_LIST_MARKER_RE = re.compile(r'^[ \t>]*(?:[*+-]|\d+[.)])[ \t]', re.M)
+_META_FIRST_LINE_RE = re.compile(r'^\s*(?:[A-Za-z0-9_-]+:|-{3})')
+
+
+def required_extensions(text):
+    """廉价地预扫描文档，返回输出所依赖的扩展（保持 MARKDOWN_EXTENSIONS 中的顺序）
+
+    判断均偏保守：只有确定某个扩展对该文档不会产生任何影响时才跳过它，
+    因此按子集渲染的结果与完整管线逐字节一致。
+    """
+    needed = set()
+    if '```' in text or '~~~' in text:
+        needed.update((_EXT + 'fenced_code', _EXT + 'codehilite'))
+    elif _INDENTED_CODE_RE.search(text):
+        needed.add(_EXT + 'codehilite')
+    if '|' in text:
+        needed.add(_EXT + 'tables')
+    if '#' in text or '[TOC]' in text or _SETEXT_OR_HR_RE.search(text):
+        needed.add(_EXT + 'toc')
+    if _SOFT_BREAK_RE.search(text) or _RAW_HTML_RE.search(text):
+        needed.add(_EXT + 'nl2br')
+    if _LIST_MARKER_RE.search(text):
+        needed.add(_EXT + 'sane_lists')
+    if '{' in text:
+        needed.add(_EXT + 'attr_list')
+    first_line = text.split('\n', 1)[0]
+    if not first_line.strip() or _META_FIRST_LINE_RE.match(first_line):
+        needed.add(_EXT + 'meta')
+    return tuple(ext for ext in MARKDOWN_EXTENSIONS if ext in needed)
+
+
+class MarkdownRenderer:
+    """线程安全的 Markdown 渲染器
+
+    markdown.Markdown 实例带有解析状态，不能在多个线程间共享。
+    这里为每个线程惰性创建一个独立配置的实例，同一线程内复用。
+    """
+
+    def __init__(self, factory=create_markdown):
+        self._factory = factory
+        self._local = threading.local()
+
+    def _instance(self, text=None):
+        md = getattr(self._local, 'md', None)
+        if md is None:
+            md = self._factory()
+            self._local.md = md
+        return md
+
+    def render(self, text):
+        """渲染 Markdown 为 HTML 字符串"""
+        md = self._instance(text)
+        md.reset()
+        return md.convert(text)
+
+    def render_document(self, text):
+        """渲染整篇文档，返回 HTML、目录 (toc) 与字数"""
+        md = self._instance(text)
+        md.reset()
+        html = md.convert(text)
+        # 没有标题时 toc 扩展仍会输出空目录，这里统一存为空串
+        toc = md.toc if getattr(md, 'toc_tokens', None) else ''
+        return {'html': html, 'toc': toc, 'word_count': count_words(html)}
+
+
+class AdaptiveMarkdownRenderer(MarkdownRenderer):
+    """按文档内容挑选扩展子集的渲染器
+
+    每个线程为常见的扩展组合各缓存一个已初始化的实例，
+    不含代码、表格、标题的短文不再经过 codehilite、tables、toc 等处理。
+    """
+
+    def __init__(self):
+        super().__init__(create_markdown)
+
+    def _instance(self, text=None):
+        if text is None:
+            return super()._instance()
+        prepared = getattr(self._local, 'prepared', None)
+        if prepared is None:
+            prepared = self._local.prepared = {}
+        extensions = required_extensions(text)
+        md = prepared.get(extensions)
+        if md is None:
+            md = prepared[extensions] = create_markdown(extensions)
+        return md
+
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_WORD_RE = re.compile(r'[\u4e00-\u9fff]|[A-Za-z0-9_]+')
+
+
+def count_words(html):
+    """统计渲染后正文的字数：每个汉字计一个字，连续的字母数字计一个词"""
+    return len(_WORD_RE.findall(_TAG_RE.sub(' ', html)))
+
+
+# 进程池中的 worker 使用模块级渲染器（每个进程各自持有实例）
+_default_renderer = AdaptiveMarkdownRenderer()
+
+
+def render_document(text):
+    """使用模块级渲染器渲染单篇文档（可被进程池序列化调用）"""
+    return _default_renderer.render_document(text)
+
+
+def render_documents(texts, max_workers=None, min_parallel=32, pool=None):
+    """批量渲染文档，结果顺序与输入一致
+
+    文档数量少于 min_parallel 时串行渲染，避免进程池的启动开销；
+    否则分发到进程池中并行渲染。pool 为调用方持有的 ProcessPool，
+    多个批次可以复用同一个池；不传时临时创建。
+    """
+    texts = list(texts)
+    if max_workers == 1 or len(texts) < max(min_parallel, 2):
+        return [render_document(t) for t in texts]
+    if pool is not None:
+        return pool.map(render_document, texts)
+    with ProcessPool(max_workers) as pool:
+        return pool.map(render_document, texts)
+
+
+def _render_fingerprint():
+    """渲染配置指纹：扩展列表、扩展配置以及 Markdown/Pygments 版本"""
+    payload = json.dumps({
+        'extensions': MARKDOWN_EXTENSIONS,
+        'configs': MARKDOWN_EXTENSION_CONFIGS,
+        'markdown': markdown.__version__,
+        'pygments': pygments.__version__,
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+RENDER_FINGERPRINT = _render_fingerprint()
+
+
+def render_cache_key(text):
+    """计算渲染缓存键：内容哈希 + 渲染配置指纹"""
+    digest = hashlib.sha256(RENDER_FINGERPRINT.encode('ascii'))
+    digest.update(text.encode('utf-8'))
+    return digest.hexdigest()
+
+
+# ==================== 编辑器分块预览 ====================
+
+_FENCE_RE = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+_LIST_ITEM_RE = re.compile(r'^ {0,3}(?:[*+-]|\d+[.)])\s')
+_REF_DEF_RE = re.compile(r'^ {0,3}\[[^\]]+\]:\s*\S')
+
+# 预览块缓存：块哈希 -> 渲染后的 HTML
+preview_block_cache = LRUCache(maxsize=4096)
+
+
+def split_blocks(text):
+    """将文档按空行切分为顶层块
+
+    围栏代码块内部的空行不切分；缩进开头的块（列表续行、缩进代码）以及
+    相邻的列表块会并入前一块，保证单独渲染时结构与整篇渲染一致。
+    """
+    chunks = []
+    current = []
+    fence = None
+    for line in text.split('\n'):
+        if fence:
+            current.append(line)
+            if line.strip().startswith(fence):
+                fence = None
+            continue
+        if not line.strip():
+            if current:
+                chunks.append(current)
+                current = []
+            continue
+        m = _FENCE_RE.match(line)
+        if m:
+            fence = m.group(1)
+        current.append(line)
+    if current:
+        chunks.append(current)
+
+    blocks = []
+    for chunk in chunks:
+        first = chunk[0]
+        if blocks and (first[:1] in (' ', '\t') or
+                       (_LIST_ITEM_RE.match(first) and _LIST_ITEM_RE.match(blocks[-1][0]))):
+            blocks[-1].append('')
+            blocks[-1].extend(chunk)
+        else:
+            blocks.append(list(chunk))
+    return ['\n'.join(b) for b in blocks]
+
+
+def _standalone_sources(parts, text):
+    """把文档片段转换为可单独渲染的源文本"""
+    # 引用式链接的定义可能位于其他片段，附加到每个片段末尾（定义本身不产生输出）
+    refs = '\n'.join(line for line in text.split('\n') if _REF_DEF_RE.match(line))
+    for i, part in enumerate(parts):
+        # 非首个片段前加空行，避免 meta 扩展把 "键: 值" 开头的段落当作元数据
+        source = part if i == 0 else '\n' + part
+        if refs:
+            source = f'{source}\n\n{refs}'
+        yield source
+
+
+def render_preview_blocks(renderer, text, known=()):
+    """分块渲染编辑器预览，只渲染内容有变化的块
+
+    返回按文档顺序排列的 [{'id': 块哈希, 'html': ...}]；
+    客户端已持有（id 在 known 中）的块不再返回 html。
+    """
+    known = set(known)
+    result = []
+    for source in _standalone_sources(split_blocks(text), text):
+        block_id = hashlib.sha1((RENDER_FINGERPRINT + source).encode('utf-8')).hexdigest()
+        item = {'id': block_id}
+        if block_id not in known:
+            html = preview_block_cache.get(block_id)
+            if html is None:
+                html = renderer.render(source)
+                preview_block_cache.put(block_id, html)
+            item['html'] = html
+        result.append(item)
+    return result
+
+
+# ==================== 大文章分段流式渲染 ====================
+
+_SECTION_HEADING_RE = re.compile(r'^ {0,3}#{1,2}(?:[ \t]|$)')
+
+
+def split_sections(text):
+    """在一、二级标题处把文档切分为章节（围栏代码块内的 # 不算标题）"""
+    sections = []
+    current = []
+    fence = None
+    for line in text.split('\n'):
+        if fence:
+            if line.strip().startswith(fence):
+                fence = None
+        else:
+            m = _FENCE_RE.match(line)
+            if m:
+                fence = m.group(1)
+            elif _SECTION_HEADING_RE.match(line) and current and not current[-1].strip():
+                # 只在空行之后的标题处切分，紧贴表格等块的 "#" 行仍属于该块
+                sections.append('\n'.join(current))
+                current = []
+        current.append(line)
+    if current:
+        sections.append('\n'.join(current))
+    return sections
+
+
+class _SeedIdsTreeprocessor(Treeprocessor):
+    """在 toc 之前插入前面章节已使用的 id，使标题 id 在整篇文档内保持唯一"""
+
+    def run(self, root):
+        ids = getattr(self.md, 'seed_ids', None)
+        if ids:
+            holder = etree.SubElement(root, 'div')
+            holder.set('data-seed-ids', '')
+            for id_ in ids:
+                etree.SubElement(holder, 'span').set('id', id_)
+
+
+class _DropSeedIdsTreeprocessor(Treeprocessor):
+    """toc 生成 id 之后移除占位元素"""
+
+    def run(self, root):
+        for holder in root.findall('div[@data-seed-ids]'):
+            root.remove(holder)
+
+
+class SectionIdsExtension(Extension):
+    """分章节渲染时延续整篇文档的标题 id 编号（toc 的优先级为 5）"""
+
+    def extendMarkdown(self, md):
+        md.treeprocessors.register(_SeedIdsTreeprocessor(md), 'seed_ids', 6)
+        md.treeprocessors.register(_DropSeedIdsTreeprocessor(md), 'drop_seed_ids', 4)
+
+
+def create_section_markdown():
+    """创建用于分章节渲染的 Markdown 实例"""
+    return markdown.Markdown(extensions=MARKDOWN_EXTENSIONS + [SectionIdsExtension()],
+                             extension_configs=MARKDOWN_EXTENSION_CONFIGS)
+
+
+_section_renderer = MarkdownRenderer(create_section_markdown)
+_ID_ATTR_RE = re.compile(r'\sid="([^"]*)"')
+
+
+def iter_rendered_sections(text):
+    """逐章节渲染文档，每次产出一个章节的 HTML，供流式响应使用"""
+    md = _section_renderer._instance()
+    used_ids = set()
+    try:
+        for source in _standalone_sources(split_sections(text), text):
+            md.reset()
+            md.seed_ids = used_ids
+            html = md.convert(source)
+            used_ids.update(_ID_ATTR_RE.findall(html))
+            yield html
+    finally:
+        md.seed_ids = None
+
+
+_HTML_SECTION_RE = re.compile(r'^<h[12][\s>]', re.M)
+
+
+def iter_html_sections(html):
+    """把已渲染的整篇 HTML 在行首的一、二级标题处切开，逐段产出（拼接后与原文完全相同）
+
+    命中渲染缓存的大文章也按章节分块发送，而不是作为一整块写出。
+    """
+    start = 0
+    for m in _HTML_SECTION_RE.finditer(html):
+        if m.start() > start:
+            yield html[start:m.start()]
+            start = m.start()
+    if start < len(html):
+        yield html[start:]
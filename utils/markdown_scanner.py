@@ -1,8 +1,158 @@
 """Markdown 文件扫描与解析工具"""
 import os
 import re
+import json
 import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
+from itertools import islice
+
+from utils.process_pool import ProcessPool
+
+
+# front matter 的起止标记：单独占一行的 ---
+_FENCE_RE = re.compile(r'---[ \t]*(?:\r?\n|$)')
+_CLOSING_FENCE_RE = re.compile(r'^---[ \t]*(?:\r?\n|$)', re.M)
+_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2})?)?$')
+_DATE_FORMATS = ('%Y-%m-%d', '%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S',
+                 '%Y-%m-%dT%H:%M', '%Y-%m-%dT%H:%M:%S')
+_BOOLEANS = {'true': True, 'yes': True, 'on': True,
+             'false': False, 'no': False, 'off': False}
+
+# 这些键的值始终按原样保留为字符串
+STRING_KEYS = frozenset({'title', 'slug', 'summary', 'cover', 'category'})
+# 这些键的值即使没有写成 [a, b] 也按逗号拆分为列表
+LIST_KEYS = frozenset({'tags'})
+
+FRONT_MATTER_CACHE_SIZE = 4096
+_front_matter_cache = OrderedDict()
+_front_matter_lock = threading.Lock()
+
+
+def locate_front_matter(content):
+    """按偏移定位 front matter，不复制正文
+
+    返回: (元数据起始偏移, 元数据结束偏移, 正文起始偏移)；
+    没有完整的 front matter 时返回 None。正文起始偏移已跳过开头的空白。
+    """
+    opening = _FENCE_RE.match(content)
+    if not opening:
+        return None
+    closing = _CLOSING_FENCE_RE.search(content, opening.end())
+    if not closing:
+        return None
+    body_start = closing.end()
+    length = len(content)
+    while body_start < length and content[body_start].isspace():
+        body_start += 1
+    return opening.end(), closing.start(), body_start
+
+
+def _iter_meta_lines(content, start, end):
+    pos = start
+    while pos < end:
+        newline = content.find('\n', pos, end)
+        if newline < 0:
+            newline = end
+        yield content[pos:newline].strip()
+        pos = newline + 1
+
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'':
+        return value[1:-1]
+    return value
+
+
+def _split_list(value):
+    return [_unquote(item.strip()) for item in value.split(',') if item.strip()]
+
+
+def _convert_value(key, value):
+    """把 front matter 的字符串值转换为列表、日期或布尔值"""
+    if key in STRING_KEYS:
+        return value
+    if value.startswith('[') and value.endswith(']'):
+        return _split_list(value[1:-1])
+    if key in LIST_KEYS:
+        return _split_list(value)
+    if _DATE_RE.match(value):
+        for fmt in _DATE_FORMATS:
+            try:
+                return datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+        return value
+    return _BOOLEANS.get(value.lower(), value)
+
+
+def _parse_meta(content, start, end):
+    metadata = {}
+    list_key = None  # 正在收集 "- 项" 形式列表的键
+    for line in _iter_meta_lines(content, start, end):
+        if list_key and line.startswith('- '):
+            metadata[list_key].append(_unquote(line[2:].strip()))
+            continue
+        list_key = None
+        if ':' not in line:
+            continue
+        key, value = line.split(':', 1)
+        key = key.strip().lower()
+        value = value.strip()
+        if not value and key not in STRING_KEYS:
+            metadata[key] = []
+            list_key = key
+        else:
+            metadata[key] = _convert_value(key, value)
+    return metadata
+
+
+def read_front_matter(content, digest=None):
+    """解析 front matter 并转换值的类型
+
+    列表写作 [a, b]、逐行的 "- a"，tags 也可以写作逗号分隔；
+    YYYY-MM-DD [HH:MM[:SS]] 转为 datetime，true / false 等转为布尔值。
+    传入内容的 SHA-256 (digest) 时按其缓存解析结果，未变化的文件不再重复解析。
+
+    返回: (metadata, 正文起始偏移)，正文为 content[offset:]
+    """
+    if digest is not None:
+        with _front_matter_lock:
+            cached = _front_matter_cache.get(digest)
+            if cached is not None:
+                _front_matter_cache.move_to_end(digest)
+        if cached is not None:
+            metadata, body_start = cached
+            return _copy_meta(metadata), body_start
+
+    span = locate_front_matter(content)
+    if span is None:
+        metadata, body_start = {}, 0
+    else:
+        metadata, body_start = _parse_meta(content, span[0], span[1]), span[2]
+
+    if digest is not None:
+        with _front_matter_lock:
+            _front_matter_cache[digest] = (metadata, body_start)
+            while len(_front_matter_cache) > FRONT_MATTER_CACHE_SIZE:
+                _front_matter_cache.popitem(last=False)
+        metadata = _copy_meta(metadata)
+    return metadata, body_start
+
+
+def _copy_meta(metadata):
+    return {key: list(value) if isinstance(value, list) else value
+            for key, value in metadata.items()}
+
+
+def front_matter_body(content, body_start):
+    """由 read_front_matter 返回的偏移取出正文（与 parse_front_matter 的正文一致）"""
+    if body_start == 0:
+        return content
+    return content[body_start:].rstrip()
 
 
 def parse_front_matter(content):
@@ -17,20 +167,23 @@ def parse_front_matter(content):
     summary: 文章摘要
     cover: /static/img/cover.jpg
     ---
+
+    返回的值都是字符串；需要列表、日期等类型时使用 read_front_matter。
     """
     metadata = {}
-    if content.startswith('---'):
-        parts = content.split('---', 2)
-        if len(parts) >= 3:
-            meta_text = parts[1].strip()
-            body = parts[2].strip()
-            for line in meta_text.split('\n'):
-                line = line.strip()
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    metadata[key.strip().lower()] = value.strip()
-            return metadata, body
-    return metadata, content
+    span = locate_front_matter(content)
+    if span is None:
+        return metadata, content
+    for line in _iter_meta_lines(content, span[0], span[1]):
+        if ':' in line:
+            key, value = line.split(':', 1)
+            metadata[key.strip().lower()] = value.strip()
+    return metadata, front_matter_body(content, span[2])
+
+
+def content_hash(raw_content):
+    """文件内容的 SHA-256，用于判断文件是否真的发生了变化"""
+    return hashlib.sha256(raw_content.encode('utf-8')).hexdigest()
 
 
 def generate_slug(title):
@@ -44,35 +197,134 @@ def generate_slug(title):
     return slug
 
 
+class SlugAllocator:
+    """在内存中分配不重复的 slug
+
+    taken 为已被占用的 slug（通常一次性从数据库读出）。冲突时依次尝试
+    slug-2、slug-3 ……，结果只取决于已占用的集合与分配顺序；
+    每个 slug 记住下一次尝试的序号，大量同名文章也不会反复从头尝试。
+    """
+
+    def __init__(self, taken=()):
+        self.taken = set(taken)
+        self._next = {}
+
+    def __contains__(self, slug):
+        return slug in self.taken
+
+    def allocate(self, slug):
+        """返回未被占用的 slug 并登记为已占用"""
+        candidate = slug
+        if candidate in self.taken:
+            n = self._next.get(slug, 2)
+            candidate = f'{slug}-{n}'
+            while candidate in self.taken:
+                n += 1
+                candidate = f'{slug}-{n}'
+            self._next[slug] = n + 1
+        self.taken.add(candidate)
+        return candidate
+
+
+# 摘要提取用到的语法：链接、标题标记、强调符号与换行在一次扫描中识别，
+# 图片不跨行，按行处理；顺序与原先的多次替换保持一致
+_SUMMARY_TOKEN_RE = re.compile(
+    r'(?P<link>\[(?P<text>[^\]]+)\]\([^\)]+\))'
+    r'|(?P<heading>#+ )'
+    r'|(?P<mark>[*_`~]+)'
+    r'|(?P<newline>\n)'
+)
+_SUMMARY_HEADING_RE = re.compile(r'#+ ')
+_SUMMARY_MARK_RE = re.compile(r'[*_`~]')
+_SUMMARY_IMAGE_RE = re.compile(r'!\[.*?\]\(.*?\)')
+
+
+def _summary_fragments(content):
+    """逐段产出去掉标题标记、链接地址与强调符号后的文本，换行单独产出"""
+    pos = 0
+    for m in _SUMMARY_TOKEN_RE.finditer(content):
+        if m.start() > pos:
+            yield content[pos:m.start()]
+        pos = m.end()
+        if m.group('link') is not None:
+            text = _SUMMARY_MARK_RE.sub('', _SUMMARY_HEADING_RE.sub('', m.group('text')))
+            if text:
+                yield text
+        elif m.group('newline') is not None:
+            yield '\n'
+    if pos < len(content):
+        yield content[pos:]
+
+
 def generate_summary(content, max_length=200):
-    """从内容生成摘要"""
-    # 移除 Markdown 格式标记
-    text = re.sub(r'#+ ', '', content)
-    text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)
-    text = re.sub(r'[*_`~]', '', text)
-    text = re.sub(r'!\[.*?\]\(.*?\)', '', text)
-    text = re.sub(r'\n+', ' ', text)
-    text = text.strip()
-    if len(text) > max_length:
-        return text[:max_length] + '...'
-    return text
-
-
-def scan_markdown_folder(folder_path):
-    """扫描指定文件夹下的所有 Markdown 文件
+    """从内容生成摘要
 
-    返回: list[dict] 包含文件信息的列表
-    每个 dict 包含: title, slug, content, summary, category, file_path, created_at, updated_at
+    边扫描边去掉 Markdown 格式标记，连续换行折叠为一个空格，
+    收集到足够的可见字符后立即停止，不再为整篇内容生成中间副本。
     """
-    posts = []
+    parts = []   # 已确定的摘要片段（开头的空白已去掉）
+    length = 0
+    line = []    # 当前行中还可能被图片语法删掉的部分
+    pending_space = False
 
-    if not os.path.exists(folder_path):
-        os.makedirs(folder_path, exist_ok=True)
-        return posts
+    def emit(text):
+        nonlocal length, pending_space
+        if not text:
+            return None
+        if not parts:
+            text = text.lstrip()
+            if not text:
+                return None
+        elif pending_space:
+            text = ' ' + text
+        pending_space = False
+        parts.append(text)
+        length += len(text)
+        if length > max_length:
+            summary = ''.join(parts)
+            if summary[max_length:].strip():
+                return summary[:max_length] + '...'
+            parts[:] = [summary]
+        return None
+
+    for fragment in _summary_fragments(content):
+        lines = fragment.split('\n')
+        for i, text in enumerate(lines):
+            if i:
+                # 行结束：去掉行内的图片后输出
+                done = emit(_SUMMARY_IMAGE_RE.sub('', ''.join(line)))
+                if done:
+                    return done
+                line = []
+                pending_space = pending_space or bool(parts)
+            if not text:
+                continue
+            if line or '!' in text:
+                line.append(text)
+            else:
+                # 当前行还没有出现 '!'，这部分不会被图片语法吞掉，可以直接输出
+                done = emit(text)
+                if done:
+                    return done
+
+    done = emit(_SUMMARY_IMAGE_RE.sub('', ''.join(line)))
+    if done:
+        return done
+    summary = ''.join(parts).rstrip()
+    if len(summary) > max_length:
+        return summary[:max_length] + '...'
+    return summary
 
-    # 只保留顶层分类文件夹
-    ALLOWED_CATEGORIES = {'技术', '生活', '教程', '项目'}
 
+# 只保留顶层分类文件夹
+ALLOWED_CATEGORIES = {'技术', '生活', '教程', '项目'}
+
+
+def iter_markdown_files(folder_path):
+    """遍历文件夹下的 Markdown 文件，产出 (文件路径, 所属分类)
+
+    只进入允许的顶层分类文件夹，根目录下的文件归入「未分类」。
+    """
     for root, dirs, files in os.walk(folder_path):
         # 获取相对于 posts 文件夹的路径
         rel_path = os.path.relpath(root, folder_path)
@@ -87,61 +339,431 @@ def scan_markdown_folder(folder_path):
             category = top_folder
 
         for filename in files:
-            if not filename.endswith(('.md', '.markdown')):
-                continue
+            if filename.endswith(('.md', '.markdown')):
+                yield os.path.join(root, filename), category
 
-            file_path = os.path.join(root, filename)
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    raw_content = f.read()
-            except Exception:
-                continue
 
-            metadata, content = parse_front_matter(raw_content)
+def category_for_path(folder_path, file_path):
+    """返回文件所属的分类，不在允许的文件夹中时返回 None"""
+    rel_path = os.path.relpath(os.path.dirname(file_path), folder_path)
+    if rel_path == '.':
+        return '未分类'
+    top_folder = rel_path.split(os.sep)[0]
+    if top_folder == os.pardir or top_folder not in ALLOWED_CATEGORIES:
+        return None
+    return top_folder
+
 
-            # 获取文件修改时间
+def read_markdown_file(file_path, file_stat=None):
+    """读取文件内容与 stat 信息，失败时返回 None"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            raw_content = f.read()
+        if file_stat is None:
             file_stat = os.stat(file_path)
-            file_mtime = datetime.fromtimestamp(file_stat.st_mtime)
-            file_ctime = datetime.fromtimestamp(file_stat.st_ctime)
+    except Exception:
+        return None
+    return raw_content, file_stat
 
-            title = metadata.get('title', filename.rsplit('.', 1)[0].replace('-', ' ').replace('_', ' ').title())
-            slug = metadata.get('slug', generate_slug(title))
-            summary = metadata.get('summary', generate_summary(content))
-            cover = metadata.get('cover', '')
 
-            # 解析日期
-            date_str = metadata.get('date', '')
-            try:
-                created_at = datetime.strptime(date_str, '%Y-%m-%d') if date_str else file_ctime
-            except ValueError:
-                created_at = file_ctime
-
-            # 分类可以从 front matter 或文件夹名称获取
-            post_category = metadata.get('category', category)
-            tags = [t.strip() for t in metadata.get('tags', '').split(',') if t.strip()]
-
-            posts.append({
-                'title': title,
-                'slug': slug,
-                'content': content,
-                'raw_content': raw_content,
-                'summary': summary,
-                'cover_image': cover,
-                'category': post_category,
-                'tags': tags,
-                'file_path': file_path,
-                'created_at': created_at,
-                'updated_at': file_mtime
-            })
-
-    # 按创建时间倒序排列
+def parse_markdown_file(file_path, category, file_stat=None, light=False):
+    """读取并解析单个 Markdown 文件，读取失败时返回 None
+
+    light 为真时返回不含正文的 MarkdownRecord，否则返回完整的 dict。
+    """
+    loaded = read_markdown_file(file_path, file_stat)
+    if loaded is None:
+        return None
+    item = build_record(file_path, category, *loaded)
+    return MarkdownRecord(item) if light else item
+
+
+class MarkdownRecord:
+    """扫描结果的轻量记录：只保存元数据与摘要，正文在访问时才从文件读取
+
+    支持 record['title'] / record.get() 形式的访问，可以直接替代
+    scan_markdown_folder 返回的 dict。include_raw 为真时保留正文与原文。
+    """
+
+    FIELDS = ('title', 'slug', 'summary', 'cover_image', 'category', 'tags',
+              'file_path', 'content_hash', 'created_at', 'updated_at')
+    __slots__ = FIELDS + ('_content', '_raw_content')
+
+    def __init__(self, item, include_raw=False):
+        for field in self.FIELDS:
+            setattr(self, field, item[field])
+        self._content = item['content'] if include_raw else None
+        self._raw_content = item['raw_content'] if include_raw else None
+
+    def _load(self):
+        with open(self.file_path, 'r', encoding='utf-8') as f:
+            raw_content = f.read()
+        # 文件可能在扫描后被修改，按实际读到的内容查找 front matter 的位置
+        _, body_start = read_front_matter(raw_content, content_hash(raw_content))
+        return raw_content, front_matter_body(raw_content, body_start)
+
+    @property
+    def content(self):
+        """文章正文（去掉 front matter），未保留时每次访问都重新读取文件"""
+        if self._content is not None:
+            return self._content
+        return self._load()[1]
+
+    @property
+    def raw_content(self):
+        if self._raw_content is not None:
+            return self._raw_content
+        return self._load()[0]
+
+    def __getitem__(self, key):
+        if key in self.FIELDS or key in ('content', 'raw_content'):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.FIELDS or key in ('content', 'raw_content')
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __getstate__(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __setstate__(self, state):
+        for slot, value in state.items():
+            setattr(self, slot, value)
+
+    def __repr__(self):
+        return f'<MarkdownRecord {self.file_path!r}>'
+
+
+def build_record(file_path, category, raw_content, file_stat):
+    """由文件内容与 stat 信息生成文章记录（解析 front matter、生成摘要）"""
+    digest = content_hash(raw_content)
+    metadata, body_start = read_front_matter(raw_content, digest)
+    content = front_matter_body(raw_content, body_start)
+
+    # 获取文件修改时间
+    file_mtime = datetime.fromtimestamp(file_stat.st_mtime)
+    file_ctime = datetime.fromtimestamp(file_stat.st_ctime)
+
+    filename = os.path.basename(file_path)
+    title = metadata.get('title', filename.rsplit('.', 1)[0].replace('-', ' ').replace('_', ' ').title())
+    slug = metadata.get('slug', generate_slug(title))
+    summary = metadata.get('summary', generate_summary(content))
+    cover = metadata.get('cover', '')
+
+    # 日期在解析 front matter 时已转换，无法识别的日期使用文件创建时间
+    created_at = metadata.get('date')
+    if not isinstance(created_at, datetime):
+        created_at = file_ctime
+
+    # 分类可以从 front matter 或文件夹名称获取
+    post_category = metadata.get('category', category)
+    tags = metadata.get('tags', [])
+
+    return {
+        'title': title,
+        'slug': slug,
+        'content': content,
+        'raw_content': raw_content,
+        'summary': summary,
+        'cover_image': cover,
+        'category': post_category,
+        'tags': tags,
+        'file_path': file_path,
+        'content_hash': digest,
+        'created_at': created_at,
+        'updated_at': file_mtime
+    }
+
+
+SCAN_MODES = ('serial', 'thread', 'process')
+
+
+def _parse_markdown_job(entry, light=False):
+    return parse_markdown_file(*entry, light=light)
+
+
+def parse_markdown_files(entries, mode='serial', workers=None, min_parallel=64, light=False,
+                         pool=None):
+    """批量读取并解析文件，结果与 entries 一一对应（读取失败的项为 None）
+
+    entries: [(文件路径, 分类, stat 或 None)]
+    mode: serial 逐个处理；
+          thread 在线程池中读取并解析，适合网络存储等 I/O 延迟占主导的场景；
+          process 按块分发到进程池，由子进程自行读取并解析，适合 CPU 占主导的大量文件。
+          子进程直接读文件，避免把原文先读进主进程再序列化给子进程
+    文件数少于 min_parallel 时总是串行处理，避免线程 / 进程池的启动开销。
+    light: 返回不含正文的 MarkdownRecord（进程模式下也减少了回传的数据量）
+    pool: process 模式下复用调用方持有的 ProcessPool，不传时临时创建
+    """
+    if mode not in SCAN_MODES:
+        raise ValueError(f'未知的扫描模式: {mode}')
+    entries = list(entries)
+    if mode == 'serial' or len(entries) < min_parallel:
+        return [parse_markdown_file(*entry, light=light) for entry in entries]
+
+    job = partial(_parse_markdown_job, light=light)
+    if mode == 'thread':
+        # 读文件主要是 I/O 等待，线程数可以明显多于 CPU 核数
+        io_workers = workers or min(32, (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(io_workers) as pool:
+            return list(pool.map(job, entries))
+
+    if pool is not None:
+        return pool.map(job, entries)
+    with ProcessPool(workers) as pool:
+        return pool.map(job, entries)
+
+
+def sort_scanned(posts):
+    """按创建时间倒序排列"""
     posts.sort(key=lambda x: x['created_at'], reverse=True)
     return posts
 
 
+def scan_markdown_folder(folder_path, mode='serial', workers=None):
+    """扫描指定文件夹下的所有 Markdown 文件
+
+    mode / workers: 读取与解析方式，见 parse_markdown_files；结果顺序与串行一致
+    返回: list[dict] 包含文件信息的列表
+    每个 dict 包含: title, slug, content, summary, category, file_path, created_at, updated_at
+    """
+    posts = []
+
+    if not os.path.exists(folder_path):
+        os.makedirs(folder_path, exist_ok=True)
+        return posts
+
+    entries = [(file_path, category, None)
+               for file_path, category in iter_markdown_files(folder_path)]
+    posts = [item for item in parse_markdown_files(entries, mode, workers) if item is not None]
+    return sort_scanned(posts)
+
+
+def iter_markdown_folder(folder_path, mode='serial', workers=None, include_raw=False,
+                         batch_size=256):
+    """逐个产出文件夹中的文章记录（MarkdownRecord），内存占用与文件总量无关
+
+    与 scan_markdown_folder 不同，结果按遍历顺序产出而不排序；
+    每次只读取、解析 batch_size 个文件，正文不驻留内存，访问 record.content
+    时才重新读取。include_raw 为真时记录保留正文与原文。
+    """
+    if not os.path.exists(folder_path):
+        return
+    files = iter_markdown_files(folder_path)
+    # process 模式下所有批次共用一个进程池
+    with ProcessPool(workers) as pool:
+        while True:
+            entries = [(file_path, category, None)
+                       for file_path, category in islice(files, batch_size)]
+            if not entries:
+                return
+            if include_raw:
+                items = [None if item is None else MarkdownRecord(item, include_raw=True)
+                         for item in parse_markdown_files(entries, mode, workers, pool=pool)]
+            else:
+                items = parse_markdown_files(entries, mode, workers, light=True, pool=pool)
+            for item in items:
+                if item is not None:
+                    yield item
+
+
+class ScanDiff:
+    """一次增量扫描的结果：新增、修改、删除的文件路径集合"""
+
+    def __init__(self, added=(), changed=(), removed=()):
+        self.added = set(added)
+        self.changed = set(changed)
+        self.removed = set(removed)
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed)
+
+    def __repr__(self):
+        return (f'<ScanDiff added={len(self.added)} changed={len(self.changed)} '
+                f'removed={len(self.removed)}>')
+
+
+class IncrementalScanner:
+    """基于 stat 清单的增量扫描器
+
+    清单记录每个文件的 (大小, mtime_ns, inode)。每次扫描只对文件做 stat，
+    签名变化或新出现的文件才会读取并解析，没有变化时不读任何文件。
+    签名变化但内容哈希相同的文件不计入 changed。
+    指定 index_path 时清单与解析出的元数据会持久化到该 JSON 文件，
+    重启后从索引恢复，只有变化的文件需要重新读取。
+    """
+
+    # 索引文件格式版本；解析结果（摘要、slug 等）的生成规则变化时需要递增
+    INDEX_VERSION = 2
+
+    def __init__(self, folder_path, mode='serial', workers=None, index_path=None):
+        self.folder_path = folder_path
+        self.mode = mode
+        self.workers = workers
+        self.index_path = index_path
+        self.manifest = {}   # 文件路径 -> (st_size, st_mtime_ns, st_ino)
+        self.records = {}    # 文件路径 -> MarkdownRecord（不含正文）
+        self.scans = 0
+        self._dirty = False
+        if index_path:
+            self.load_index()
+
+    # ---- 磁盘索引：进程重启或新 worker 启动时从上次的清单继续 ----
+
+    def load_index(self):
+        """从索引文件恢复清单，文件缺失、损坏或版本不符时从空清单开始
+
+        返回: 恢复的文件数
+        """
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if data.get('version') != self.INDEX_VERSION or data.get('folder') != self.folder_path:
+            return 0
+
+        for file_path, entry in data.get('files', {}).items():
+            try:
+                item = dict(entry['record'])
+                item['file_path'] = file_path
+                item['created_at'] = datetime.fromisoformat(item['created_at'])
+                item['updated_at'] = datetime.fromisoformat(item['updated_at'])
+                record = MarkdownRecord(item)
+            except (KeyError, TypeError, ValueError):
+                continue
+            self.manifest[file_path] = tuple(entry['sig'])
+            self.records[file_path] = record
+        return len(self.records)
+
+    def save_index(self):
+        """把清单原子地写入索引文件（先写临时文件再替换）"""
+        files = {}
+        for file_path, record in self.records.items():
+            item = {field: getattr(record, field) for field in MarkdownRecord.FIELDS
+                    if field != 'file_path'}
+            item['created_at'] = record.created_at.isoformat()
+            item['updated_at'] = record.updated_at.isoformat()
+            files[file_path] = {'sig': list(self.manifest[file_path]), 'record': item}
+        data = {'version': self.INDEX_VERSION, 'folder': self.folder_path, 'files': files}
+
+        directory = os.path.dirname(os.path.abspath(self.index_path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{self.index_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.index_path)
+        self._dirty = False
+
+    @staticmethod
+    def signature(file_stat):
+        return (file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino)
+
+    def scan(self, paths=None):
+        """扫描文件夹，更新清单并返回 ScanDiff
+
+        paths 为 None 时遍历整个文件夹；否则只检查给定的文件或目录
+        （例如文件系统事件报告的路径），其余文件保持清单中的状态。
+        """
+        self.scans += 1
+        diff = ScanDiff()
+
+        if paths is None:
+            candidates = {}
+            if os.path.exists(self.folder_path):
+                candidates = dict(iter_markdown_files(self.folder_path))
+            # 清单中存在但本次没有遍历到的文件视为已删除
+            for file_path in self.records:
+                candidates.setdefault(file_path, None)
+        else:
+            candidates = self._expand(paths)
+
+        # 先只做 stat 比较签名，需要重新解析的文件再批量读取
+        to_parse = []
+        for file_path, category in candidates.items():
+            file_stat = None
+            if category is not None:
+                try:
+                    file_stat = os.stat(file_path)
+                except OSError:
+                    pass
+            if file_stat is None:
+                self._forget(file_path, diff)
+            elif (file_path not in self.records or
+                  self.manifest.get(file_path) != self.signature(file_stat)):
+                to_parse.append((file_path, category, file_stat))
+
+        items = parse_markdown_files(to_parse, self.mode, self.workers, light=True)
+        for (file_path, _, file_stat), item in zip(to_parse, items):
+            if item is None:
+                # 读取失败的文件视为不存在，下次扫描重试
+                self._forget(file_path, diff)
+                continue
+            previous = self.records.get(file_path)
+            self._dirty = True
+            self.manifest[file_path] = self.signature(file_stat)
+            self.records[file_path] = item
+            if previous is None:
+                diff.added.add(file_path)
+            elif previous['content_hash'] != item['content_hash']:
+                diff.changed.add(file_path)
+            # 只有 mtime 变化（touch、git checkout）时只刷新清单，不算修改
+
+        if self.index_path and self._dirty:
+            try:
+                self.save_index()
+            except OSError:
+                pass  # 索引只是加速手段，写入失败不影响扫描结果
+        return diff
+
+    def _expand(self, paths):
+        """把事件路径展开为 {文件路径: 分类}，分类为 None 表示不再有效"""
+        candidates = {}
+        for path in paths:
+            if os.path.isdir(path):
+                for root, dirs, files in os.walk(path):
+                    for filename in files:
+                        if filename.endswith(('.md', '.markdown')):
+                            file_path = os.path.join(root, filename)
+                            candidates[file_path] = category_for_path(self.folder_path, file_path)
+            elif path.endswith(('.md', '.markdown')):
+                candidates[path] = category_for_path(self.folder_path, path)
+            # 被删除或移走的目录：清单中位于其下的文件都需要复查
+            prefix = path + os.sep
+            for file_path in self.records:
+                if file_path.startswith(prefix):
+                    candidates.setdefault(file_path, None)
+        for file_path in list(candidates):
+            if candidates[file_path] is None and os.path.exists(file_path):
+                candidates[file_path] = category_for_path(self.folder_path, file_path)
+        return candidates
+
+    def _forget(self, file_path, diff):
+        """从清单中移除文件，之前存在时记入 removed"""
+        if file_path in self.records:
+            del self.records[file_path]
+            self.manifest.pop(file_path, None)
+            diff.removed.add(file_path)
+            self._dirty = True
+
+    def posts(self, paths=None):
+        """返回当前清单中的文章，顺序与 scan_markdown_folder 一致
+
+        paths 不为 None 时只返回其中仍在清单中的文件（如 ScanDiff 的新增与修改）。
+        """
+        if paths is None:
+            return sort_scanned(list(self.records.values()))
+        return sort_scanned([self.records[fp] for fp in paths if fp in self.records])
+
+
 def get_categories_from_folder(folder_path):
     """从文件夹结构中获取分类列表（只返回顶层允许的分类）"""
-    ALLOWED_CATEGORIES = {'技术', '生活', '教程', '项目'}
     categories = set()
 
     if not os.path.exists(folder_path):
@@ -0,0 +1,196 @@
+"""文章列表的游标分页
+
+paginate() 每次请求都要执行 OFFSET 加一条单独的 COUNT(*)，页码越靠后越慢，
+/api/posts?page=5000 需要先扫过前面的所有行。这里改为按 (created_at, id)
+做键集（keyset）分页：下一页只取比上一页最后一篇更早的文章，借助
+created_at 索引（SQLite 索引隐含 rowid）直接定位，耗时与页码无关。
+
+游标对调用方不透明：方向与排序键编码为 URL 安全的 base64 字符串。
+总数改为可选，需要时经 CountCache 按查询条件缓存一段时间，
+ORM 新增、删除文章或修改发布状态、分类后提交时自动失效。
+"""
+import base64
+import binascii
+import json
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy import event, tuple_, inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+from models import Post
+
+# 排序键：新文章在前，created_at 相同时按 id 决定先后
+CURSOR_KEY = (Post.created_at, Post.id)
+
+NEXT = 'n'
+PREV = 'p'
+
+
+def encode_cursor(direction, created_at, post_id):
+    """把方向与排序键编码为不透明的游标字符串"""
+    payload = json.dumps([direction, created_at.isoformat(), post_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """解析游标，返回 (direction, created_at, post_id)；格式不正确时抛出 ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, created_at, post_id = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in (NEXT, PREV) or type(post_id) is not int:
+            raise ValueError
+        return direction, datetime.fromisoformat(created_at), post_id
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise ValueError(f'无效的分页游标: {cursor!r}') from e
+
+
+class CursorPage:
+    """一页游标分页结果
+
+    next_cursor / prev_cursor 在没有下一页 / 上一页时为 None；
+    total 只有调用方要求时才计算，否则为 None。
+    """
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def to_dict(self):
+        return {
+            'next_cursor': self.next_cursor,
+            'prev_cursor': self.prev_cursor,
+            'has_next': self.has_next,
+            'has_prev': self.has_prev,
+            'per_page': self.per_page,
+        }
+
+
+def paginate_by_cursor(query, cursor=None, per_page=10):
+    """对文章查询做游标分页，忽略 query 原有的排序
+
+    cursor 为 None 时返回第一页；游标无效时抛出 ValueError。
+    多取一行用来判断所在方向上是否还有更多文章，不执行 COUNT。
+    """
+    per_page = max(per_page, 1)
+    key = tuple_(*CURSOR_KEY)
+    query = query.order_by(None)
+    direction = NEXT
+    if cursor:
+        direction, created_at, post_id = decode_cursor(cursor)
+        bound = (created_at, post_id)
+        query = query.filter(key < bound if direction == NEXT else key > bound)
+
+    if direction == NEXT:
+        rows = query.order_by(*(c.desc() for c in CURSOR_KEY)).limit(per_page + 1).all()
+    else:
+        # 向前翻页：按升序取紧挨着游标的一页，再反转回新文章在前
+        rows = query.order_by(*CURSOR_KEY).limit(per_page + 1).all()
+    more = len(rows) > per_page
+    items = rows[:per_page]
+    if direction == PREV:
+        items.reverse()
+
+    has_next = more if direction == NEXT else bool(cursor)
+    has_prev = bool(cursor) if direction == NEXT else more
+    page = CursorPage(items, per_page)
+    if items and has_next:
+        page.next_cursor = encode_cursor(NEXT, items[-1].created_at, items[-1].id)
+    if items and has_prev:
+        page.prev_cursor = encode_cursor(PREV, items[0].created_at, items[0].id)
+    return page
+
+
+class CountCache:
+    """按查询条件缓存文章总数，条目在 ttl 秒后过期，最多保留 maxsize 条
+
+    搜索词也是缓存键的一部分，因此按最久未使用淘汰，写入时顺带清除过期条目，
+    任意多的不同搜索不会让缓存无限增长。
+    文章的 ORM 新增、删除或发布状态、分类变化在提交后会清空所有实例；
+    使用 Core 批量语句写入的地方调用 invalidate_counts，否则依靠 ttl 过期。
+    """
+
+    _instances = weakref.WeakSet()
+
+    def __init__(self, ttl=60, maxsize=256):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # key -> (过期时间, 总数)
+        self._lock = threading.Lock()
+        CountCache._instances.add(self)
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, compute):
+        """返回 key 对应的总数，过期或不存在时调用 compute() 计算"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry and entry[0] > now:
+                self._data.move_to_end(key)
+                return entry[1]
+        value = compute()
+        if self.ttl > 0 and self.maxsize > 0:
+            with self._lock:
+                self._data[key] = (now + self.ttl, value)
+                self._data.move_to_end(key)
+                expired = [k for k, (expires, _) in self._data.items() if expires <= now]
+                for k in expired:
+                    del self._data[k]
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    @classmethod
+    def clear_all(cls):
+        for cache in list(cls._instances):
+            cache.clear()
+
+
+def invalidate_counts(session):
+    """标记本事务改变了文章数量，提交后清空总数缓存（供 Core 批量写入调用）"""
+    session.info['post_counts_stale'] = True
+
+
+def _count_changes(post):
+    attrs = sa_inspect(post).attrs
+    return attrs.is_published.history.has_changes() or attrs.categories.history.has_changes()
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_post_changes(session, flush_context):
+    """记录本事务中影响文章数量的 ORM 修改"""
+    if any(isinstance(obj, Post) for obj in session.new) or \
+            any(isinstance(obj, Post) for obj in session.deleted) or \
+            any(isinstance(obj, Post) and _count_changes(obj) for obj in session.dirty):
+        invalidate_counts(session)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_counts(session):
+    if session.info.pop('post_counts_stale', False):
+        CountCache.clear_all()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop('post_counts_stale', None)
@@ -0,0 +1,46 @@
+"""批量任务使用的进程池
+
+扫描解析与预渲染会在请求线程、文件监听线程或后台同步线程中启动进程池。
+fork 方式会把当时被其他线程持有的锁（高亮缓存、front matter 缓存、日志等）
+原样复制进子进程，子进程一旦等待这些锁就会永远卡住，父进程的 pool.map
+也随之挂起（且此时正持有同步锁）。因此统一使用 spawn 方式启动子进程。
+
+spawn 的启动开销较大，ProcessPool 在第一次需要时才创建执行器，
+一次同步中的多个批次复用同一个池。
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+MP_CONTEXT = multiprocessing.get_context('spawn')
+
+
+class ProcessPool:
+    """按需创建、可在多个批次间复用的 spawn 进程池
+
+    用法：with ProcessPool(workers) as pool: ... pool.map(fn, items)
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = None
+
+    def map(self, fn, items, chunksize=None):
+        """与 Executor.map 相同，结果按输入顺序返回；chunksize 默认按进程数均分"""
+        items = list(items)
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.max_workers, mp_context=MP_CONTEXT)
+        if chunksize is None:
+            chunksize = max(1, len(items) // (self.max_workers * 4))
+        return list(self._executor.map(fn, items, chunksize=chunksize))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
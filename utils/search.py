@@ -0,0 +1,267 @@
+"""文章全文搜索
+
+使用 SQLite FTS5 虚拟表 posts_fts（rowid 即文章 id）。unicode61 分词器不会切分
+中文，因此写入索引前先把连续的中日韩文字切成相邻的二元组（bigram），
+查询时按同样的规则把关键词转换为短语查询，中文搜索「博客」「系统设计」都能命中。
+结果按 BM25 排序（标题、摘要、正文的权重依次降低），摘要片段在 Python 中截取并高亮。
+
+ORM 对文章的增删改在 flush 时自动同步到索引；同步引擎等使用 Core 批量语句的
+地方显式调用 replace / remove。数据库不是 SQLite 或不支持 FTS5 时，
+available() 返回 False，调用方退回 LIKE 查询。
+"""
+import re
+import weakref
+
+from markupsafe import Markup, escape
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from models import db, Post
+from utils.markdown_scanner import generate_summary
+
+FTS_TABLE = 'posts_fts'
+
+_CJK = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff'
+_CJK_RUN_RE = re.compile(f'[{_CJK}]+')
+_TERM_PIECE_RE = re.compile(f'([{_CJK}]+)')
+_WORD_RE = re.compile(r'[^\W_]+')
+
+# 参与索引的列，顺序与 BM25 权重一一对应
+INDEXED_COLUMNS = ('title', 'summary', 'content')
+BM25_WEIGHTS = (10.0, 5.0, 1.0)
+
+
+def _run_tokens(run, trailing=True):
+    """把一段连续的中文切成二元组；trailing 为真时再补上最后一个字
+
+    补上的单字保证每个字都是某个词元的开头，单字查询可以用前缀匹配命中。
+    """
+    if len(run) == 1:
+        return [run]
+    tokens = [run[i:i + 2] for i in range(len(run) - 1)]
+    if trailing:
+        tokens.append(run[-1])
+    return tokens
+
+
+def segment_text(text):
+    """把文本中的中日韩文字切分为以空格分隔的二元组，其余文字保持原样"""
+    if not text:
+        return ''
+    return _CJK_RUN_RE.sub(lambda m: ' ' + ' '.join(_run_tokens(m.group())) + ' ', text)
+
+
+def build_match_query(query):
+    """把用户输入转换为 FTS5 查询表达式，没有可搜索的内容时返回 None
+
+    以空白分隔的每个关键词转换为一个短语，关键词之间为 AND；
+    关键词末尾是英文单词或单个汉字时按前缀匹配。
+    """
+    phrases = []
+    for term in query.split():
+        tokens = []
+        prefix = False
+        pieces = [p for p in _TERM_PIECE_RE.split(term) if p]
+        for i, piece in enumerate(pieces):
+            at_end = i == len(pieces) - 1
+            if _CJK_RUN_RE.fullmatch(piece):
+                # 查询中间的中文段后面紧跟其他字符，索引里该段同样以单字收尾
+                tokens.extend(_run_tokens(piece, trailing=not at_end))
+                prefix = len(piece) == 1
+            else:
+                words = _WORD_RE.findall(piece)
+                tokens.extend(words)
+                prefix = bool(words)
+        if tokens:
+            phrases.append('"' + ' '.join(tokens) + '"' + (' *' if prefix else ''))
+    return ' AND '.join(phrases) or None
+
+
+def _query_terms(query):
+    return sorted({t for t in query.split() if t}, key=len, reverse=True)
+
+
+def highlight_snippet(text, query, width=120, offset=0):
+    """截取 text 中第一个关键词附近的片段，去掉 Markdown 标记并用 <mark> 高亮
+
+    offset 为 text 在原文中的起始位置（text 是 snippet_windows 从数据库截取的
+    窗口时不为 0），用于判断片段前面是否还有内容。
+    text 中找不到任何关键词时返回空字符串。
+    """
+    terms = _query_terms(query)
+    if not text or not terms:
+        return Markup('')
+    lower = text.lower()
+    positions = [pos for pos in (lower.find(t.lower()) for t in terms) if pos >= 0]
+    if not positions:
+        # 只有标题或摘要命中，由调用方显示原摘要
+        return Markup('')
+    start = max(min(positions) - width // 3, 0)
+    window = text[start:start + width * 3]
+    plain = generate_summary(window, max_length=width)
+    if plain.endswith('...'):
+        plain = plain[:-3] + '…'
+    if start + offset > 0:
+        plain = '…' + plain
+
+    # 在原文上匹配关键词，再逐段转义，关键词不会匹配到 &amp; 等实体内部
+    pattern = re.compile('|'.join(re.escape(t) for t in terms), re.IGNORECASE)
+    parts, last = [], 0
+    for m in pattern.finditer(plain):
+        parts.append(escape(plain[last:m.start()]))
+        parts.append(Markup('<mark>%s</mark>') % m.group())
+        last = m.end()
+    parts.append(escape(plain[last:]))
+    return Markup('').join(parts)
+
+
+def snippet_windows(post_ids, query, width=120):
+    """为搜索结果生成高亮片段，返回 {文章 id: Markup}
+
+    关键词定位与截取在 SQL 中完成（instr / substr），每篇文章只读回
+    highlight_snippet 需要的那一小段，列表查询无需加载完整正文。
+    与 highlight_snippet 一样不区分 ASCII 字母大小写。
+    """
+    terms = _query_terms(query)
+    if not post_ids or not terms:
+        return {}
+    lowered = db.func.lower(Post.content)
+    # 找不到的关键词记为一个很大的位置，截取结果为空字符串
+    positions = [db.func.coalesce(db.func.nullif(db.func.instr(lowered, t.lower()), 0), 2 ** 31)
+                 for t in terms]
+    first = positions[0] if len(positions) == 1 else db.func.min(*positions)
+    start = db.func.max(first - width // 3, 1)
+    rows = db.session.query(Post.id, db.func.substr(Post.content, start, width * 3), start) \
+        .filter(Post.id.in_(post_ids))
+    return {post_id: highlight_snippet(window, query, width, offset=offset - 1)
+            for post_id, window, offset in rows}
+
+
+class PostSearchIndex:
+    """posts_fts 的建表、维护与查询"""
+
+    def __init__(self):
+        self._available = weakref.WeakKeyDictionary()  # engine -> 索引表是否存在
+
+    # ---- 建表 ----
+
+    def create(self, connection):
+        """创建索引表（已存在时不做任何事），返回是否可用"""
+        if connection.dialect.name != 'sqlite':
+            self._available[connection.engine] = False
+            return False
+        try:
+            connection.exec_driver_sql(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"{', '.join(INDEXED_COLUMNS)}, tokenize='unicode61', prefix='1')")
+        except OperationalError:
+            # 编译 SQLite 时没有启用 FTS5
+            self._available[connection.engine] = False
+            return False
+        self._available[connection.engine] = True
+        return True
+
+    def drop(self, connection):
+        if connection.dialect.name == 'sqlite':
+            connection.exec_driver_sql(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+        self._available[connection.engine] = False
+
+    def available(self, connection=None):
+        connection = connection or db.session.connection()
+        engine = connection.engine
+        if engine not in self._available:
+            self._available[engine] = (
+                connection.dialect.name == 'sqlite' and
+                sa_inspect(connection).has_table(FTS_TABLE))
+        return self._available[engine]
+
+    def ensure(self, connection):
+        """旧数据库升级：索引表不存在时创建并用已有文章填充
+
+        返回: 新建时写入的文章数，表已存在或不可用时返回 0
+        """
+        if connection.dialect.name != 'sqlite' or sa_inspect(connection).has_table(FTS_TABLE):
+            return 0
+        if not self.create(connection):
+            return 0
+        count = 0
+        rows = connection.execute(db.select(Post.id, Post.title, Post.summary, Post.content))
+        while True:
+            chunk = rows.fetchmany(500)
+            if not chunk:
+                break
+            self.replace(connection, chunk)
+            count += len(chunk)
+        return count
+
+    # ---- 维护 ----
+
+    def replace(self, connection, rows):
+        """写入或覆盖索引行，rows 为 (id, title, summary, content) 序列"""
+        rows = list(rows)
+        if not rows or not self.available(connection):
+            return
+        self.remove(connection, [row[0] for row in rows])
+        connection.exec_driver_sql(
+            f'INSERT INTO {FTS_TABLE} (rowid, {", ".join(INDEXED_COLUMNS)}) VALUES (?, ?, ?, ?)',
+            [(post_id, segment_text(title), segment_text(summary), segment_text(content))
+             for post_id, title, summary, content in rows])
+
+    def remove(self, connection, post_ids):
+        post_ids = list(post_ids)
+        if not post_ids or not self.available(connection):
+            return
+        for i in range(0, len(post_ids), 500):
+            chunk = post_ids[i:i + 500]
+            connection.exec_driver_sql(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({", ".join("?" * len(chunk))})',
+                tuple(chunk))
+
+    # ---- 查询 ----
+
+    def match_subquery(self, query):
+        """返回 (post_id, score) 子查询，score 越小越相关；索引不可用时返回 None"""
+        expression = build_match_query(query)
+        if expression is None or not self.available():
+            return None
+        weights = ', '.join(str(w) for w in BM25_WEIGHTS)
+        return db.text(
+            f'SELECT rowid AS post_id, bm25({FTS_TABLE}, {weights}) AS score '
+            f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match'
+        ).bindparams(match=expression).columns(
+            post_id=db.Integer, score=db.Float).subquery('search')
+
+
+search_index = PostSearchIndex()
+
+
+@event.listens_for(Post.__table__, 'after_create')
+def _create_search_table(target, connection, **kw):
+    search_index.create(connection)
+
+
+@event.listens_for(Post.__table__, 'before_drop')
+def _drop_search_table(target, connection, **kw):
+    search_index.drop(connection)
+
+
+def _indexed_changes(obj):
+    state = sa_inspect(obj)
+    return any(state.attrs[column].history.has_changes() for column in INDEXED_COLUMNS)
+
+
+@event.listens_for(Session, 'after_flush')
+def _sync_search_index(session, flush_context):
+    """ORM 新增、修改（标题 / 摘要 / 正文）和删除的文章随同一事务更新索引"""
+    changed = [obj for obj in session.new if isinstance(obj, Post)]
+    changed += [obj for obj in session.dirty if isinstance(obj, Post) and _indexed_changes(obj)]
+    removed = [obj.id for obj in session.deleted if isinstance(obj, Post)]
+    if not changed and not removed:
+        return
+    connection = session.connection()
+    if not search_index.available(connection):
+        return
+    search_index.remove(connection, removed)
+    search_index.replace(connection, [(obj.id, obj.title, obj.summary, obj.content)
+                                      for obj in changed])
@@ -0,0 +1,230 @@
+"""后台同步任务
+
+管理后台的「同步 Markdown 文件」在后台线程中执行：请求只负责启动任务，
+页面通过状态接口轮询进度。同一时间只允许一个同步任务运行。
+
+任务状态默认只保存在当前进程内。多个工作进程（如 gunicorn 多 worker）部署时
+配置 state_dir：任务状态写成该目录下的 JSON 文件，任意进程都能查询；
+「同一时间只有一个任务」由目录中锁文件上的 flock 保证（不支持 flock 的平台
+仍只在进程内互斥）。
+"""
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+_JOB_ID_RE = re.compile(r'[0-9a-f]{32}')
+
+
+class SyncJob:
+    """一次同步任务的状态
+
+    phase: queued / scanning / syncing / committing / done / failed
+    """
+
+    COUNTERS = ('created', 'updated', 'deleted', 'skipped')
+
+    def __init__(self, job_id=None):
+        self.id = job_id or uuid.uuid4().hex
+        self.phase = 'queued'
+        self.total = 0
+        self.processed = 0
+        self.created = 0
+        self.updated = 0
+        self.deleted = 0
+        self.skipped = 0
+        self.error = None
+        self.started_at = time.time()
+        self.finished_at = None
+        self.finished = threading.Event()
+        self.listener = None  # 状态变化后调用 listener(job)，用于写出共享状态
+
+    @property
+    def running(self):
+        return self.finished_at is None
+
+    @property
+    def elapsed(self):
+        return (self.finished_at or time.time()) - self.started_at
+
+    def update(self, **fields):
+        for key, value in fields.items():
+            setattr(self, key, value)
+        if self.listener is not None:
+            self.listener(self)
+
+    def to_dict(self):
+        data = {
+            'id': self.id,
+            'phase': self.phase,
+            'running': self.running,
+            'total': self.total,
+            'processed': self.processed,
+            'error': self.error,
+            'elapsed': round(self.elapsed, 3),
+        }
+        data.update({key: getattr(self, key) for key in self.COUNTERS})
+        return data
+
+    def to_state(self):
+        """写入状态文件的内容：to_dict 加上起止时间"""
+        return dict(self.to_dict(), started_at=self.started_at, finished_at=self.finished_at)
+
+    @classmethod
+    def from_state(cls, state):
+        """由其他进程写出的状态构造只读快照"""
+        job = cls(state['id'])
+        for key in ('phase', 'total', 'processed', 'error', 'started_at', 'finished_at') + cls.COUNTERS:
+            setattr(job, key, state.get(key, getattr(job, key)))
+        if not job.running:
+            job.finished.set()
+        return job
+
+
+class SyncJobManager:
+    """登记同步任务并保证同一时间只有一个任务在运行
+
+    state_dir: 共享状态目录，None 表示状态只保存在当前进程
+    """
+
+    def __init__(self, history=20, state_dir=None):
+        self.history = history
+        self.jobs = OrderedDict()
+        self.current = None
+        self.state_dir = state_dir
+        self._lock = threading.Lock()
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+
+    def start(self, target):
+        """在后台线程中运行 target(job)
+
+        返回: (job, started)；已有任务在运行时返回该任务（其他进程的任务为状态快照）与 False
+        """
+        with self._lock:
+            if self.current is not None and self.current.running:
+                return self.current, False
+            lock_file = self._acquire_shared_lock()
+            if lock_file is False:
+                running = self._load_current()
+                if running is not None:
+                    return running, False
+                # 其他进程刚拿到锁、尚未写出状态：按「已有任务」处理
+                return SyncJob(), False
+            job = SyncJob()
+            if self.state_dir:
+                job.listener = self._save
+                self._save(job)
+                self._write_pointer(job.id)
+                self._prune_states()
+            self.jobs[job.id] = job
+            while len(self.jobs) > self.history:
+                self.jobs.popitem(last=False)
+            self.current = job
+
+        thread = threading.Thread(target=self._run, args=(job, target, lock_file),
+                                  name=f'sync-job-{job.id[:8]}', daemon=True)
+        thread.start()
+        return job, True
+
+    def _run(self, job, target, lock_file):
+        try:
+            target(job)
+            job.phase = 'done'
+        except Exception as e:
+            job.phase, job.error = 'failed', str(e)
+        finally:
+            # 先写出最终状态、释放跨进程锁，再唤醒等待者：被唤醒的一方可以立即启动下一个任务
+            with self._lock:
+                job.finished_at = time.time()
+                if self.state_dir:
+                    self._save(job)
+                if lock_file is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    lock_file.close()
+            job.finished.set()
+
+    def get(self, job_id):
+        """查询任务：先查本进程，再读共享状态目录"""
+        job = self.jobs.get(job_id)
+        if job is not None or not self.state_dir or not _JOB_ID_RE.fullmatch(job_id):
+            return job
+        return self._load(job_id)
+
+    # ---- 共享状态 ----
+
+    def _path(self, name):
+        return os.path.join(self.state_dir, name)
+
+    def _acquire_shared_lock(self):
+        """获取跨进程的任务锁；返回锁文件，未配置共享目录时返回 None，锁被占用时返回 False"""
+        if not self.state_dir or fcntl is None:
+            return None
+        lock_file = open(self._path('sync.lock'), 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        return lock_file
+
+    def _shared_lock_free(self):
+        lock_file = self._acquire_shared_lock()
+        if lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+            return True
+        return lock_file is None
+
+    def _save(self, job):
+        path = self._path(f'{job.id}.json')
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(job.to_state(), f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def _write_pointer(self, job_id):
+        tmp = self._path(f'current.{os.getpid()}.tmp')
+        with open(tmp, 'w', encoding='ascii') as f:
+            f.write(job_id)
+        os.replace(tmp, self._path('current'))
+
+    def _load(self, job_id):
+        try:
+            with open(self._path(f'{job_id}.json'), encoding='utf-8') as f:
+                job = SyncJob.from_state(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return None
+        if job.running and self._shared_lock_free():
+            # 记录为运行中，但没有进程持有任务锁：执行任务的进程已经退出
+            job.update(phase='failed', error='执行任务的进程已退出', finished_at=time.time())
+            job.finished.set()
+        return job
+
+    def _load_current(self):
+        try:
+            with open(self._path('current'), encoding='ascii') as f:
+                job_id = f.read().strip()
+        except OSError:
+            return None
+        return self._load(job_id) if _JOB_ID_RE.fullmatch(job_id) else None
+
+    def _prune_states(self):
+        """只保留最近 history 个任务的状态文件"""
+        files = [name for name in os.listdir(self.state_dir) if name.endswith('.json')]
+        if len(files) <= self.history:
+            return
+        files.sort(key=lambda name: os.path.getmtime(self._path(name)))
+        for name in files[:len(files) - self.history]:
+            try:
+                os.remove(self._path(name))
+            except OSError:
+                pass
@@ -0,0 +1,243 @@
+"""合成数据生成：可复现的 Markdown 文件树与数据库数据
+
+真实的 posts/ 只有几十篇文章，无法看出扫描、搜索和列表接口在一万、
+十万篇文章时的表现。这里按固定随机种子生成带 front matter、代码块、
+表格和中文正文的文章，既可以写成文件树（分布在四个分类文件夹中），
+也可以直接批量写入 User / Post / Category / post_categories。
+相同的参数与种子总是得到相同的数据。
+"""
+import os
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from models import db, User, Post, Category, post_categories
+from utils.markdown_scanner import ALLOWED_CATEGORIES, content_hash, generate_summary
+from utils.pagination import invalidate_counts
+from utils.search import search_index
+
+# 文件夹与分类的顺序固定，保证结果只取决于种子
+CATEGORY_NAMES = tuple(sorted(ALLOWED_CATEGORIES))
+
+_SUBJECTS = ['系统', '服务', '模块', '接口', '数据库', '缓存', '调度器', '驱动', '网络',
+             '文件系统', '编译器', '博客', '前端页面', '测试用例', '日志', '配置']
+_VERBS = ['优化了', '重构了', '分析了', '记录了', '对比了', '验证了', '部署了', '排查了',
+          '设计了', '迁移了', '测量了', '整理了']
+_OBJECTS = ['启动时间', '内存占用', '吞吐量', '错误处理', '依赖关系', '目录结构',
+            '查询性能', '并发模型', '边界条件', '升级流程', '回归问题', '使用体验']
+_CLAUSES = ['在高负载下表现稳定', '结果比预期更好', '仍然有改进空间', '需要进一步观察',
+            '对线上没有影响', '可以推广到其他项目', '解决了长期存在的问题', '代价是多了一些代码']
+_CONNECTIVES = ['因此', '同时', '不过', '另外', '总体来看', '实际上', '首先', '最后']
+_TITLE_WORDS = ['实践', '笔记', '指南', '复盘', '入门', '进阶', '踩坑记录', '方案设计',
+                '性能分析', '读书笔记', '周记', '总结']
+_TAGS = ['python', 'flask', 'linux', 'markdown', 'sqlite', '性能', '工具', '效率',
+         '随笔', '旅行', '阅读', '嵌入式', '网络', '测试', '部署', '开源']
+_LANGUAGES = {
+    'python': ['def handler(request):', '    data = request.get_json()',
+               '    result = process(data)', '    return jsonify(result)',
+               'for item in items:', '    total += item.size', 'print(total)'],
+    'bash': ['set -e', 'cd /opt/app', 'git pull --rebase', 'pip install -r requirements.txt',
+             'systemctl restart blog', 'journalctl -u blog -n 50'],
+    'c': ['#include <stdio.h>', 'int main(void) {', '    int fd = open("/dev/null", 0);',
+          '    printf("%d\\n", fd);', '    return 0;', '}'],
+    'yaml': ['server:', '  host: 0.0.0.0', '  port: 5000', 'cache:', '  size: 256'],
+}
+
+
+def _sentence(rng):
+    parts = [rng.choice(_SUBJECTS), rng.choice(_VERBS), rng.choice(_OBJECTS)]
+    if rng.random() < 0.6:
+        parts.append('，' + rng.choice(_CONNECTIVES) + rng.choice(_CLAUSES))
+    if rng.random() < 0.3:
+        parts.insert(0, f'**{rng.choice(_SUBJECTS)}**的')
+    if rng.random() < 0.15:
+        parts.append(f'（参见 [{rng.choice(_TITLE_WORDS)}](https://example.com/{rng.randrange(1000)})）')
+    if rng.random() < 0.2:
+        parts.append(f'，关键参数是 `{rng.choice(_TAGS)}_{rng.randrange(100)}`')
+    return ''.join(parts) + '。'
+
+
+def _paragraph(rng):
+    return ''.join(_sentence(rng) for _ in range(rng.randint(2, 6)))
+
+
+def _code_block(rng):
+    language = rng.choice(sorted(_LANGUAGES))
+    lines = _LANGUAGES[language]
+    start = rng.randrange(len(lines))
+    body = [lines[(start + i) % len(lines)] for i in range(rng.randint(3, 12))]
+    return f'```{language}\n' + '\n'.join(body) + '\n```'
+
+
+def _table(rng):
+    columns = rng.sample(['名称', '版本', '耗时 (ms)', '内存 (MB)', '状态', '备注'], rng.randint(3, 5))
+    rows = ['| ' + ' | '.join(columns) + ' |', '|' + ' --- |' * len(columns)]
+    for i in range(rng.randint(2, 8)):
+        cells = []
+        for column in columns:
+            if '(' in column:
+                cells.append(f'{rng.uniform(1, 500):.1f}')
+            elif column == '版本':
+                cells.append(f'v{rng.randint(1, 5)}.{rng.randint(0, 20)}')
+            elif column == '状态':
+                cells.append(rng.choice(['通过', '失败', '进行中']))
+            else:
+                cells.append(rng.choice(_OBJECTS))
+        rows.append('| ' + ' | '.join(cells) + ' |')
+    return '\n'.join(rows)
+
+
+def _list_block(rng):
+    marker = rng.choice(['-', '*', '1.'])
+    return '\n'.join(f'{marker} {rng.choice(_VERBS)}{rng.choice(_OBJECTS)}'
+                     for _ in range(rng.randint(2, 6)))
+
+
+def generate_post(rng, index, category, sections=(2, 6)):
+    """生成一篇文章，返回 dict: title, date, tags, summary, body, text（含 front matter）
+
+    sections 为二级标题数量的范围，每节包含段落以及随机的代码块、表格、列表或引用。
+    """
+    title = f'{rng.choice(_SUBJECTS)}{rng.choice(_TITLE_WORDS)} #{index}'
+    date = datetime(2024, 1, 1) + timedelta(days=rng.randrange(730), minutes=rng.randrange(1440))
+    tags = rng.sample(_TAGS, rng.randint(1, 4))
+
+    blocks = [f'# {title}', _paragraph(rng)]
+    for n in range(rng.randint(*sections)):
+        blocks.append(f'## {n + 1}. {rng.choice(_VERBS)}{rng.choice(_OBJECTS)}')
+        blocks.append(_paragraph(rng))
+        roll = rng.random()
+        if roll < 0.35:
+            blocks.append(_code_block(rng))
+        elif roll < 0.55:
+            blocks.append(_table(rng))
+        elif roll < 0.75:
+            blocks.append(_list_block(rng))
+        elif roll < 0.85:
+            blocks.append('> ' + _sentence(rng))
+        if rng.random() < 0.5:
+            blocks.append(_paragraph(rng))
+    body = '\n\n'.join(blocks) + '\n'
+
+    meta = [f'title: {title}', f"date: {date:%Y-%m-%d}", f'category: {category}',
+            f"tags: {', '.join(tags)}"]
+    summary = ''
+    if rng.random() < 0.5:
+        summary = _sentence(rng)
+        meta.append(f'summary: {summary}')
+    text = '---\n' + '\n'.join(meta) + '\n---\n\n' + body
+    return {'title': title, 'date': date, 'tags': tags, 'summary': summary,
+            'body': body, 'text': text}
+
+
+def generate_markdown_tree(folder, files=10000, seed=0, nested=0.2, sections=(2, 6)):
+    """在 folder 下生成合成文件树
+
+    文章轮流放入四个分类文件夹，其中约 nested 比例放在分类下的子文件夹中，
+    模拟真实 posts/ 的层级。已存在的同名文件会被覆盖。
+
+    返回: {'files': 文件数, 'bytes': 总字节数}
+    """
+    rng = random.Random(seed)
+    total = 0
+    for i in range(files):
+        category = CATEGORY_NAMES[i % len(CATEGORY_NAMES)]
+        directory = os.path.join(folder, category)
+        if rng.random() < nested:
+            directory = os.path.join(directory, f'{rng.randrange(20):02d}_{rng.choice(_OBJECTS)}')
+        os.makedirs(directory, exist_ok=True)
+        post = generate_post(rng, i, category, sections)
+        data = post['text'].encode('utf-8')
+        with open(os.path.join(directory, f'post-{i:06d}.md'), 'wb') as f:
+            f.write(data)
+        total += len(data)
+    return {'files': files, 'bytes': total}
+
+
+def seed_database(posts=10000, users=10, seed=0, categories=None, batch_size=500,
+                  sections=(2, 6)):
+    """直接批量写入合成的用户、分类、文章及其分类关联
+
+    categories: 分类定义列表（dict，至少包含 name 与 slug），已存在的同名分类直接复用；
+        默认使用四个允许的分类名。
+    用户名为 synth-user-N，已存在时复用；所有合成用户共用同一个密码 synth123，
+    只计算一次密码哈希。文章 slug 为 synth-<seed>-N，重复执行同一种子会因唯一约束失败。
+    文章同时写入全文索引。
+    需要在应用上下文中调用，本函数负责提交。
+
+    返回: {'users': 新增用户数, 'categories': 新增分类数, 'posts': 新增文章数}
+    """
+    rng = random.Random(seed)
+    result = {'users': 0, 'categories': 0, 'posts': 0}
+
+    # ---- 分类 ----
+    if categories is None:
+        categories = [{'name': name, 'slug': f'synth-{i}'} for i, name in enumerate(CATEGORY_NAMES)]
+    category_ids = dict(db.session.query(Category.name, Category.id))
+    missing = [dict(cat, order=cat.get('order', i)) for i, cat in enumerate(categories)
+               if cat['name'] not in category_ids]
+    if missing:
+        db.session.execute(insert(Category), missing)
+        result['categories'] = len(missing)
+        category_ids = dict(db.session.query(Category.name, Category.id))
+    category_list = [category_ids[cat['name']] for cat in categories]
+
+    # ---- 用户 ----
+    names = [f'synth-user-{i}' for i in range(users)]
+    user_ids = dict(db.session.query(User.username, User.id).filter(User.username.like('synth-user-%')))
+    new_users = [name for name in names if name not in user_ids]
+    if new_users:
+        template = User()
+        template.set_password('synth123')
+        db.session.execute(insert(User), [{
+            'username': name,
+            'email': f'{name}@example.com',
+            'password_hash': template.password_hash,
+            'is_admin': False,
+            'created_at': datetime(2024, 1, 1),
+        } for name in new_users])
+        result['users'] = len(new_users)
+        user_ids = dict(db.session.query(User.username, User.id).filter(
+            User.username.like('synth-user-%')))
+    author_ids = [user_ids[name] for name in names]
+
+    # ---- 文章与分类关联 ----
+    for start in range(0, posts, batch_size):
+        rows, cats = [], []
+        for i in range(start, min(start + batch_size, posts)):
+            slot = i % len(category_list)
+            post = generate_post(rng, i, categories[slot]['name'], sections)
+            rows.append({
+                'title': post['title'],
+                'slug': f'synth-{seed}-{i}',
+                'content': post['body'],
+                'summary': post['summary'] or generate_summary(post['body']),
+                'cover_image': '',
+                'is_published': rng.random() < 0.95,
+                'is_from_file': False,
+                'file_path': '',
+                'content_hash': content_hash(post['text']),
+                'view_count': rng.randrange(5000),
+                'author_id': rng.choice(author_ids) if author_ids else None,
+                'created_at': post['date'],
+                'updated_at': post['date'],
+            })
+            linked = {category_list[slot]}
+            if rng.random() < 0.2:
+                linked.add(rng.choice(category_list))
+            cats.append(linked)
+
+        db.session.execute(insert(Post), rows)
+        ids = dict(db.session.query(Post.slug, Post.id).filter(
+            Post.slug.in_([row['slug'] for row in rows])))
+        db.session.execute(insert(post_categories), [
+            {'post_id': ids[row['slug']], 'category_id': cat_id}
+            for row, linked in zip(rows, cats) for cat_id in sorted(linked)])
+        search_index.replace(db.session.connection(), [
+            (ids[row['slug']], row['title'], row['summary'], row['content']) for row in rows])
+        invalidate_counts(db.session)
+        db.session.commit()
+        result['posts'] += len(rows)
+    db.session.commit()
+    return result
@@ -0,0 +1,94 @@
+"""文章浏览计数的写回缓冲
+
+每次打开文章都执行 UPDATE + COMMIT 会让读请求变成写事务，高并发时所有读者
+都要排队等待 SQLite 的写锁。这里在进程内按文章 id 累计浏览次数，
+距上次写回超过 interval 秒或累计 threshold 次后，用一条批量 UPDATE
+（view_count = view_count + n）一次写回；进程退出时写回剩余的计数。
+
+写回由请求线程顺带完成，不另开线程，也就不会与请求并发使用同一个数据库连接；
+长时间没有访问时剩余计数留到下一次访问或进程退出时写回。
+多个工作进程各自缓冲、各自累加写回，计数不会丢失或重复。
+"""
+import atexit
+import logging
+import threading
+import time
+import weakref
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    """按文章 id 累计浏览次数，定期批量写回
+
+    write: 写回函数，参数为 {文章 id: 新增次数}，失败时抛出异常（计数会保留到下次写回）
+    interval: 最长写回间隔（秒），0 表示每次访问都立即写回
+    threshold: 累计多少次访问后立即写回，0 表示不按次数触发
+    """
+
+    _instances = weakref.WeakSet()
+
+    def __init__(self, write, interval=5.0, threshold=100):
+        self.write = write
+        self.interval = interval
+        self.threshold = threshold
+        self._pending = {}
+        self._hits = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        ViewCounter._instances.add(self)
+
+    def hit(self, post_id):
+        """记录一次浏览，到达时间或次数阈值时写回（写回失败只记录日志）"""
+        with self._lock:
+            self._pending[post_id] = self._pending.get(post_id, 0) + 1
+            self._hits += 1
+            due = (self.interval <= 0 or
+                   (self.threshold and self._hits >= self.threshold) or
+                   time.monotonic() - self._last_flush >= self.interval)
+        if due:
+            try:
+                self.flush()
+            except Exception:
+                # 写回失败不影响读者，计数已经放回缓冲区，下次再写
+                logger.exception('写回浏览计数失败')
+
+    def pending(self, post_id=None):
+        """尚未写回的次数；post_id 为 None 时返回全部文章的合计"""
+        with self._lock:
+            if post_id is None:
+                return sum(self._pending.values())
+            return self._pending.get(post_id, 0)
+
+    def flush(self):
+        """把累计的计数写回，返回写回的浏览次数"""
+        with self._flush_lock:
+            with self._lock:
+                counts, self._pending = self._pending, {}
+                self._hits = 0
+                self._last_flush = time.monotonic()
+            if not counts:
+                return 0
+            try:
+                self.write(counts)
+            except Exception:
+                # 写回失败时把计数放回去，下次一起写
+                with self._lock:
+                    for post_id, n in counts.items():
+                        self._pending[post_id] = self._pending.get(post_id, 0) + n
+                        self._hits += n
+                raise
+            return sum(counts.values())
+
+    @classmethod
+    def flush_all(cls):
+        """进程退出时写回所有实例的剩余计数"""
+        for counter in list(cls._instances):
+            try:
+                counter.flush()
+            except Exception:
+                logger.exception('写回浏览计数失败')
+
+
+atexit.register(ViewCounter.flush_all)